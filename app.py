@@ -1,47 +1,103 @@
-import os, sys, re, pathlib, logging, datetime as dt, traceback, asyncio, threading
+import os, sys, re, time, signal, pathlib, logging, dataclasses, datetime as dt, traceback, asyncio, functools
 from dotenv import load_dotenv
 from typing import Optional
-from playwright.async_api import async_playwright, TimeoutError as PWTimeout
+from playwright.async_api import async_playwright, TimeoutError as PWTimeout, Error as PWError
+from turnos.captura import CapturaXHR, parsear_cuerpo, parsear_agenda, parsear_tabla_profesionales
+from turnos.agenda import CacheSemanas, urls_por_semana, unir_semanas, lunes_de, parsear_fecha_cabecera
+from turnos.cache_busquedas import CacheBusquedas
+from turnos.limitador import Limitador, cuenta_actual
+from turnos.selectores import CacheSelectores
+from turnos.atajos import Atajos, clave_agenda
+from turnos.salud import SaludPortal, RE_PORTAL_CAIDO
+from turnos.historial import Historial
+from turnos.evidencias import Evidencias
+from turnos.presupuesto import Deadline, PresupuestoAgotado
+from turnos.resiliencia import (ErrorTransitorio, ErrorFatal, CredencialesInvalidas, CaptchaRequerido,
+                                PortalCaido, CircuitBreaker, reintentar)
+from turnos.navegador import lanzar, nuevo_contexto, PoolSesiones
+from turnos import har, bucle
+from turnos.workers import Coordinador
+from turnos.metricas import resumen_latencias
+from turnos.lease import Lease, blindar, instalar_senales
+from turnos.config import Config, Cuenta, Objetivo, ConfigError, ConfigRecargable
+from turnos.notificador import (Notificador, Evento, Dedupe, WebhookSink, SmtpSink,
+                                ArchivoSink, ComandoSink)
 
 # ================== ENV / CONFIG ==================
 load_dotenv()
 
-PORTAL_URL = os.getenv("PORTAL_URL", "https://www.osep.mendoza.gov.ar/webapp_pri")
-OSEP_USER  = os.getenv("OSEP_USER")
-OSEP_PASS  = os.getenv("OSEP_PASS")
-
-# Objetivos originales (algunos quedan para futuro)
-OBJ_FECHA_TXT = os.getenv("OBJ_FECHA_TXT")
-OBJ_HORA_TXT  = os.getenv("OBJ_HORA_TXT")
-OBJ_SERVICIO  = os.getenv("OBJ_SERVICIO")
-OBJ_MEDICO    = os.getenv("OBJ_MEDICO", "false")  # si "false" => no filtra por profesional
-OBJ_SEDE_TXT  = os.getenv("OBJ_SEDE_TXT")
-OBJ_ZONA   = os.getenv("OBJ_ZONA")
-OBJ_DEPTO  = os.getenv("OBJ_DEPTO")  # agregado; si querés otro, definilo en .env
-OBJ_FECHA_FLEXIBLE = os.getenv("OBJ_FECHA_FLEXIBLE", "true").lower() == "true"
-OBJ_DIA_FLEXIBLE   = os.getenv("OBJ_DIA_FLEXIBLE", "true").lower() == "true"
-OBJ_HORA_FLEXIBLE  = os.getenv("OBJ_HORA_FLEXIBLE", "true").lower() == "true"
-
-
-HEADLESS = os.getenv("HEADLESS", "true").lower() != "false"
-TOUT     = int(os.getenv("TIMEOUT_MS", "20000"))
-
-DRY_RUN            = os.getenv("DRY_RUN", "false").lower() == "true"
-STOP_AFTER_LOGIN   = os.getenv("STOP_AFTER_LOGIN", "false").lower() == "true"
-# STOP_AFTER_IFRAME ignorado en este flujo nuevo
-# STOP_AFTER_IFRAME  = os.getenv("STOP_AFTER_IFRAME", "false").lower() == "true"
-
-
-# ================== EVIDENCIAS (DESACTIVADO PARA EJECUCIÓN SIMPLE) ==================
-EVID = None  # No se crearán carpetas ni archivos de evidencia
-
-# =============================================================================
-# BASE_DIR  = pathlib.Path(r"C:\Users\Francesco Zucarello\OneDrive - Estudio Trípoli\Personal\Scripts\Turnos OSEP")
-# EVID_ROOT = BASE_DIR
-# RUN_ID    = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
-# EVID      = EVID_ROOT / f"evidencia_{RUN_ID}"
-# EVID.mkdir(parents=True, exist_ok=True)
-# =============================================================================
+# Toda la configuración (env / .env / CONFIG_FILE con varias cuentas y objetivos) se
+# parsea y valida una sola vez en amain() con turnos.config.cargar_config(): un valor
+# inválido corta en milisegundos, antes de lanzar el navegador. Ver turnos/config.py.
+# CFG es la configuración vigente (en modo daemon se recarga si cambia CONFIG_FILE).
+CFG: Optional[Config] = None
+# Semanas de agenda ya leídas (solo se reutilizan en modo daemon, entre ciclos)
+CACHE_AGENDA = CacheSemanas()
+# Filas de búsquedas recientes, compartidas entre cuentas/objetivos (ver turnos/cache_busquedas.py)
+CACHE_BUSQUEDAS = CacheBusquedas()
+# Ritmo de acciones contra el portal (ver turnos/limitador.py). En modo multiproceso cada
+# worker tiene el suyo y los límites se reparten entre PROCESOS.
+LIMITADOR = Limitador()
+PROCESOS = 1
+# Qué variante de cada selector con alternativas funcionó la última vez (ver turnos/selectores.py)
+SELECTORES = CacheSelectores()
+# Requests de búsqueda/agenda aprendidas para pedirlas sin el formulario (ver turnos/atajos.py)
+ATAJOS = Atajos()
+# Escaneos para la analítica (python -m turnos.analitica); None = no se registran
+HISTORIAL: Optional[Historial] = None
+
+def configurar(cfg: Config):
+    global CFG, HISTORIAL
+    CFG = cfg
+    HISTORIAL = Historial(cfg.estado_dir / "historial") if cfg.historial and cfg.har_modo != "reproducir" else None
+    LIMITADOR.ajustar(cfg.limite_rps / PROCESOS, cfg.limite_rafaga,
+                      cfg.limite_cuenta_rps / PROCESOS, cfg.limite_cuenta_rafaga)
+    CACHE_AGENDA.ttl_s = cfg.agenda_cache_ttl_s if cfg.daemon_intervalo_s else 0.0
+    CACHE_BUSQUEDAS.ttl_s = cfg.busqueda_cache_ttl_s
+    CACHE_BUSQUEDAS.max_entradas = cfg.busqueda_cache_max
+    CACHE_BUSQUEDAS.ruta = cfg.estado_dir / "busquedas.json" if cfg.busqueda_cache_disco else None
+    SELECTORES.ruta = cfg.estado_dir / "selectores.json"
+    ATAJOS.ruta = cfg.estado_dir / "atajos.json"
+
+
+# ================== EVIDENCIAS (EVIDENCIAS=true; ver turnos/evidencias.py) ==================
+EVID: Optional[Evidencias] = None  # sin EVIDENCIAS no se crean carpetas ni archivos
+
+def iniciar_evidencias(sufijo: str = ""):
+    global EVID
+    if CFG.evidencias and CFG.har_modo != "reproducir":
+        EVID = Evidencias(CFG.evidencias_dir or CFG.estado_dir / "evidencias", max_corrida_mb=CFG.evidencias_max_mb,
+                          retencion_dias=CFG.evidencias_retencion_dias, max_total_mb=CFG.evidencias_total_mb,
+                          sufijo=sufijo).iniciar()
+
+def timeout_evidencia(dl: Deadline, paso: str, reserva: bool = True) -> Optional[int]:
+    # La captura sale del presupuesto como cualquier espera; si no queda, no se captura
+    try:
+        return dl.ms(f"evidencia {paso}", Evidencias.TOPE_CAPTURA_MS, reserva=reserva)
+    except PresupuestoAgotado:
+        log.debug(f"Evidencias: sin presupuesto para capturar '{paso}'.")
+        return None
+
+async def evidencia(page, dl: Deadline, paso: str, frame=None, reserva: bool = True):
+    if EVID:
+        timeout = timeout_evidencia(dl, paso, reserva)
+        if timeout:
+            await EVID.capturar(page, paso, frame, timeout_ms=timeout)
+
+async def evidencia_error(page, dl: Deadline, paso: str, estado, e: BaseException, reserva: bool = True):
+    """Captura + estado del flujo al fallar un paso (para reconstruir una reserva fallida)."""
+    if not EVID:
+        return
+    EVID.guardar_json(f"error_{paso}", {
+        "error": f"{e.__class__.__name__}: {e}", "cuenta": estado.cuenta.id, "objetivo_id": estado.obj.id,
+        "checkpoint": estado.checkpoint, "fin": estado.fin, "fila": estado.objetivo, "eleccion": estado.eleccion,
+        "semana_iframe": estado.semana_iframe, "slots": estado.slots, "confirmacion": estado.confirmacion,
+        "tiempos": estado.tiempos,
+    })
+    timeout = timeout_evidencia(dl, f"error_{paso}", reserva)
+    if timeout:
+        # Fuera del camino rápido: acá sí la página entera
+        await EVID.capturar(page, f"error_{paso}", estado.iframe, timeout_ms=timeout, completa=True)
 
 # ================== LOGGING (solo a archivo + consola) ==================
 log = logging.getLogger("osep")
@@ -64,12 +120,6 @@ log.info("Logging iniciado (solo consola, sin archivo).")
 # =============================================================================
 
 # ================== UTILS ==================
-def must_env(var: str):
-    val = os.getenv(var)
-    if not val:
-        raise RuntimeError(f"Falta variable de entorno {var}")
-    return val
-
 async def short_sleep(seconds: float = 1.0):
     await asyncio.sleep(seconds)
 
@@ -92,169 +142,174 @@ async def wait_blocker_gone(page, timeout_ms: int = 15000):
         await asyncio.sleep(0.2)
     log.debug("wait_blocker_gone: timeout esperando que desaparezca el overlay.")
 
-# ================== FLOWS ==================
-async def login(page):
-    log.info("1) Navegando al portal…")
-    await page.goto(PORTAL_URL, wait_until="domcontentloaded", timeout=TOUT)
-
-    log.info("2) Login (usuario/contraseña)…")
-    user_sel = 'input[name="usuario"], input#usuario, input[placeholder*="Usuario" i]'
-    pass_sel = 'input[name="password"], input#password, input[placeholder*="Contraseña" i], input[type="password"]'
-    await page.locator(user_sel).first.wait_for(timeout=TOUT)
-    await page.fill(user_sel, must_env("OSEP_USER"))
-    await page.fill(pass_sel, must_env("OSEP_PASS"))
-
-    btn = page.get_by_role("button", name=re.compile(r"(ingresar|entrar|acceder|login)", re.I)).first
-    if not await btn.is_visible():
-        btn = page.locator('button:has-text("Ingresar"), input[type="submit"], a:has-text("Ingresar")').first
-    await btn.click(timeout=TOUT)
-
-    await page.wait_for_load_state("networkidle", timeout=TOUT)
-    log.info("Login: OK (si seguís viendo la pantalla de login, hay que ajustar selectores).")
-
-async def flujo_turnos_nuevo(page):
+def armar_notificador() -> Optional[Notificador]:
+    sinks = []
+    if CFG.notif_webhook_url:
+        sinks.append(WebhookSink(CFG.notif_webhook_url))
+    if CFG.notif_smtp_host and CFG.notif_smtp_to:
+        sinks.append(SmtpSink(CFG.notif_smtp_host, CFG.notif_smtp_port,
+                              CFG.notif_smtp_from or CFG.notif_smtp_user, CFG.notif_smtp_to,
+                              CFG.notif_smtp_user, CFG.notif_smtp_pass))
+    if CFG.notif_archivo:
+        sinks.append(ArchivoSink(CFG.notif_archivo))
+    if CFG.notif_comando:
+        sinks.append(ComandoSink(CFG.notif_comando))
+    if not sinks:
+        return None
+    log.info(f"Notificaciones activas: {', '.join(s.nombre for s in sinks)}.")
+    return Notificador(sinks, Dedupe(CFG.estado_dir / "notificaciones.json", CFG.notif_dedup_ttl_s))
+
+async def clickear_variante(elemento: str, locators: dict, timeout_ms: int):
     """
-    Luego del login:
-      - Navegar a listarCompleto
-      - Click en pestaña 'Nuevo'
-      - Seleccionar Servicio (servimod), Zona (id_zona), Depto (id_dpto)
-      - Si OBJ_MEDICO == 'false' => click Buscar
-        Else: escribir profesional, Enter, esperar overlay, luego click Buscar
-      - Esperar y leer tabla #tblResultadoProfesionales, volcar filas al log
-      - Mantener la ventana abierta para inspección manual
+    Click en el primero de locators ({nombre: locator}) que funcione, empezando por el que
+    funcionó la última vez (SELECTORES). Salvo el último, los demás solo se prueban si ya
+    están visibles, así una variante vieja no consume un timeout completo.
     """
-    # 3) Navegación directa
-    listar_url = PORTAL_URL.rstrip("/") + "/action/applicationAfi/turnos/turno/listar/listarCompleto"
-    log.info(f"3) Navegando directo a listarCompleto: {listar_url}")
-    await page.goto(listar_url, wait_until="domcontentloaded", timeout=TOUT)
-
-    # 4) Click en pestaña "Nuevo"
-    log.info("4) Click en pestaña 'Nuevo'…")
-    # Varios selectores por las dudas:
-    nuevo_link = page.locator('a.nav-link[href="#divTNue"] >> text=Nuevo').first
-    if not await nuevo_link.is_visible():
-        nuevo_link = page.locator('a.nav-link[href="#divTNue"]').first
-    await nuevo_link.click(timeout=TOUT)
-    await short_sleep(1)
+    async def variante(loc, ultima):
+        if not ultima and not await loc.is_visible():
+            return False
+        await loc.click(timeout=timeout_ms)
+    await SELECTORES.probar(elemento, {n: functools.partial(variante, loc) for n, loc in locators.items()})
 
-    # 5) Seleccionar Servicio
-    log.info(f"5) Seleccionando servicio: {OBJ_SERVICIO!r}")
-    serv_sel = page.locator("select#servimod")
-    await serv_sel.wait_for(timeout=TOUT)
-    # Intentar por label (visible text)
-    try:
-        await serv_sel.select_option(label=OBJ_SERVICIO.strip())
-    except Exception:
-        # Plan B: igualar por mayúsculas usando evaluate
-        await page.evaluate(
-            """(svc_text) => {
-                const sel = document.querySelector('#servimod');
-                if (!sel) return;
-                const t = (svc_text||'').trim().toUpperCase();
-                for (const opt of sel.options) {
-                    if ((opt.textContent||'').trim().toUpperCase() === t) {
-                        sel.value = opt.value;
-                        sel.dispatchEvent(new Event('change', {bubbles:true}));
-                        break;
-                    }
+async def seleccionar_por_texto(page, css: str, texto: str, timeout_ms: int):
+    """
+    Selecciona la opción cuyo texto visible coincide con texto: por label o igualando
+    mayúsculas por JS (primero la que funcionó la última vez en ese select). Si el select ya
+    cargó sus opciones y la pedida no está es un error fatal (reintentar no la va a hacer
+    aparecer); cualquier otra falla (timeout, navegación, select todavía llenándose) es
+    transitoria.
+    """
+    sel = page.locator(css)
+    await sel.wait_for(timeout=timeout_ms)
+
+    async def por_label(ultima):
+        # Intentar por label (visible text)
+        await sel.select_option(label=texto.strip(), timeout=timeout_ms)
+
+    async def por_js(ultima):
+        # Igualar por mayúsculas usando evaluate
+        return await page.evaluate(
+        """([css, txt]) => {
+            const sel = document.querySelector(css);
+            if (!sel) return false;
+            const t = (txt||'').trim().toUpperCase();
+            for (const opt of sel.options) {
+                if ((opt.textContent||'').trim().toUpperCase() === t) {
+                    sel.value = opt.value;
+                    sel.dispatchEvent(new Event('change', {bubbles:true}));
+                    return true;
                 }
-            }""",
-            OBJ_SERVICIO
-        )
-    await short_sleep(1)
+            }
+            return false;
+        }""",
+        [css, texto]
+    )
 
-    # 6) Seleccionar Zona
-    log.info(f"6) Seleccionando zona: {OBJ_ZONA!r}")
-    zona_sel = page.locator("select#id_zona")
-    await zona_sel.wait_for(timeout=TOUT)
     try:
-        await zona_sel.select_option(label=OBJ_ZONA.strip())
-    except Exception:
-        await page.evaluate(
-            """(zona_text) => {
-                const sel = document.querySelector('#id_zona');
-                if (!sel) return;
-                const t = (zona_text||'').trim().toUpperCase();
-                for (const opt of sel.options) {
-                    if ((opt.textContent||'').trim().toUpperCase() === t) {
-                        sel.value = opt.value;
-                        sel.dispatchEvent(new Event('change', {bubbles:true}));
-                        break;
-                    }
-                }
-            }""",
-            OBJ_ZONA
-        )
+        await SELECTORES.probar(f"select {css}", {"label": por_label, "js": por_js})
+    except PresupuestoAgotado:
+        raise
+    except Exception as e:
+        try:
+            opciones = await page.evaluate(
+                """(css) => { const s = document.querySelector(css);
+                              return s ? Array.from(s.options, o => (o.textContent||'').trim().toUpperCase()) : null; }""",
+                css)
+        except Exception:
+            opciones = None
+        # Más de una opción = ya no es solo el "Seleccione…" del select recién armado
+        if opciones is not None and len(opciones) > 1 and texto.strip().upper() not in opciones:
+            raise ErrorFatal(f"No existe la opción {texto!r} en {css}") from e
+        raise ErrorTransitorio(f"No se pudo elegir {texto!r} en {css} ({e.__class__.__name__})") from e
 
-    # IMPORTANTE: el cambio de zona dispara cargar departamentos
-    # Damos un pequeño tiempo para que se complete esa carga
-    await short_sleep(0.8)
+async def primero_en_llegar(fut, plan_b):
+    """
+    Hace competir el future de la captura XHR contra plan_b (la espera del DOM).
+    Devuelve ("xhr", datos) si la respuesta llegó primero, o ("dom", resultado de plan_b).
+    """
+    if fut is None:
+        return "dom", await plan_b
+    tarea_dom = asyncio.ensure_future(plan_b)
+    try:
+        await asyncio.wait({fut, tarea_dom}, return_when=asyncio.FIRST_COMPLETED)
+        if fut.done() and not fut.cancelled():
+            return "xhr", fut.result()
+        return "dom", tarea_dom.result()
+    finally:
+        if not tarea_dom.done():
+            tarea_dom.cancel()
+
+async def buscar_iframe_agenda(page, timeout_ms: int = 10000):
+    end = dt.datetime.now() + dt.timedelta(milliseconds=timeout_ms)
+    while True:
+        for f in page.frames:
+            if "pickMostrarAgenda_iframe" in (f.name or ""):
+                return f
+        if dt.datetime.now() >= end:
+            return None
+        await asyncio.sleep(0.5)
 
-    # 7) Seleccionar Departamento
-    log.info(f"7) Seleccionando departamento: {OBJ_DEPTO!r}")
-    dpto_sel = page.locator("select#id_dpto")
-    await dpto_sel.wait_for(timeout=TOUT)
+async def esperar_agenda_dom(page, dl: Deadline):
+    """
+    Plan B de la agenda: esperar el overlay, el iframe y la tabla renderizada. Devuelve el iframe o None.
+    """
+    await wait_blocker_gone(page, timeout_ms=dl.ms("overlay agenda", 20000))
+    iframe = await buscar_iframe_agenda(page, timeout_ms=dl.ms("iframe agenda", 10000))
+    if not iframe:
+        return None
+    log.info("11) Esperando que cargue la agenda dentro del iframe…")
     try:
-        await dpto_sel.select_option(label=OBJ_DEPTO.strip())
+        await iframe.wait_for_selector("div.horario_disponible, table.tabla_dias_horarios",
+                                       timeout=dl.ms("tabla agenda", 10000))
     except Exception:
-        await page.evaluate(
-            """(dep_text) => {
-                const sel = document.querySelector('#id_dpto');
-                if (!sel) return;
-                const t = (dep_text||'').trim().toUpperCase();
-                for (const opt of sel.options) {
-                    if ((opt.textContent||'').trim().toUpperCase() === t) {
-                        sel.value = opt.value;
-                        sel.dispatchEvent(new Event('change', {bubbles:true}));
-                        break;
-                    }
-                }
-            }""",
-            OBJ_DEPTO
-        )
-    await short_sleep(1)
-
-    # 8) Lógica del profesional (OBJ_MEDICO)
-    buscar_btn = page.locator('input#buscar.button.buscar').first
-    prof_input = page.locator('input#profesionalBusquedaComodin_turn')
-
-    obj_medico_txt = (OBJ_MEDICO or "").strip()
-    if obj_medico_txt.lower() == "false" or obj_medico_txt == "":
-        log.info("8) OBJ_MEDICO = false => no se filtra por profesional; se clickea 'Buscar'.")
-        try:
-            await buscar_btn.click(timeout=TOUT)
-        except Exception as e:
-            log.warning(f"No pude hacer click en Buscar de forma directa ({e}); intento alternativo…")
-            await page.locator("input#buscar").first.click()
-    else:
-        log.info(f"8) Filtrando por profesional: {obj_medico_txt!r}")
-        await prof_input.wait_for(timeout=TOUT)
-        # limpiar + tipear
-        await prof_input.fill("")
-        await prof_input.fill(obj_medico_txt)
-        # Enter para disparar buscador/loader
-        await prof_input.press("Enter")
-        # Esperar overlay/toaster cargue y se vaya
-        await wait_blocker_gone(page, timeout_ms=20000)
-        # Y recién ahí Buscar
-        await buscar_btn.click(timeout=TOUT)
-
-    # 9) Esperar tabla de resultados y volcarla al log
-    log.info("9) Esperando tabla de resultados…")
-    tabla = page.locator("#tblResultadoProfesionales")
-    await tabla.wait_for(timeout=TOUT)
-
-    # Scraping de filas
-    filas = await page.evaluate("""
-        () => {
-            const tbl = document.querySelector('#tblResultadoProfesionales');
-            const out = [];
-            if (!tbl) return out;
-            const rows = tbl.querySelectorAll('tbody tr');
-            for (const tr of rows) {
-                const tds = tr.querySelectorAll('td');
+        log.warning("No se detectó ninguna celda con horario_disponible antes de timeout.")
+    return iframe
+
+# Helpers JS de #tblResultadoProfesionales (se anteponen al cuerpo de cada evaluate)
+_JS_TABLA = """
+    const tbl = document.querySelector('#tblResultadoProfesionales');
+    const dormir = (ms) => new Promise(r => setTimeout(r, ms));
+    const trs = () => tbl ? Array.from(tbl.querySelectorAll('tbody tr')) : [];
+    const firma = () => { const r = trs(); return r.length + '|' + (r[0] ? r[0].innerText : '') + '|' +
+                                                   (r.length ? r[r.length - 1].innerText : ''); };
+    const esperarCambio = async (antes, ms) => {
+        const fin = Date.now() + ms;
+        while (Date.now() < fin) {
+            await dormir(100);
+            if (firma() !== antes) { await dormir(150); return true; }
+        }
+        return false;
+    };
+    const zona = tbl ? (tbl.closest('.dataTables_wrapper') || tbl.parentElement.parentElement || document) : document;
+    const habilitado = (el) => el && el.offsetParent !== null && !el.disabled &&
+        !/disabled/.test(el.className + ' ' + (el.parentElement ? el.parentElement.className : ''));
+    const siguiente = () => {
+        const css = "a.next, li.next > a, .paginate_button.next, a[rel='next'], a[aria-label*='iguiente'], a[title*='iguiente']";
+        const cand = Array.from(zona.querySelectorAll(css)).concat(Array.from(zona.querySelectorAll(
+            '.pagination a, .paginacion a, .dataTables_paginate a')).filter(a => /^(siguiente|»|>)$/i.test(a.textContent.trim())));
+        return cand.find(habilitado) || null;
+    };
+    const linkPagina = (n) => Array.from(zona.querySelectorAll('.pagination a, .paginacion a, .dataTables_paginate a'))
+        .find(a => a.textContent.trim() === String(n) && a.offsetParent !== null) || null;
+"""
+
+async def leer_filas_dom(page, espera_ms: int = 5000, max_paginas: int = 50):
+    """
+    Filas de #tblResultadoProfesionales en una sola pasada dentro de la página. Si la tabla
+    pagina o carga de a partes, primero se intenta mostrar todo junto (API de DataTables o
+    selector de cantidad por página); si no, se scrollea el contenedor o se recorren las
+    páginas del paginador. Cada fila se lee una sola vez, a medida que aparece; las de
+    páginas posteriores llevan 'pagina' (ver ir_a_pagina).
+    """
+    res = await page.evaluate("async ({esperaMs, maxPaginas}) => {" + _JS_TABLA + """
+        const out = [];
+        if (!tbl) return {filas: out, modo: 'sin tabla', paginas: 0};
+        const toText = (el) => (el ? el.innerText.trim().replace(/\\s+\\n/g, "\\n").replace(/\\s+/g,' ').trim() : "");
+        const leer = (desde, pagina) => {    // solo las filas nuevas (desde en adelante)
+            const rows = trs();
+            for (let i = desde; i < rows.length; i++) {
+                const tds = rows[i].querySelectorAll('td');
                 if (tds.length < 6) continue;
-                const toText = (el) => (el ? el.innerText.trim().replace(/\\s+\\n/g, "\\n").replace(/\\s+/g,' ').trim() : "");
                 out.push({
                     profesional: toText(tds[0]),
                     domicilio:   toText(tds[1]),
@@ -262,121 +317,130 @@ async def flujo_turnos_nuevo(page):
                     horario:     toText(tds[3]),
                     disp:        toText(tds[4]),
                     agenda:      toText(tds[5]),
-                    rowIndex:    Array.from(tr.parentNode.children).indexOf(tr)
+                    rowIndex:    Array.from(rows[i].parentNode.children).indexOf(rows[i]),
+                    pagina:      pagina
                 });
             }
-            return out;
+            return rows.length;
+        };
+        let modo = 'simple';
+
+        // 1) Todo en una página: API de DataTables o, si no, el selector de cantidad por página
+        const $ = window.jQuery;
+        if ($ && $.fn && $.fn.dataTable && $.fn.dataTable.isDataTable(tbl)) {
+            const api = $(tbl).DataTable(), info = api.page.info();
+            if (info.pages > 1) {
+                const antes = firma();
+                api.page.len(info.serverSide ? info.recordsDisplay : -1).draw(false);
+                await esperarCambio(antes, esperaMs);
+                modo = 'datatables';
+            }
+        } else {
+            const sel = zona.querySelector("select[name$='_length'], .dataTables_length select, select.page-size, " +
+                                           "select[name*='pageSize' i], select[name*='cantidad' i]");
+            if (sel && sel.options.length) {
+                const valor = (o) => (o.value === '-1' || /todo|all/i.test(o.textContent)) ? Infinity : (parseInt(o.value, 10) || 0);
+                const mejor = Array.from(sel.options).reduce((a, o) => valor(o) > valor(a) ? o : a);
+                if (mejor.index !== sel.selectedIndex) {
+                    const antes = firma();
+                    sel.value = mejor.value;
+                    sel.dispatchEvent(new Event('change', {bubbles: true}));
+                    await esperarCambio(antes, esperaMs);
+                    modo = 'cantidad por página';
+                }
+            }
         }
-    """)
-
-    if not filas:
-        log.warning("No se encontraron filas en la tabla (0 resultados).")
-        return
-
-    log.info(f"Resultados detectados: {len(filas)} fila(s).")
-
-    # ---------------- FILTROS ----------------
-    prof_filtro = (os.getenv("OBJ_PROFESIONAL") or "").strip().lower()
-    dom_filtro  = (os.getenv("OBJ_DOMICILIO") or "").strip().lower()
-    hor_filtro  = (os.getenv("OBJ_HORARIO_TURNO") or "").strip().lower()
-    dias_filtro = [d.strip().upper() for d in (os.getenv("OBJ_DIAS_VALIDOS") or "").split(",") if d.strip()]
-    fecha_filtro = (os.getenv("OBJ_FECHA_DISP") or "").strip()
-
-    def cumple(f):
-        # Profesional
-        if prof_filtro and prof_filtro != "false" and prof_filtro not in f["profesional"].lower():
-            return False
-        # Domicilio
-        if dom_filtro and dom_filtro != "false" and dom_filtro not in f["domicilio"].lower():
-            return False
-        # Horario
-        if hor_filtro and hor_filtro != "false" and hor_filtro not in f["horario"].lower():
-            return False
-        # Días válidos
-        if dias_filtro and not any(d in f["horario"].upper() for d in dias_filtro):
-            return False
-        # Fecha DISP
-        if fecha_filtro and fecha_filtro != "false" and f["disp"] != fecha_filtro:
-            return False
-        # Si disp es --- descartamos (sin disponibilidad)
-        if f["disp"].strip() == "---":
-            return False
-        return True
-
-    candidatas = [f for f in filas if cumple(f)]
+        let leidas = leer(0, 0);
 
-    # Si no hay coincidencias exactas, elegimos la más próxima por fecha
-    from datetime import datetime
-    
-    if not candidatas:
-        hoy = datetime.now()
-        fechas_validas = []
-        for f in filas:
-            try:
-                if f["disp"].strip() == "---":
-                    continue
-                fecha = datetime.strptime(f["disp"], "%d-%m-%Y")
-                if fecha >= hoy:
-                    fechas_validas.append((fecha, f))
-            except Exception:
-                continue
-    
-        if fecha_filtro and not OBJ_FECHA_FLEXIBLE:
-            log.warning("No se encontró la fecha exacta y la flexibilidad está desactivada.")
-            return
-    
-        if fechas_validas:
-            fechas_validas.sort(key=lambda x: x[0])
-            candidatas = [fechas_validas[0][1]]
-            log.info(f"Usando la más próxima: {candidatas[0]['disp']}")
-        else:
-            log.warning("No hay fechas disponibles próximas.")
-            return
-
-
-    objetivo = candidatas[0]
-    log.info(f"Seleccionada: {objetivo}")
-
-    # Click en el ícono "Ver Agenda"
-    fila_index = objetivo["rowIndex"]
-    log.info(f"Haciendo click en 'Ver Agenda' (fila {fila_index})…")
-    agenda_icon = page.locator(f"#tblResultadoProfesionales tbody tr:nth-of-type({fila_index + 1}) img#img_agenda_prof")
-    await agenda_icon.first.click(timeout=TOUT)
-
-    # Esperar a que desaparezca el overlay/toaster
-    await wait_blocker_gone(page, timeout_ms=20000)
+        // 2) Carga perezosa: scrollear el contenedor (o 'Ver más') mientras aparezcan filas nuevas
+        let scroller = null;
+        for (let el = tbl.parentElement; el && el !== document.body; el = el.parentElement) {
+            const o = getComputedStyle(el).overflowY;
+            if ((o === 'auto' || o === 'scroll') && el.scrollHeight > el.clientHeight + 4) { scroller = el; break; }
+        }
+        const verMas = () => Array.from(zona.querySelectorAll('button, a'))
+            .find(b => /(ver|cargar|mostrar) m[aá]s/i.test(b.textContent) && habilitado(b)) || null;
+        const expandida = modo !== 'simple';
+        for (let i = 0; !expandida && i < maxPaginas && (scroller || verMas()); i++) {
+            const antes = firma(), boton = verMas();
+            if (boton) boton.click(); else scroller.scrollTop = scroller.scrollHeight;
+            if (!(await esperarCambio(antes, boton ? esperaMs : 800)) || trs().length <= leidas) break;
+            leidas = leer(leidas, 0);
+            modo = 'carga perezosa';
+        }
 
-    # 10) Leer iframe de la agenda
-    log.info("10) Esperando iframe de Agenda…")
-    iframe = None
-    for _ in range(20):
-        for f in page.frames:
-            if "pickMostrarAgenda_iframe" in (f.name or ""):
-                iframe = f
-                break
-        if iframe:
-            break
-        await asyncio.sleep(0.5)
-    if not iframe:
-        log.error("No encontré el iframe de agenda.")
-        return
+        // 3) Paginador sin forma de mostrar todo: se recorre y se vuelve a la primera página
+        let pagina = 0;
+        for (let sig = siguiente(); sig && pagina < maxPaginas - 1; sig = siguiente()) {
+            const antes = firma();
+            sig.click();
+            if (!(await esperarCambio(antes, esperaMs))) break;
+            leer(0, ++pagina);
+            modo = 'paginador';
+        }
+        if (pagina > 0) {
+            const primera = linkPagina(1) || zona.querySelector('a.first, li.first > a, .paginate_button.first');
+            if (primera) { const antes = firma(); primera.click(); await esperarCambio(antes, esperaMs); }
+        }
+        return {filas: out, modo: modo, paginas: pagina + 1};
+    }""", {"esperaMs": espera_ms, "maxPaginas": max_paginas})
+    if res["modo"] != "simple":
+        log.info(f"9) Tabla de resultados: {len(res['filas'])} fila(s) leídas ({res['modo']}, "
+                 f"{res['paginas']} página(s)).")
+    return res["filas"]
+
+async def ir_a_pagina(page, pagina: int, espera_ms: int = 5000) -> bool:
+    """Muestra la página 'pagina' (0 = la primera) del paginador de la tabla de resultados."""
+    return await page.evaluate("async ({pagina, esperaMs}) => {" + _JS_TABLA + """
+        if (!tbl) return false;
+        const link = linkPagina(pagina + 1);
+        if (link) { const antes = firma(); link.click(); return await esperarCambio(antes, esperaMs); }
+        for (let k = 0; k < pagina; k++) {
+            const sig = siguiente(), antes = firma();
+            if (!sig) return false;
+            sig.click();
+            if (!(await esperarCambio(antes, esperaMs))) return false;
+        }
+        return true;
+    }""", {"pagina": pagina, "esperaMs": espera_ms})
 
-    # Extraer información de la tabla dentro del iframe
-    # 11) Leer tabla de horarios disponibles (espera robusta)
-    log.info("11) Esperando que cargue la agenda dentro del iframe…")
-    try:
-        await iframe.wait_for_selector("div.horario_disponible, table.tabla_dias_horarios", timeout=10000)
-    except Exception:
-        log.warning("No se detectó ninguna celda con horario_disponible antes de timeout.")
-    
-    log.info("11) Leyendo tabla de horarios disponibles (estructura real)…")
-    horarios = await iframe.evaluate("""
+async def fila_a_la_vista(page, dl: Deadline, fila: dict) -> int:
+    """
+    rowIndex de fila en la tabla que muestra page. Si la fila no está a la vista (vino de la
+    respuesta del portal y la tabla pagina, o quedó en otra página del paginador) se relee la
+    tabla completa y, si hace falta, se va a su página.
+    """
+    # Con los resultados tomados de la respuesta del portal la tabla puede no estar dibujada todavía
+    await page.locator("#tblResultadoProfesionales tbody tr").first.wait_for(
+        state="attached", timeout=dl.ms("resultados: tabla", CFG.timeout_ms))
+    if fila.get("pagina"):
+        await ir_a_pagina(page, fila["pagina"], dl.ms("resultados: página", 5000))
+    primera = await page.evaluate("""
+        (i) => {
+            const tr = document.querySelectorAll('#tblResultadoProfesionales tbody > tr')[i];
+            const td = tr ? tr.querySelector('td') : null;
+            return td ? td.innerText : null;
+        }""", fila["rowIndex"])
+    if primera is not None and " ".join(primera.lower().split()) == " ".join(fila["profesional"].lower().split()):
+        return fila["rowIndex"]
+    log.info(f"La fila de {fila['profesional']!r} no está a la vista; se relee la tabla completa.")
+    filas = await leer_filas_dom(page, dl.ms("resultados: tabla completa", 5000))
+    propia = next((f for f in filas if clave_fila(f) == clave_fila(fila)), None)
+    if propia is None:
+        raise ErrorTransitorio(f"La fila de {fila['profesional']!r} no aparece en la tabla de resultados.")
+    if propia.get("pagina"):
+        await ir_a_pagina(page, propia["pagina"], dl.ms("resultados: página", 5000))
+    return propia["rowIndex"]
+
+async def leer_agenda_dom(iframe):
+    """
+    Turnos de la agenda renderizada, con el mismo formato que turnos.captura.parsear_agenda.
+    """
+    return await iframe.evaluate("""
         () => {
             const cab = document.querySelectorAll('table.tabla_dias_horarios th.cabecera_dia, table.tabla_dias_horarios th.cabecera_hoy');
             const dias_labels = Array.from(cab).map(th => th.innerText.trim().replace(/\\s+/g,' '));
-            const data = {};
-            for (const lbl of dias_labels) data[lbl] = [];
-    
+            const slots = [];
             const filas = document.querySelectorAll('table.tabla_dias_horarios tbody tr');
             filas.forEach(tr => {
                 const celdas = tr.querySelectorAll('td');
@@ -386,1115 +450,380 @@ async def flujo_turnos_nuevo(page):
                         const txt = div.textContent.trim();
                         if (txt) {
                             const dia = dias_labels[idx] || `Columna ${idx}`;
-                            data[dia] = data[dia] || [];
-                            data[dia].push(txt);
+                            slots.push({dia: dia, hora: txt, col: idx});
                         }
                     });
                 });
             });
-            return data;
+            return slots;
         }
     """)
 
+JS_CABECERA_SEMANA = """
+    () => Array.from(document.querySelectorAll(
+            'table.tabla_dias_horarios th.cabecera_dia, table.tabla_dias_horarios th.cabecera_hoy'))
+        .map(th => th.innerText.trim()).join('|')
+"""
 
-    if not horarios:
-        log.warning("No se detectaron horarios disponibles en la agenda.")
-    else:
-        for dia, horas in horarios.items():
-            if horas:
-                log.info(f"{dia}: {', '.join(horas)}")
-            else:
-                log.info(f"{dia}: sin horarios disponibles")
-
-    
-
-
-
-# 12) Seleccionar turno según franja horaria configurada
-    from datetime import datetime
-
-    log.info("12) Seleccionando turno dentro de franja horaria configurada…")
-
-    hora_min = os.getenv("OBJ_HORA_MIN", "00:00").strip()
-    hora_max = os.getenv("OBJ_HORA_MAX", "23:59").strip()
-    # Si alguno viene "false", asignar valores amplios por defecto
-    if hora_min.lower() == "false" or not hora_min:
-        hora_min = "00:00"
-    if hora_max.lower() == "false" or not hora_max:
-        hora_max = "23:59"
-    prioridad = (os.getenv("OBJ_HORA_PRIORIDAD", "EARLIEST") or "EARLIEST").upper()
-
-    def hora_a_minutos(h):
-        try:
-            hh, mm = map(int, h.split(":"))
-            return hh * 60 + mm
-        except Exception:
-            return None
-
-    hmin = hora_a_minutos(hora_min)
-    hmax = hora_a_minutos(hora_max)
-
-    # Buscar el primer día con horarios disponibles
-    dia_valido, horas_validas = None, []
-    for dia, horas in horarios.items():
-        if horas:
-            filtradas = []
-            for h in horas:
-                hm = hora_a_minutos(h)
-                if hm and hmin <= hm <= hmax:
-                    filtradas.append(h)
-            if filtradas:
-                dia_valido = dia
-                horas_validas = filtradas
-                break
-
-    if not dia_valido:
-        if OBJ_HORA_FLEXIBLE:
-            # No hay horario dentro del rango, tomar el primero disponible
-            for dia, horas in horarios.items():
-                if horas:
-                    dia_valido = dia
-                    hora_elegida = sorted(horas)[0]
-                    log.info(f"No se encontró horario en rango, usando primero disponible: {dia_valido} / {hora_elegida}")
-                    break
-            else:
-                log.warning("No se encontró ningún horario disponible en ningún día.")
-                return
-        else:
-            log.warning(f"No se encontró ningún horario entre {hora_min} y {hora_max}, y flexibilidad está desactivada.")
-            return
-    else:
-        if prioridad == "LATEST":
-            hora_elegida = sorted(horas_validas)[-1]
-        else:
-            hora_elegida = sorted(horas_validas)[0]
-        log.info(f"Día elegido: {dia_valido} / Hora elegida: {hora_elegida}")
-
-
-        # Click en el div correspondiente
-        log.info("Haciendo click en el horario disponible…")
-        # Buscar el div con esa hora exacta
-        await iframe.click(f"div.horario_disponible:text('{hora_elegida}')")
-        await short_sleep(0.5)
-
-
-        # 13) Esperar cuadro de confirmación
-        log.info("13) Esperando cuadro de confirmación de turno…")
-        try:
-
-            # Esperar unos instantes extra por si se está animando
-            await short_sleep(5.0)
-        
-            log.info("Cuadro de confirmación detectado. Simulando Tab + Enter para aceptar…")
-        
-            # Aseguramos foco en la página principal
-            await page.bring_to_front()
-        
-            # Tecleamos Tab (para enfocar el botón Aceptar) y luego Enter
-            await page.keyboard.press("Tab")
-            await asyncio.sleep(0.3)
-            
-            if DRY_RUN:
-                log.info("(DRY_RUN activo) No se presiona Enter; flujo detenido antes de confirmar turno.")
-                return
-            else:
-                await page.keyboard.press("Enter")
-                log.info("Teclas Tab + Enter enviadas correctamente. Esperando que se cierre el cuadro…")        
-                # Esperamos a que desaparezca el cuadro
-                await page.wait_for_selector("#pickCustomTwoButtons", state="detached", timeout=10000)
-                log.info("Cuadro de confirmación cerrado correctamente.")
-        
-        except Exception as e:
-            log.error(f"No se pudo aceptar el cuadro de confirmación: {e}")
-            return
-
-
-
-
-            # 14) Esperar cuadro final de reserva
-            log.info("14) Esperando cuadro final con datos del turno…")
-            try:
-                await page.wait_for_selector("div.pick_print table", timeout=20000)
-                turno_info = await page.evaluate("""
-                    () => {
-                        const tbl = document.querySelector("div.pick_print table");
-                        if (!tbl) return {};
-                        const txt = tbl.innerText.trim().split("\\n");
-                        return txt;
-                    }
-                """)
-                log.info("==== TURNO CONFIRMADO ====")
-                for line in turno_info:
-                    log.info(line)
-                log.info("===========================")
-            except Exception as e:
-                log.error(f"No se pudo leer la confirmación del turno: {e}")
-
-
-    log.info("10) Flujo completado. La ventana quedará ABIERTA para revisión manual.")
-
-# ================== MAIN ==================
-async def amain() -> int:
-    log.info("==== INICIO OSEP TURNOS (FLUJO NUEVO) ====")
-    if not OSEP_USER or not OSEP_PASS:
-        log.error("Definí OSEP_USER y OSEP_PASS en .env")
-        return 2
-
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=HEADLESS, args=["--no-sandbox"])
-        context = await browser.new_context()
-        page = await context.new_page()
-        await page.bring_to_front()
-        try:
-            await page.evaluate("window.moveTo(0,0); window.resizeTo(screen.availWidth, screen.availHeight);")
-        except Exception:
-            pass
-
-
-
-        try:
-            await login(page)
-
-            if STOP_AFTER_LOGIN:
-                log.info("STOP_AFTER_LOGIN activo: fin de prueba.")
-                return 0
-
-            await flujo_turnos_nuevo(page)
-            return 0
-
-        except Exception as e:
-            log.error("Error en ejecución:\n" + "".join(traceback.format_exception(e)))
-            return 3
-
-        finally:
-            try:
-                await context.close()
-            except Exception:
-                pass
-            try:
-                await browser.close()
-            except Exception:
-                pass
-
-# ================== Footer compatible Spyder/Terminal (Windows) ==================
-if __name__ == "__main__":
-    def _runner():
-        if sys.platform.startswith("win"):
-            try:
-                asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-            except Exception:
-                pass
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            rc = loop.run_until_complete(amain())
-        finally:
-            loop.run_until_complete(loop.shutdown_asyncgens())
-            loop.close()
-        os._exit(rc)
-
+async def cabecera_semana(iframe) -> str:
     try:
-        asyncio.get_running_loop()
-        t = threading.Thread(target=_runner, daemon=True)
-        t.start()
-        t.join()
-    except RuntimeError:
-        sys.exit(asyncio.run(amain()))
-
-
-# ================== ENV / CONFIG ==================
-load_dotenv()
-
-PORTAL_URL = os.getenv("PORTAL_URL", "https://www.osep.mendoza.gov.ar/webapp_pri")
-OSEP_USER  = os.getenv("OSEP_USER")
-OSEP_PASS  = os.getenv("OSEP_PASS")
-
-# Objetivos originales (algunos quedan para futuro)
-OBJ_FECHA_TXT = os.getenv("OBJ_FECHA_TXT")
-OBJ_HORA_TXT  = os.getenv("OBJ_HORA_TXT")
-OBJ_SERVICIO  = os.getenv("OBJ_SERVICIO")
-OBJ_MEDICO    = os.getenv("OBJ_MEDICO", "false")  # si "false" => no filtra por profesional
-OBJ_SEDE_TXT  = os.getenv("OBJ_SEDE_TXT")
-OBJ_ZONA   = os.getenv("OBJ_ZONA")
-OBJ_DEPTO  = os.getenv("OBJ_DEPTO")  # agregado; si querés otro, definilo en .env
-OBJ_FECHA_FLEXIBLE = os.getenv("OBJ_FECHA_FLEXIBLE", "true").lower() == "true"
-OBJ_DIA_FLEXIBLE   = os.getenv("OBJ_DIA_FLEXIBLE", "true").lower() == "true"
-OBJ_HORA_FLEXIBLE  = os.getenv("OBJ_HORA_FLEXIBLE", "true").lower() == "true"
-
-
-HEADLESS = os.getenv("HEADLESS", "true").lower() != "false"
-TOUT     = int(os.getenv("TIMEOUT_MS", "20000"))
-
-DRY_RUN            = os.getenv("DRY_RUN", "false").lower() == "true"
-STOP_AFTER_LOGIN   = os.getenv("STOP_AFTER_LOGIN", "false").lower() == "true"
-# STOP_AFTER_IFRAME ignorado en este flujo nuevo
-# STOP_AFTER_IFRAME  = os.getenv("STOP_AFTER_IFRAME", "false").lower() == "true"
-
-
-# ================== EVIDENCIAS (DESACTIVADO PARA EJECUCIÓN SIMPLE) ==================
-EVID = None  # No se crearán carpetas ni archivos de evidencia
-
-# =============================================================================
-# BASE_DIR  = pathlib.Path(r"C:\Users\Francesco Zucarello\OneDrive - Estudio Trípoli\Personal\Scripts\Turnos OSEP")
-# EVID_ROOT = BASE_DIR
-# RUN_ID    = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
-# EVID      = EVID_ROOT / f"evidencia_{RUN_ID}"
-# EVID.mkdir(parents=True, exist_ok=True)
-# =============================================================================
-
-# ================== LOGGING (solo a archivo + consola) ==================
-log = logging.getLogger("osep")
-log.setLevel(logging.DEBUG)
-formatter = logging.Formatter("%(asctime)s | %(levelname)-7s | %(message)s")
-
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setFormatter(formatter)
-log.addHandler(console_handler)
-
-log.info("Logging iniciado (solo consola, sin archivo).")
-
-# =============================================================================
-# log_file = EVID / "log.txt"
-# file_handler = logging.FileHandler(log_file, mode="w", encoding="utf-8")
-# file_handler.setFormatter(formatter)
-# log.addHandler(file_handler)
-# 
-# log.info(f"Logging iniciado. Archivo: {log_file}")
-# =============================================================================
-
-# ================== UTILS ==================
-def must_env(var: str):
-    val = os.getenv(var)
-    if not val:
-        raise RuntimeError(f"Falta variable de entorno {var}")
-    return val
-
-async def short_sleep(seconds: float = 1.0):
-    await asyncio.sleep(seconds)
-
-async def wait_blocker_gone(page, timeout_ms: int = 15000):
-    """
-    Intenta detectar overlays típicos (blockUI / overlays / toasts) y esperar a que desaparezcan.
-    """
-    end = dt.datetime.now() + dt.timedelta(milliseconds=timeout_ms)
-    sel = ".blockUI, .blockOverlay, .blockMsg, .ui-blocker, .blocker, .jq-toast-wrap, .toast, .loading, .modal-backdrop.show"
-    while dt.datetime.now() < end:
-        try:
-            cnt = await page.locator(sel).count()
-            if cnt == 0:
-                # Damos un toque de gracia y nos vamos
-                await asyncio.sleep(0.2)
-                return
-        except Exception:
-            # Si falla el locator, igual seguimos intentando hasta timeout
-            pass
-        await asyncio.sleep(0.2)
-    log.debug("wait_blocker_gone: timeout esperando que desaparezca el overlay.")
-
-# ================== FLOWS ==================
-async def login(page):
-    log.info("1) Navegando al portal…")
-    await page.goto(PORTAL_URL, wait_until="domcontentloaded", timeout=TOUT)
-
-    log.info("2) Login (usuario/contraseña)…")
-    user_sel = 'input[name="usuario"], input#usuario, input[placeholder*="Usuario" i]'
-    pass_sel = 'input[name="password"], input#password, input[placeholder*="Contraseña" i], input[type="password"]'
-    await page.locator(user_sel).first.wait_for(timeout=TOUT)
-    await page.fill(user_sel, must_env("OSEP_USER"))
-    await page.fill(pass_sel, must_env("OSEP_PASS"))
-
-    btn = page.get_by_role("button", name=re.compile(r"(ingresar|entrar|acceder|login)", re.I)).first
-    if not await btn.is_visible():
-        btn = page.locator('button:has-text("Ingresar"), input[type="submit"], a:has-text("Ingresar")').first
-    await btn.click(timeout=TOUT)
-
-    await page.wait_for_load_state("networkidle", timeout=TOUT)
-    log.info("Login: OK (si seguís viendo la pantalla de login, hay que ajustar selectores).")
-
-async def flujo_turnos_nuevo(page):
-    """
-    Luego del login:
-      - Navegar a listarCompleto
-      - Click en pestaña 'Nuevo'
-      - Seleccionar Servicio (servimod), Zona (id_zona), Depto (id_dpto)
-      - Si OBJ_MEDICO == 'false' => click Buscar
-        Else: escribir profesional, Enter, esperar overlay, luego click Buscar
-      - Esperar y leer tabla #tblResultadoProfesionales, volcar filas al log
-      - Mantener la ventana abierta para inspección manual
-    """
-    # 3) Navegación directa
-    listar_url = PORTAL_URL.rstrip("/") + "/action/applicationAfi/turnos/turno/listar/listarCompleto"
-    log.info(f"3) Navegando directo a listarCompleto: {listar_url}")
-    await page.goto(listar_url, wait_until="domcontentloaded", timeout=TOUT)
-
-    # 4) Click en pestaña "Nuevo"
-    log.info("4) Click en pestaña 'Nuevo'…")
-    # Varios selectores por las dudas:
-    nuevo_link = page.locator('a.nav-link[href="#divTNue"] >> text=Nuevo').first
-    if not await nuevo_link.is_visible():
-        nuevo_link = page.locator('a.nav-link[href="#divTNue"]').first
-    await nuevo_link.click(timeout=TOUT)
-    await short_sleep(1)
-
-    # 5) Seleccionar Servicio
-    log.info(f"5) Seleccionando servicio: {OBJ_SERVICIO!r}")
-    serv_sel = page.locator("select#servimod")
-    await serv_sel.wait_for(timeout=TOUT)
-    # Intentar por label (visible text)
-    try:
-        await serv_sel.select_option(label=OBJ_SERVICIO.strip())
-    except Exception:
-        # Plan B: igualar por mayúsculas usando evaluate
-        await page.evaluate(
-            """(svc_text) => {
-                const sel = document.querySelector('#servimod');
-                if (!sel) return;
-                const t = (svc_text||'').trim().toUpperCase();
-                for (const opt of sel.options) {
-                    if ((opt.textContent||'').trim().toUpperCase() === t) {
-                        sel.value = opt.value;
-                        sel.dispatchEvent(new Event('change', {bubbles:true}));
-                        break;
-                    }
-                }
-            }""",
-            OBJ_SERVICIO
-        )
-    await short_sleep(1)
-
-    # 6) Seleccionar Zona
-    log.info(f"6) Seleccionando zona: {OBJ_ZONA!r}")
-    zona_sel = page.locator("select#id_zona")
-    await zona_sel.wait_for(timeout=TOUT)
-    try:
-        await zona_sel.select_option(label=OBJ_ZONA.strip())
-    except Exception:
-        await page.evaluate(
-            """(zona_text) => {
-                const sel = document.querySelector('#id_zona');
-                if (!sel) return;
-                const t = (zona_text||'').trim().toUpperCase();
-                for (const opt of sel.options) {
-                    if ((opt.textContent||'').trim().toUpperCase() === t) {
-                        sel.value = opt.value;
-                        sel.dispatchEvent(new Event('change', {bubbles:true}));
-                        break;
-                    }
-                }
-            }""",
-            OBJ_ZONA
-        )
-
-    # IMPORTANTE: el cambio de zona dispara cargar departamentos
-    # Damos un pequeño tiempo para que se complete esa carga
-    await short_sleep(0.8)
-
-    # 7) Seleccionar Departamento
-    log.info(f"7) Seleccionando departamento: {OBJ_DEPTO!r}")
-    dpto_sel = page.locator("select#id_dpto")
-    await dpto_sel.wait_for(timeout=TOUT)
-    try:
-        await dpto_sel.select_option(label=OBJ_DEPTO.strip())
+        return await iframe.evaluate(JS_CABECERA_SEMANA)
     except Exception:
-        await page.evaluate(
-            """(dep_text) => {
-                const sel = document.querySelector('#id_dpto');
-                if (!sel) return;
-                const t = (dep_text||'').trim().toUpperCase();
-                for (const opt of sel.options) {
-                    if ((opt.textContent||'').trim().toUpperCase() === t) {
-                        sel.value = opt.value;
-                        sel.dispatchEvent(new Event('change', {bubbles:true}));
-                        break;
-                    }
-                }
-            }""",
-            OBJ_DEPTO
-        )
-    await short_sleep(1)
-
-    # 8) Lógica del profesional (OBJ_MEDICO)
-    buscar_btn = page.locator('input#buscar.button.buscar').first
-    prof_input = page.locator('input#profesionalBusquedaComodin_turn')
-
-    obj_medico_txt = (OBJ_MEDICO or "").strip()
-    if obj_medico_txt.lower() == "false" or obj_medico_txt == "":
-        log.info("8) OBJ_MEDICO = false => no se filtra por profesional; se clickea 'Buscar'.")
-        try:
-            await buscar_btn.click(timeout=TOUT)
-        except Exception as e:
-            log.warning(f"No pude hacer click en Buscar de forma directa ({e}); intento alternativo…")
-            await page.locator("input#buscar").first.click()
-    else:
-        log.info(f"8) Filtrando por profesional: {obj_medico_txt!r}")
-        await prof_input.wait_for(timeout=TOUT)
-        # limpiar + tipear
-        await prof_input.fill("")
-        await prof_input.fill(obj_medico_txt)
-        # Enter para disparar buscador/loader
-        await prof_input.press("Enter")
-        # Esperar overlay/toaster cargue y se vaya
-        await wait_blocker_gone(page, timeout_ms=20000)
-        # Y recién ahí Buscar
-        await buscar_btn.click(timeout=TOUT)
-
-    # 9) Esperar tabla de resultados y volcarla al log
-    log.info("9) Esperando tabla de resultados…")
-    tabla = page.locator("#tblResultadoProfesionales")
-    await tabla.wait_for(timeout=TOUT)
-
-    # Scraping de filas
-    filas = await page.evaluate("""
-        () => {
-            const tbl = document.querySelector('#tblResultadoProfesionales');
-            const out = [];
-            if (!tbl) return out;
-            const rows = tbl.querySelectorAll('tbody tr');
-            for (const tr of rows) {
-                const tds = tr.querySelectorAll('td');
-                if (tds.length < 6) continue;
-                const toText = (el) => (el ? el.innerText.trim().replace(/\\s+\\n/g, "\\n").replace(/\\s+/g,' ').trim() : "");
-                out.push({
-                    profesional: toText(tds[0]),
-                    domicilio:   toText(tds[1]),
-                    servicio:    toText(tds[2]),
-                    horario:     toText(tds[3]),
-                    disp:        toText(tds[4]),
-                    agenda:      toText(tds[5]),
-                    rowIndex:    Array.from(tr.parentNode.children).indexOf(tr)
-                });
-            }
-            return out;
-        }
-    """)
-
-    if not filas:
-        log.warning("No se encontraron filas en la tabla (0 resultados).")
-        return
-
-    log.info(f"Resultados detectados: {len(filas)} fila(s).")
-
-    # ---------------- FILTROS ----------------
-    prof_filtro = (os.getenv("OBJ_PROFESIONAL") or "").strip().lower()
-    dom_filtro  = (os.getenv("OBJ_DOMICILIO") or "").strip().lower()
-    hor_filtro  = (os.getenv("OBJ_HORARIO_TURNO") or "").strip().lower()
-    dias_filtro = [d.strip().upper() for d in (os.getenv("OBJ_DIAS_VALIDOS") or "").split(",") if d.strip()]
-    fecha_filtro = (os.getenv("OBJ_FECHA_DISP") or "").strip()
-
-    def cumple(f):
-        # Profesional
-        if prof_filtro and prof_filtro != "false" and prof_filtro not in f["profesional"].lower():
-            return False
-        # Domicilio
-        if dom_filtro and dom_filtro != "false" and dom_filtro not in f["domicilio"].lower():
-            return False
-        # Horario
-        if hor_filtro and hor_filtro != "false" and hor_filtro not in f["horario"].lower():
-            return False
-        # Días válidos
-        if dias_filtro and not any(d in f["horario"].upper() for d in dias_filtro):
-            return False
-        # Fecha DISP
-        if fecha_filtro and fecha_filtro != "false" and f["disp"] != fecha_filtro:
-            return False
-        # Si disp es --- descartamos (sin disponibilidad)
-        if f["disp"].strip() == "---":
-            return False
-        return True
-
-    candidatas = [f for f in filas if cumple(f)]
-
-    # Si no hay coincidencias exactas, elegimos la más próxima por fecha
-    from datetime import datetime
-    
-    if not candidatas:
-        hoy = datetime.now()
-        fechas_validas = []
-        for f in filas:
-            try:
-                if f["disp"].strip() == "---":
-                    continue
-                fecha = datetime.strptime(f["disp"], "%d-%m-%Y")
-                if fecha >= hoy:
-                    fechas_validas.append((fecha, f))
-            except Exception:
-                continue
-    
-        if fecha_filtro and not OBJ_FECHA_FLEXIBLE:
-            log.warning("No se encontró la fecha exacta y la flexibilidad está desactivada.")
-            return
-    
-        if fechas_validas:
-            fechas_validas.sort(key=lambda x: x[0])
-            candidatas = [fechas_validas[0][1]]
-            log.info(f"Usando la más próxima: {candidatas[0]['disp']}")
-        else:
-            log.warning("No hay fechas disponibles próximas.")
-            return
-
-
-    objetivo = candidatas[0]
-    log.info(f"Seleccionada: {objetivo}")
-
-    # Click en el ícono "Ver Agenda"
-    fila_index = objetivo["rowIndex"]
-    log.info(f"Haciendo click en 'Ver Agenda' (fila {fila_index})…")
-    agenda_icon = page.locator(f"#tblResultadoProfesionales tbody tr:nth-of-type({fila_index + 1}) img#img_agenda_prof")
-    await agenda_icon.first.click(timeout=TOUT)
-
-    # Esperar a que desaparezca el overlay/toaster
-    await wait_blocker_gone(page, timeout_ms=20000)
-
-    # 10) Leer iframe de la agenda
-    log.info("10) Esperando iframe de Agenda…")
-    iframe = None
-    for _ in range(20):
-        for f in page.frames:
-            if "pickMostrarAgenda_iframe" in (f.name or ""):
-                iframe = f
-                break
-        if iframe:
-            break
-        await asyncio.sleep(0.5)
-    if not iframe:
-        log.error("No encontré el iframe de agenda.")
-        return
-
-    # Extraer información de la tabla dentro del iframe
-    # 11) Leer tabla de horarios disponibles (espera robusta)
-    log.info("11) Esperando que cargue la agenda dentro del iframe…")
-    try:
-        await iframe.wait_for_selector("div.horario_disponible, table.tabla_dias_horarios", timeout=10000)
-    except Exception:
-        log.warning("No se detectó ninguna celda con horario_disponible antes de timeout.")
-    
-    log.info("11) Leyendo tabla de horarios disponibles (estructura real)…")
-    horarios = await iframe.evaluate("""
-        () => {
-            const cab = document.querySelectorAll('table.tabla_dias_horarios th.cabecera_dia, table.tabla_dias_horarios th.cabecera_hoy');
-            const dias_labels = Array.from(cab).map(th => th.innerText.trim().replace(/\\s+/g,' '));
-            const data = {};
-            for (const lbl of dias_labels) data[lbl] = [];
-    
-            const filas = document.querySelectorAll('table.tabla_dias_horarios tbody tr');
-            filas.forEach(tr => {
-                const celdas = tr.querySelectorAll('td');
-                celdas.forEach((td, idx) => {
-                    const divs = td.querySelectorAll('div.horario_disponible');
-                    divs.forEach(div => {
-                        const txt = div.textContent.trim();
-                        if (txt) {
-                            const dia = dias_labels[idx] || `Columna ${idx}`;
-                            data[dia] = data[dia] || [];
-                            data[dia].push(txt);
-                        }
-                    });
-                });
-            });
-            return data;
-        }
-    """)
-
-
-    if not horarios:
-        log.warning("No se detectaron horarios disponibles en la agenda.")
-    else:
-        for dia, horas in horarios.items():
-            if horas:
-                log.info(f"{dia}: {', '.join(horas)}")
-            else:
-                log.info(f"{dia}: sin horarios disponibles")
-
-    
-
-
-
-# 12) Seleccionar turno según franja horaria configurada
-    from datetime import datetime
-
-    log.info("12) Seleccionando turno dentro de franja horaria configurada…")
-
-    hora_min = os.getenv("OBJ_HORA_MIN", "00:00").strip()
-    hora_max = os.getenv("OBJ_HORA_MAX", "23:59").strip()
-    # Si alguno viene "false", asignar valores amplios por defecto
-    if hora_min.lower() == "false" or not hora_min:
-        hora_min = "00:00"
-    if hora_max.lower() == "false" or not hora_max:
-        hora_max = "23:59"
-    prioridad = (os.getenv("OBJ_HORA_PRIORIDAD", "EARLIEST") or "EARLIEST").upper()
-
-    def hora_a_minutos(h):
-        try:
-            hh, mm = map(int, h.split(":"))
-            return hh * 60 + mm
-        except Exception:
-            return None
-
-    hmin = hora_a_minutos(hora_min)
-    hmax = hora_a_minutos(hora_max)
-
-    # Buscar el primer día con horarios disponibles
-    dia_valido, horas_validas = None, []
-    for dia, horas in horarios.items():
-        if horas:
-            filtradas = []
-            for h in horas:
-                hm = hora_a_minutos(h)
-                if hm and hmin <= hm <= hmax:
-                    filtradas.append(h)
-            if filtradas:
-                dia_valido = dia
-                horas_validas = filtradas
-                break
-
-    if not dia_valido:
-        if OBJ_HORA_FLEXIBLE:
-            # No hay horario dentro del rango, tomar el primero disponible
-            for dia, horas in horarios.items():
-                if horas:
-                    dia_valido = dia
-                    hora_elegida = sorted(horas)[0]
-                    log.info(f"No se encontró horario en rango, usando primero disponible: {dia_valido} / {hora_elegida}")
-                    break
-            else:
-                log.warning("No se encontró ningún horario disponible en ningún día.")
-                return
-        else:
-            log.warning(f"No se encontró ningún horario entre {hora_min} y {hora_max}, y flexibilidad está desactivada.")
-            return
-    else:
-        if prioridad == "LATEST":
-            hora_elegida = sorted(horas_validas)[-1]
-        else:
-            hora_elegida = sorted(horas_validas)[0]
-        log.info(f"Día elegido: {dia_valido} / Hora elegida: {hora_elegida}")
-
-
-        # Click en el div correspondiente
-        log.info("Haciendo click en el horario disponible…")
-        # Buscar el div con esa hora exacta
-        await iframe.click(f"div.horario_disponible:text('{hora_elegida}')")
-        await short_sleep(0.5)
-
-
-        # 13) Esperar cuadro de confirmación
-        log.info("13) Esperando cuadro de confirmación de turno…")
-        try:
-
-            # Esperar unos instantes extra por si se está animando
-            await short_sleep(5.0)
-        
-            log.info("Cuadro de confirmación detectado. Simulando Tab + Enter para aceptar…")
-        
-            # Aseguramos foco en la página principal
-            await page.bring_to_front()
-        
-            # Tecleamos Tab (para enfocar el botón Aceptar) y luego Enter
-            await page.keyboard.press("Tab")
-            await asyncio.sleep(0.3)
-            
-            if DRY_RUN:
-                log.info("(DRY_RUN activo) No se presiona Enter; flujo detenido antes de confirmar turno.")
-                return
-            else:
-                await page.keyboard.press("Enter")
-                log.info("Teclas Tab + Enter enviadas correctamente. Esperando que se cierre el cuadro…")        
-                # Esperamos a que desaparezca el cuadro
-                await page.wait_for_selector("#pickCustomTwoButtons", state="detached", timeout=10000)
-                log.info("Cuadro de confirmación cerrado correctamente.")
-        
-        except Exception as e:
-            log.error(f"No se pudo aceptar el cuadro de confirmación: {e}")
-            return
-
-
-
-
-            # 14) Esperar cuadro final de reserva
-            log.info("14) Esperando cuadro final con datos del turno…")
-            try:
-                await page.wait_for_selector("div.pick_print table", timeout=20000)
-                turno_info = await page.evaluate("""
-                    () => {
-                        const tbl = document.querySelector("div.pick_print table");
-                        if (!tbl) return {};
-                        const txt = tbl.innerText.trim().split("\\n");
-                        return txt;
-                    }
-                """)
-                log.info("==== TURNO CONFIRMADO ====")
-                for line in turno_info:
-                    log.info(line)
-                log.info("===========================")
-            except Exception as e:
-                log.error(f"No se pudo leer la confirmación del turno: {e}")
-
-
-    log.info("10) Flujo completado. La ventana quedará ABIERTA para revisión manual.")
-
-# ================== MAIN ==================
-async def amain() -> int:
-    log.info("==== INICIO OSEP TURNOS (FLUJO NUEVO) ====")
-    if not OSEP_USER or not OSEP_PASS:
-        log.error("Definí OSEP_USER y OSEP_PASS en .env")
-        return 2
-
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=HEADLESS, args=["--no-sandbox"])
-        context = await browser.new_context()
-        page = await context.new_page()
-        await page.bring_to_front()
-        try:
-            await page.evaluate("window.moveTo(0,0); window.resizeTo(screen.availWidth, screen.availHeight);")
-        except Exception:
-            pass
-
-
-
-        try:
-            await login(page)
-
-            if STOP_AFTER_LOGIN:
-                log.info("STOP_AFTER_LOGIN activo: fin de prueba.")
-                return 0
-
-            await flujo_turnos_nuevo(page)
-            return 0
-
-        except Exception as e:
-            log.error("Error en ejecución:\n" + "".join(traceback.format_exception(e)))
-            return 3
-
-        finally:
-            try:
-                await context.close()
-            except Exception:
-                pass
-            try:
-                await browser.close()
-            except Exception:
-                pass
-
-# ================== Footer compatible Spyder/Terminal (Windows) ==================
-if __name__ == "__main__":
-    def _runner():
-        if sys.platform.startswith("win"):
-            try:
-                asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-            except Exception:
-                pass
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            rc = loop.run_until_complete(amain())
-        finally:
-            loop.run_until_complete(loop.shutdown_asyncgens())
-            loop.close()
-        os._exit(rc)
-
-    try:
-        asyncio.get_running_loop()
-        t = threading.Thread(target=_runner, daemon=True)
-        t.start()
-        t.join()
-    except RuntimeError:
-        sys.exit(asyncio.run(amain()))
-
-
-# ================== ENV / CONFIG ==================
-load_dotenv()
-
-PORTAL_URL = os.getenv("PORTAL_URL", "https://www.osep.mendoza.gov.ar/webapp_pri")
-OSEP_USER  = os.getenv("OSEP_USER")
-OSEP_PASS  = os.getenv("OSEP_PASS")
-
-# Objetivos originales (algunos quedan para futuro)
-OBJ_FECHA_TXT = os.getenv("OBJ_FECHA_TXT")
-OBJ_HORA_TXT  = os.getenv("OBJ_HORA_TXT")
-OBJ_SERVICIO  = os.getenv("OBJ_SERVICIO")
-OBJ_MEDICO    = os.getenv("OBJ_MEDICO", "false")  # si "false" => no filtra por profesional
-OBJ_SEDE_TXT  = os.getenv("OBJ_SEDE_TXT")
-OBJ_ZONA   = os.getenv("OBJ_ZONA")
-OBJ_DEPTO  = os.getenv("OBJ_DEPTO")  # agregado; si querés otro, definilo en .env
-OBJ_FECHA_FLEXIBLE = os.getenv("OBJ_FECHA_FLEXIBLE", "true").lower() == "true"
-OBJ_DIA_FLEXIBLE   = os.getenv("OBJ_DIA_FLEXIBLE", "true").lower() == "true"
-OBJ_HORA_FLEXIBLE  = os.getenv("OBJ_HORA_FLEXIBLE", "true").lower() == "true"
-
-
-HEADLESS = os.getenv("HEADLESS", "true").lower() != "false"
-TOUT     = int(os.getenv("TIMEOUT_MS", "20000"))
-
-DRY_RUN            = os.getenv("DRY_RUN", "false").lower() == "true"
-STOP_AFTER_LOGIN   = os.getenv("STOP_AFTER_LOGIN", "false").lower() == "true"
-# STOP_AFTER_IFRAME ignorado en este flujo nuevo
-# STOP_AFTER_IFRAME  = os.getenv("STOP_AFTER_IFRAME", "false").lower() == "true"
-
-
-# ================== EVIDENCIAS (DESACTIVADO PARA EJECUCIÓN SIMPLE) ==================
-EVID = None  # No se crearán carpetas ni archivos de evidencia
-
-# =============================================================================
-# BASE_DIR  = pathlib.Path(r"C:\Users\Francesco Zucarello\OneDrive - Estudio Trípoli\Personal\Scripts\Turnos OSEP")
-# EVID_ROOT = BASE_DIR
-# RUN_ID    = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
-# EVID      = EVID_ROOT / f"evidencia_{RUN_ID}"
-# EVID.mkdir(parents=True, exist_ok=True)
-# =============================================================================
-
-# ================== LOGGING (solo a archivo + consola) ==================
-log = logging.getLogger("osep")
-log.setLevel(logging.DEBUG)
-formatter = logging.Formatter("%(asctime)s | %(levelname)-7s | %(message)s")
-
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setFormatter(formatter)
-log.addHandler(console_handler)
-
-log.info("Logging iniciado (solo consola, sin archivo).")
-
-# =============================================================================
-# log_file = EVID / "log.txt"
-# file_handler = logging.FileHandler(log_file, mode="w", encoding="utf-8")
-# file_handler.setFormatter(formatter)
-# log.addHandler(file_handler)
-# 
-# log.info(f"Logging iniciado. Archivo: {log_file}")
-# =============================================================================
-
-# ================== UTILS ==================
-def must_env(var: str):
-    val = os.getenv(var)
-    if not val:
-        raise RuntimeError(f"Falta variable de entorno {var}")
-    return val
-
-async def short_sleep(seconds: float = 1.0):
-    await asyncio.sleep(seconds)
-
-async def wait_blocker_gone(page, timeout_ms: int = 15000):
-    """
-    Intenta detectar overlays típicos (blockUI / overlays / toasts) y esperar a que desaparezcan.
+        return ""
+
+async def clickear_semana(iframe, sel: str, timeout_ms: int) -> bool:
+    """Click en el botón de semana siguiente/anterior del iframe. False si no hay botón."""
+    boton = iframe.locator(sel).first
+    if not await boton.count() or not await boton.is_visible():
+        return False
+    await boton.click(timeout=timeout_ms)
+    return True
+
+async def esperar_cambio_semana(iframe, previa: str, timeout_ms: int):
+    """Espera a que las cabeceras de la agenda dejen de ser las de la semana anterior."""
+    await iframe.wait_for_function(
+        f"(previa) => {{ const h = ({JS_CABECERA_SEMANA})(); return h !== '' && h !== previa; }}",
+        arg=previa, timeout=timeout_ms)
+
+async def columna_coincide(iframe, slot: dict) -> bool:
     """
-    end = dt.datetime.now() + dt.timedelta(milliseconds=timeout_ms)
-    sel = ".blockUI, .blockOverlay, .blockMsg, .ui-blocker, .blocker, .jq-toast-wrap, .toast, .loading, .modal-backdrop.show"
-    while dt.datetime.now() < end:
-        try:
-            cnt = await page.locator(sel).count()
-            if cnt == 0:
-                # Damos un toque de gracia y nos vamos
-                await asyncio.sleep(0.2)
-                return
-        except Exception:
-            # Si falla el locator, igual seguimos intentando hasta timeout
-            pass
-        await asyncio.sleep(0.2)
-    log.debug("wait_blocker_gone: timeout esperando que desaparezca el overlay.")
+    La columna slot["col"] de la semana que muestra el iframe es el día del slot (misma fecha
+    o, con cabeceras sin fecha, mismo rótulo). Así no se reserva otro día si la grilla cambió.
+    """
+    cabeceras = [" ".join(c.split()) for c in (await cabecera_semana(iframe)).split("|")]
+    col = slot.get("col")
+    if col is None or col >= len(cabeceras):
+        return False
+    rotulo = cabeceras[col]
+    if slot.get("fecha"):
+        fecha = parsear_fecha_cabecera(rotulo, slot.get("semana", 0))
+        return fecha is not None and fecha.isoformat() == slot["fecha"]
+    return slot["dia"] == rotulo or slot["dia"].startswith(f"{rotulo} (sem. ")
+
+def selector_horario(slot: dict) -> str:
+    """El horario exacto dentro de la columna de su día (la misma hora puede estar en otros días)."""
+    return (f"table.tabla_dias_horarios tbody tr > td:nth-of-type({slot['col'] + 1}) "
+            f"div.horario_disponible:text-is('{slot['hora']}')")
+
+async def ir_a_semana(estado, destino: int, dl: Deadline, reserva: bool = True):
+    """Mueve el iframe de la agenda hasta la semana destino (para clickear un horario de ahí)."""
+    while estado.semana_iframe != destino:
+        paso = 1 if destino > estado.semana_iframe else -1
+        sel = CFG.agenda_siguiente_sel if paso > 0 else CFG.agenda_anterior_sel
+        previa = await cabecera_semana(estado.iframe)
+        if not await clickear_semana(estado.iframe, sel, dl.ms("agenda: cambiar semana", CFG.timeout_ms, reserva)):
+            raise ErrorTransitorio(f"No encontré el botón para ir a la semana {destino + 1} de la agenda.")
+        await esperar_cambio_semana(estado.iframe, previa, dl.ms("agenda: cambiar semana", 10000, reserva))
+        estado.semana_iframe += paso
 
 # ================== FLOWS ==================
-async def login(page):
+async def login(page, dl: Deadline, cuenta: Cuenta):
     log.info("1) Navegando al portal…")
-    await page.goto(PORTAL_URL, wait_until="domcontentloaded", timeout=TOUT)
+    await LIMITADOR.adquirir("navegacion")
+    resp = await page.goto(CFG.portal_url, wait_until="domcontentloaded", timeout=dl.ms("1) portal", CFG.timeout_ms))
+    if resp is not None and resp.status >= 500:
+        raise PortalCaido(f"El portal respondió HTTP {resp.status}.")
 
     log.info("2) Login (usuario/contraseña)…")
     user_sel = 'input[name="usuario"], input#usuario, input[placeholder*="Usuario" i]'
     pass_sel = 'input[name="password"], input#password, input[placeholder*="Contraseña" i], input[type="password"]'
-    await page.locator(user_sel).first.wait_for(timeout=TOUT)
-    await page.fill(user_sel, must_env("OSEP_USER"))
-    await page.fill(pass_sel, must_env("OSEP_PASS"))
-
-    btn = page.get_by_role("button", name=re.compile(r"(ingresar|entrar|acceder|login)", re.I)).first
-    if not await btn.is_visible():
-        btn = page.locator('button:has-text("Ingresar"), input[type="submit"], a:has-text("Ingresar")').first
-    await btn.click(timeout=TOUT)
-
-    await page.wait_for_load_state("networkidle", timeout=TOUT)
-    log.info("Login: OK (si seguís viendo la pantalla de login, hay que ajustar selectores).")
-
-async def flujo_turnos_nuevo(page):
+    await page.locator(user_sel).first.wait_for(timeout=dl.ms("2) login", CFG.timeout_ms))
+    await page.fill(user_sel, cuenta.usuario)
+    await page.fill(pass_sel, cuenta.password)
+
+    # Documentos que carga el frame principal después del click (para ver 5xx y recargas del login)
+    documentos = []
+    def al_responder(r):
+        if r.request.resource_type == "document" and r.frame == page.main_frame:
+            documentos.append(r.status)
+    url_login = page.url
+    cookies_antes = {c["name"]: c["value"] for c in await page.context.cookies()}
+    page.on("response", al_responder)
+    try:
+        await LIMITADOR.adquirir("navegacion")
+        await clickear_variante("login: Ingresar", {
+            "rol": page.get_by_role("button", name=re.compile(r"(ingresar|entrar|acceder|login)", re.I)).first,
+            "css": page.locator('button:has-text("Ingresar"), input[type="submit"], a:has-text("Ingresar")').first,
+        }, dl.ms("2) login", CFG.timeout_ms))
+        t0 = time.monotonic()
+        senal = await esperar_login(page, dl, pass_sel, url_login, cookies_antes, documentos)
+    finally:
+        page.remove_listener("response", al_responder)
+    log.info(f"Login: OK ({senal}, {time.monotonic() - t0:.1f}s).")
+
+async def visible(page, sel: str) -> bool:
+    return bool(sel) and await page.locator(sel).first.is_visible()
+
+async def esperar_login(page, dl: Deadline, pass_sel: str, url_login: str, cookies_antes: dict, documentos: list) -> str:
     """
-    Luego del login:
-      - Navegar a listarCompleto
-      - Click en pestaña 'Nuevo'
-      - Seleccionar Servicio (servimod), Zona (id_zona), Depto (id_dpto)
-      - Si OBJ_MEDICO == 'false' => click Buscar
-        Else: escribir profesional, Enter, esperar overlay, luego click Buscar
-      - Esperar y leer tabla #tblResultadoProfesionales, volcar filas al log
-      - Mantener la ventana abierta para inspección manual
+    2b) En vez de esperar networkidle (el portal puede no quedarse nunca quieto), se mira cada
+    200 ms la primera señal concreta y se vuelve apenas la sesión sirve:
+      éxito: elemento de sesión iniciada (LOGIN_OK_SEL), URL distinta sin formulario de login,
+             o cookie de sesión nueva/cambiada (LOGIN_COOKIE)
+      error: captcha -> CaptchaRequerido; 5xx / página de error -> PortalCaido;
+             mensaje de error o formulario recargado -> CredencialesInvalidas
+    Devuelve la señal de éxito; sin ninguna señal dentro del timeout, ErrorTransitorio.
     """
+    fin = time.monotonic() + dl.ms("2) login", CFG.timeout_ms) / 1000
+    recargado_desde = None
+    while True:
+        try:
+            if await visible(page, CFG.login_captcha_sel):
+                raise CaptchaRequerido("El portal pide captcha en el login.")
+            if documentos and documentos[-1] >= 500:
+                raise PortalCaido(f"El login respondió HTTP {documentos[-1]}.")
+            titulo = await page.title()
+            if RE_PORTAL_CAIDO.search(titulo):
+                raise PortalCaido(f"El portal muestra una página de error ({titulo!r}).")
+            if await visible(page, CFG.login_ok_sel):
+                return "elemento de sesión"
+            formulario = await visible(page, pass_sel)
+            if not formulario and page.url.split("#")[0] != url_login.split("#")[0]:
+                return "cambio de URL"
+            if CFG.login_cookie:
+                for c in await page.context.cookies():
+                    if re.search(CFG.login_cookie, c["name"]) and cookies_antes.get(c["name"]) != c["value"]:
+                        return f"cookie {c['name']}"
+            if await visible(page, CFG.login_error_sel):
+                texto = " ".join((await page.locator(CFG.login_error_sel).first.inner_text()).split())
+                if RE_PORTAL_CAIDO.search(texto):
+                    raise PortalCaido(f"El portal informa: {texto!r}")
+                raise CredencialesInvalidas(f"El portal rechazó el login: {texto!r}")
+            # Formulario recargado (sin mensaje): se da un momento por si es un paso intermedio
+            if formulario and documentos:
+                recargado_desde = recargado_desde or time.monotonic()
+                if time.monotonic() - recargado_desde > 2.0:
+                    raise CredencialesInvalidas("El portal volvió a mostrar el formulario de login "
+                                                "(¿usuario/contraseña incorrectos?)")
+        except PWError as e:
+            # Contexto destruido a mitad de una navegación: se vuelve a mirar en la próxima vuelta
+            log.debug(f"Login: página navegando ({e.__class__.__name__}).")
+        if time.monotonic() >= fin:
+            raise ErrorTransitorio("Login: sin señal de éxito ni de error dentro del timeout.")
+        await asyncio.sleep(0.2)
+
+# ---------------- PASOS / CHECKPOINTS ----------------
+# Orden de los checkpoints del flujo. Cada paso deja su checkpoint al terminar y,
+# ante un reintento (o un nuevo ciclo del daemon), se reanuda desde el último válido.
+CHECKPOINTS = ("sesion", "formulario", "resultados", "agenda", "turno", "confirmado")
+
+@dataclasses.dataclass
+class EstadoFlujo:
+    cuenta: Cuenta
+    obj: Objetivo                         # qué se busca (servicio/zona/filtros)
+    checkpoint: Optional[str] = None      # último paso completado
+    fin: Optional[str] = None             # motivo por el que el flujo terminó antes de confirmar
+    filas: list = dataclasses.field(default_factory=list)
+    filas_pagina: list = dataclasses.field(default_factory=list)   # filas de la tabla de la página principal
+    candidatas: list = dataclasses.field(default_factory=list)     # en orden; la primera es objetivo
+    atajo: bool = False                   # resultados sin buscar en la página (atajo o caché): no tiene la tabla
+    objetivo: Optional[dict] = None       # fila elegida de #tblResultadoProfesionales
+    slots: list = dataclasses.field(default_factory=list)
+    iframe: object = None                 # frame de la agenda (para clickear el horario)
+    pagina: object = None                 # página donde quedó abierta esa agenda (None = la principal)
+    carriles: list = dataclasses.field(default_factory=list)       # páginas auxiliares de paso_agenda
+    semana_iframe: int = 0                # semana que muestra el iframe (0 = la que abre)
+    eleccion: Optional[tuple] = None      # (dia, hora) clickeado
+    confirmacion: list = dataclasses.field(default_factory=list)
+    tiempos: dict = dataclasses.field(default_factory=dict)   # paso -> segundos acumulados
+
+    def llego(self, paso: str) -> bool:
+        return self.checkpoint is not None and CHECKPOINTS.index(self.checkpoint) >= CHECKPOINTS.index(paso)
+
+    def volver_a(self, paso: Optional[str]):
+        """Descarta los checkpoints posteriores a paso (None = desde cero)."""
+        if paso is None or (self.checkpoint and CHECKPOINTS.index(self.checkpoint) > CHECKPOINTS.index(paso)):
+            self.checkpoint = paso
+        idx = -1 if paso is None else CHECKPOINTS.index(paso)
+        if idx < CHECKPOINTS.index("resultados"):
+            self.filas, self.filas_pagina, self.candidatas, self.objetivo = [], [], [], None
+            self.atajo = False
+        if idx < CHECKPOINTS.index("agenda"):
+            self.slots, self.iframe, self.semana_iframe, self.pagina = [], None, 0, None
+        if idx < CHECKPOINTS.index("turno"):
+            self.eleccion = None
+        if idx < CHECKPOINTS.index("confirmado"):
+            self.confirmacion = []
+        self.fin = None
+
+    def resumen_tiempos(self) -> str:
+        return " | ".join(f"{p} {self.tiempos[p]:.1f}s" for p in CHECKPOINTS if p in self.tiempos)
+
+
+async def paso_sesion(page, dl: Deadline, estado: EstadoFlujo, captura):
+    await login(page, dl, estado.cuenta)
+
+async def abrir_formulario(page, dl: Deadline, servicio: str):
     # 3) Navegación directa
-    listar_url = PORTAL_URL.rstrip("/") + "/action/applicationAfi/turnos/turno/listar/listarCompleto"
+    listar_url = CFG.portal_url.rstrip("/") + "/action/applicationAfi/turnos/turno/listar/listarCompleto"
     log.info(f"3) Navegando directo a listarCompleto: {listar_url}")
-    await page.goto(listar_url, wait_until="domcontentloaded", timeout=TOUT)
+    await LIMITADOR.adquirir("navegacion")
+    await page.goto(listar_url, wait_until="domcontentloaded", timeout=dl.ms("3) listarCompleto", CFG.timeout_ms))
 
     # 4) Click en pestaña "Nuevo"
     log.info("4) Click en pestaña 'Nuevo'…")
     # Varios selectores por las dudas:
-    nuevo_link = page.locator('a.nav-link[href="#divTNue"] >> text=Nuevo').first
-    if not await nuevo_link.is_visible():
-        nuevo_link = page.locator('a.nav-link[href="#divTNue"]').first
-    await nuevo_link.click(timeout=TOUT)
+    await clickear_variante("pestaña Nuevo", {
+        "texto": page.locator('a.nav-link[href="#divTNue"] >> text=Nuevo').first,
+        "href": page.locator('a.nav-link[href="#divTNue"]').first,
+    }, dl.ms("4) pestaña Nuevo", CFG.timeout_ms))
     await short_sleep(1)
 
     # 5) Seleccionar Servicio
-    log.info(f"5) Seleccionando servicio: {OBJ_SERVICIO!r}")
-    serv_sel = page.locator("select#servimod")
-    await serv_sel.wait_for(timeout=TOUT)
-    # Intentar por label (visible text)
-    try:
-        await serv_sel.select_option(label=OBJ_SERVICIO.strip())
-    except Exception:
-        # Plan B: igualar por mayúsculas usando evaluate
-        await page.evaluate(
-            """(svc_text) => {
-                const sel = document.querySelector('#servimod');
-                if (!sel) return;
-                const t = (svc_text||'').trim().toUpperCase();
-                for (const opt of sel.options) {
-                    if ((opt.textContent||'').trim().toUpperCase() === t) {
-                        sel.value = opt.value;
-                        sel.dispatchEvent(new Event('change', {bubbles:true}));
-                        break;
-                    }
-                }
-            }""",
-            OBJ_SERVICIO
-        )
+    log.info(f"5) Seleccionando servicio: {servicio!r}")
+    await seleccionar_por_texto(page, "select#servimod", servicio, dl.ms("5) servicio", CFG.timeout_ms))
     await short_sleep(1)
 
+async def elegir_zona_depto(page, dl: Deadline, zona: str, depto: str):
     # 6) Seleccionar Zona
-    log.info(f"6) Seleccionando zona: {OBJ_ZONA!r}")
-    zona_sel = page.locator("select#id_zona")
-    await zona_sel.wait_for(timeout=TOUT)
-    try:
-        await zona_sel.select_option(label=OBJ_ZONA.strip())
-    except Exception:
-        await page.evaluate(
-            """(zona_text) => {
-                const sel = document.querySelector('#id_zona');
-                if (!sel) return;
-                const t = (zona_text||'').trim().toUpperCase();
-                for (const opt of sel.options) {
-                    if ((opt.textContent||'').trim().toUpperCase() === t) {
-                        sel.value = opt.value;
-                        sel.dispatchEvent(new Event('change', {bubbles:true}));
-                        break;
-                    }
-                }
-            }""",
-            OBJ_ZONA
-        )
+    log.info(f"6) Seleccionando zona: {zona!r}")
+    await seleccionar_por_texto(page, "select#id_zona", zona, dl.ms("6) zona", CFG.timeout_ms))
 
     # IMPORTANTE: el cambio de zona dispara cargar departamentos
     # Damos un pequeño tiempo para que se complete esa carga
     await short_sleep(0.8)
 
     # 7) Seleccionar Departamento
-    log.info(f"7) Seleccionando departamento: {OBJ_DEPTO!r}")
-    dpto_sel = page.locator("select#id_dpto")
-    await dpto_sel.wait_for(timeout=TOUT)
-    try:
-        await dpto_sel.select_option(label=OBJ_DEPTO.strip())
-    except Exception:
-        await page.evaluate(
-            """(dep_text) => {
-                const sel = document.querySelector('#id_dpto');
-                if (!sel) return;
-                const t = (dep_text||'').trim().toUpperCase();
-                for (const opt of sel.options) {
-                    if ((opt.textContent||'').trim().toUpperCase() === t) {
-                        sel.value = opt.value;
-                        sel.dispatchEvent(new Event('change', {bubbles:true}));
-                        break;
-                    }
-                }
-            }""",
-            OBJ_DEPTO
-        )
+    log.info(f"7) Seleccionando departamento: {depto!r}")
+    await seleccionar_por_texto(page, "select#id_dpto", depto, dl.ms("7) departamento", CFG.timeout_ms))
     await short_sleep(1)
 
-    # 8) Lógica del profesional (OBJ_MEDICO)
-    buscar_btn = page.locator('input#buscar.button.buscar').first
-    prof_input = page.locator('input#profesionalBusquedaComodin_turn')
-
-    obj_medico_txt = (OBJ_MEDICO or "").strip()
-    if obj_medico_txt.lower() == "false" or obj_medico_txt == "":
-        log.info("8) OBJ_MEDICO = false => no se filtra por profesional; se clickea 'Buscar'.")
-        try:
-            await buscar_btn.click(timeout=TOUT)
-        except Exception as e:
-            log.warning(f"No pude hacer click en Buscar de forma directa ({e}); intento alternativo…")
-            await page.locator("input#buscar").first.click()
-    else:
-        log.info(f"8) Filtrando por profesional: {obj_medico_txt!r}")
-        await prof_input.wait_for(timeout=TOUT)
-        # limpiar + tipear
-        await prof_input.fill("")
-        await prof_input.fill(obj_medico_txt)
-        # Enter para disparar buscador/loader
-        await prof_input.press("Enter")
-        # Esperar overlay/toaster cargue y se vaya
-        await wait_blocker_gone(page, timeout_ms=20000)
-        # Y recién ahí Buscar
-        await buscar_btn.click(timeout=TOUT)
-
-    # 9) Esperar tabla de resultados y volcarla al log
-    log.info("9) Esperando tabla de resultados…")
-    tabla = page.locator("#tblResultadoProfesionales")
-    await tabla.wait_for(timeout=TOUT)
+async def paso_formulario(page, dl: Deadline, estado: EstadoFlujo, captura):
+    obj = estado.obj
+    barrido = es_barrido(obj.zona) or es_barrido(obj.depto)
+    if not barrido and CACHE_BUSQUEDAS.fresco(clave_busqueda(obj)) is not None:
+        log.info("3-7) Búsqueda reciente en caché: el formulario se arma solo si hace falta abrir una agenda.")
+        estado.atajo = True
+        return
+    if not barrido and atajos_activos() and ATAJOS.obtener("busqueda", clave_busqueda(obj)):
+        log.info("3-7) Búsqueda ya aprendida: se pide directo, sin pasar por el formulario.")
+        estado.atajo = True
+        return
+    await abrir_formulario(page, dl, obj.servicio)
+    if barrido:
+        # En modo barrido zona/depto se eligen recién con la candidata ganadora (paso resultados)
+        return
+    await elegir_zona_depto(page, dl, obj.zona, obj.depto)
 
-    # Scraping de filas
-    filas = await page.evaluate("""
-        () => {
-            const tbl = document.querySelector('#tblResultadoProfesionales');
-            const out = [];
-            if (!tbl) return out;
-            const rows = tbl.querySelectorAll('tbody tr');
-            for (const tr of rows) {
-                const tds = tr.querySelectorAll('td');
-                if (tds.length < 6) continue;
-                const toText = (el) => (el ? el.innerText.trim().replace(/\\s+\\n/g, "\\n").replace(/\\s+/g,' ').trim() : "");
-                out.push({
-                    profesional: toText(tds[0]),
-                    domicilio:   toText(tds[1]),
-                    servicio:    toText(tds[2]),
-                    horario:     toText(tds[3]),
-                    disp:        toText(tds[4]),
-                    agenda:      toText(tds[5]),
-                    rowIndex:    Array.from(tr.parentNode.children).indexOf(tr)
-                });
-            }
-            return out;
-        }
-    """)
+# ================== ATAJOS (búsqueda/agenda pedidas directo; ver turnos/atajos.py) ==================
+def atajos_activos() -> bool:
+    # Con HAR no: context.request no se graba ni lo sirve route_from_har (iría al portal real)
+    return CFG.atajos and not CFG.har_modo
 
-    if not filas:
-        log.warning("No se encontraron filas en la tabla (0 resultados).")
-        return
+def clave_busqueda(obj: Objetivo, zona: Optional[str] = None, depto: Optional[str] = None) -> str:
+    return CacheBusquedas.clave(obj.servicio, obj.zona if zona is None else zona,
+                                obj.depto if depto is None else depto, obj.medico)
 
-    log.info(f"Resultados detectados: {len(filas)} fila(s).")
+async def pedir_directo(context, dl: Deadline, tipo: str, clave: str, parser, paso: str):
+    """
+    Repite la request aprendida tipo/clave con la sesión del contexto y la parsea. None si no
+    hay atajo o si la respuesta no trae los datos (sesión vencida, token viejo, otro portal).
+    """
+    req = ATAJOS.obtener(tipo, clave) if atajos_activos() else None
+    if not req:
+        return None
+    await LIMITADOR.adquirir("busqueda" if tipo == "busqueda" else "agenda")
+    timeout = dl.ms(paso, CFG.timeout_ms)
+    try:
+        r = await context.request.fetch(req["url"], method=req["method"], headers=req["headers"],
+                                        data=req["post_data"], timeout=timeout)
+        datos = parsear_cuerpo(await r.text(), r.headers.get("content-type", ""), parser) if r.ok else None
+        motivo = f"HTTP {r.status}" if not r.ok else "respuesta sin datos"
+    except PresupuestoAgotado:
+        raise
+    except Exception as e:
+        datos, motivo = None, f"{e.__class__.__name__}: {e}"
+    if datos is None:
+        log.warning(f"{paso}: el atajo no funcionó ({motivo}); se usa el formulario.")
+        ATAJOS.fallo(tipo, clave, motivo)
+        return None
+    ATAJOS.exito(tipo, clave)
+    return datos
+
+def aprender_busqueda(obj: Objetivo, zona: str, depto: str, captura):
+    if captura and atajos_activos():
+        ATAJOS.aprender("busqueda", clave_busqueda(obj, zona, depto), captura.req_busqueda)
+
+async def tabla_por_formulario(page, dl: Deadline, estado: EstadoFlujo, captura):
+    """
+    Arma la tabla de resultados en la página principal cuando los resultados vinieron por
+    atajo o de la caché (el formulario puede estar ya abierto y completo: paso_formulario).
+    """
+    obj = estado.obj
+    if not await page.locator("select#servimod").first.is_visible():
+        await abrir_formulario(page, dl, obj.servicio)
+        await elegir_zona_depto(page, dl, obj.zona, obj.depto)
+    estado.filas_pagina = await buscar_filas(page, dl, captura, obj.medico)
+    CACHE_BUSQUEDAS.guardar(clave_busqueda(obj), estado.filas_pagina)
+    registrar_busqueda(obj, obj.zona, obj.depto, estado.filas_pagina)
+    aprender_busqueda(obj, obj.zona, obj.depto, captura)
+    estado.atajo = False
+
+async def agendas_directas(page, dl: Deadline, estado: EstadoFlujo) -> bool:
+    """
+    10-11 con atajos: las agendas de las candidatas se piden directo (todas a la vez) y se
+    evalúan en orden. True si ninguna tiene turno aceptable (queda la primera, como en
+    paso_agenda). False si falta o falla algún atajo, o si hay un turno para reservar: ahí
+    sigue el camino normal (formulario + 'Ver Agenda' de la candidata), porque el horario se
+    clickea en el iframe. La búsqueda se pidió antes en la misma sesión, así que una agenda
+    que dependa de la última búsqueda del portal responde igual que con el formulario.
+    """
+    candidatas = [estado.objetivo] + [c for c in estado.candidatas[1:] if clave_fila(c) != clave_fila(estado.objetivo)]
+    claves = [clave_agenda(estado.obj.servicio, c) for c in candidatas]
+    if not atajos_activos() or not all(ATAJOS.obtener("agenda", k) for k in claves):
+        return False
+    log.info(f"10) Pidiendo directo la agenda de {len(candidatas)} candidata(s)…")
+    res = await asyncio.gather(*(pedir_directo(page.context, dl, "agenda", k, parsear_agenda, "10) agenda directa")
+                                 for k in claves))
+    if any(slots is None for slots in res):
+        return False
+    primera = None
+    for i, (cand, clave, slots) in enumerate(zip(candidatas, claves, res)):
+        c = dataclasses.replace(estado, objetivo=cand, slots=[], iframe=None, semana_iframe=0, pagina=None)
+        por_semana = {0: slots}
+        semanas = semanas_a_leer(unir_semanas(por_semana), estado.obj)
+        if semanas:
+            por_semana.update(await leer_semanas_siguientes(page, dl, c, None, semanas,
+                                                            url=ATAJOS.obtener("agenda", clave)["url"]))
+        c.slots = unir_semanas(por_semana)
+        registrar_agenda(c, por_semana)
+        primera = primera or c
+        if elegir_turno(c.slots, estado.obj, avisar=False):
+            log.info(f"10) {cand.get('profesional', '')!r} tiene turno aceptable: se abre su agenda en la página.")
+            estado.objetivo, estado.candidatas = cand, candidatas[i:]
+            return False
+    estado.objetivo, estado.slots = primera.objetivo, primera.slots
+    return True
 
-    # ---------------- FILTROS ----------------
-    prof_filtro = (os.getenv("OBJ_PROFESIONAL") or "").strip().lower()
-    dom_filtro  = (os.getenv("OBJ_DOMICILIO") or "").strip().lower()
-    hor_filtro  = (os.getenv("OBJ_HORARIO_TURNO") or "").strip().lower()
-    dias_filtro = [d.strip().upper() for d in (os.getenv("OBJ_DIAS_VALIDOS") or "").split(",") if d.strip()]
-    fecha_filtro = (os.getenv("OBJ_FECHA_DISP") or "").strip()
+def filtrar_candidatas(filas, obj: Objetivo):
+    """
+    Aplica los filtros del objetivo a las filas de resultados. Si no hay coincidencias exactas
+    (y la fecha es flexible) devuelve la fila con la fecha disponible más próxima.
+    """
+    prof_filtro = obj.profesional.lower()
+    dom_filtro  = obj.domicilio.lower()
+    sede_filtro = obj.sede_txt.lower()
+    hor_filtro  = obj.horario_turno.lower()
+    dias_filtro = obj.dias_validos
+    fecha_filtro = obj.fecha_disp
 
     def cumple(f):
         # Profesional
-        if prof_filtro and prof_filtro != "false" and prof_filtro not in f["profesional"].lower():
+        if prof_filtro and prof_filtro not in f["profesional"].lower():
             return False
-        # Domicilio
-        if dom_filtro and dom_filtro != "false" and dom_filtro not in f["domicilio"].lower():
+        # Domicilio / sede
+        if dom_filtro and dom_filtro not in f["domicilio"].lower():
+            return False
+        if sede_filtro and sede_filtro not in f["domicilio"].lower():
             return False
         # Horario
-        if hor_filtro and hor_filtro != "false" and hor_filtro not in f["horario"].lower():
+        if hor_filtro and hor_filtro not in f["horario"].lower():
             return False
         # Días válidos
         if dias_filtro and not any(d in f["horario"].upper() for d in dias_filtro):
             return False
         # Fecha DISP
-        if fecha_filtro and fecha_filtro != "false" and f["disp"] != fecha_filtro:
+        if fecha_filtro and f["disp"] != fecha_filtro:
             return False
         # Si disp es --- descartamos (sin disponibilidad)
         if f["disp"].strip() == "---":
@@ -1502,101 +831,437 @@ async def flujo_turnos_nuevo(page):
         return True
 
     candidatas = [f for f in filas if cumple(f)]
+    if candidatas:
+        return candidatas
 
     # Si no hay coincidencias exactas, elegimos la más próxima por fecha
-    from datetime import datetime
-    
-    if not candidatas:
-        hoy = datetime.now()
-        fechas_validas = []
-        for f in filas:
-            try:
-                if f["disp"].strip() == "---":
-                    continue
-                fecha = datetime.strptime(f["disp"], "%d-%m-%Y")
-                if fecha >= hoy:
-                    fechas_validas.append((fecha, f))
-            except Exception:
+    hoy = dt.datetime.now()
+    fechas_validas = []
+    for f in filas:
+        try:
+            if f["disp"].strip() == "---":
                 continue
-    
-        if fecha_filtro and not OBJ_FECHA_FLEXIBLE:
-            log.warning("No se encontró la fecha exacta y la flexibilidad está desactivada.")
-            return
-    
-        if fechas_validas:
-            fechas_validas.sort(key=lambda x: x[0])
-            candidatas = [fechas_validas[0][1]]
-            log.info(f"Usando la más próxima: {candidatas[0]['disp']}")
-        else:
-            log.warning("No hay fechas disponibles próximas.")
-            return
+            fecha = dt.datetime.strptime(f["disp"], "%d-%m-%Y")
+            if fecha >= hoy:
+                fechas_validas.append((fecha, f))
+        except Exception:
+            continue
+
+    if fecha_filtro and not obj.fecha_flexible:
+        log.warning("No se encontró la fecha exacta y la flexibilidad está desactivada.")
+        return []
+
+    if fechas_validas:
+        fechas_validas.sort(key=lambda x: x[0])
+        log.info(f"Usando la más próxima: {fechas_validas[0][1]['disp']}")
+        return [fechas_validas[0][1]]
+    log.warning("No hay fechas disponibles próximas.")
+    return []
+
+async def buscar_filas(page, dl: Deadline, captura, obj_medico_txt: str) -> list:
+    """8-9) Buscar (con o sin profesional) y devolver las filas de #tblResultadoProfesionales."""
+    botones_buscar = {"clase": page.locator('input#buscar.button.buscar').first,
+                      "id": page.locator("input#buscar").first}
+    prof_input = page.locator('input#profesionalBusquedaComodin_turn')
+
+    if not obj_medico_txt:
+        log.info("8) OBJ_MEDICO = false => no se filtra por profesional; se clickea 'Buscar'.")
+        await LIMITADOR.adquirir("busqueda")
+        fut_busqueda = captura.busqueda() if captura else None
+        await clickear_variante("Buscar", botones_buscar, dl.ms("8) buscar", CFG.timeout_ms))
+    else:
+        log.info(f"8) Filtrando por profesional: {obj_medico_txt!r}")
+        await prof_input.wait_for(timeout=dl.ms("8) profesional", CFG.timeout_ms))
+        # limpiar + tipear
+        await prof_input.fill("")
+        await prof_input.fill(obj_medico_txt)
+        # Enter para disparar buscador/loader
+        await prof_input.press("Enter")
+        # Esperar overlay/toaster cargue y se vaya
+        await wait_blocker_gone(page, timeout_ms=dl.ms("8) profesional", 20000))
+        # Y recién ahí Buscar
+        await LIMITADOR.adquirir("busqueda")
+        fut_busqueda = captura.busqueda() if captura else None
+        await clickear_variante("Buscar", botones_buscar, dl.ms("8) buscar", CFG.timeout_ms))
 
+    # 9) Esperar tabla de resultados (o la respuesta de la búsqueda, lo que llegue primero)
+    log.info("9) Esperando tabla de resultados…")
+    tabla = page.locator("#tblResultadoProfesionales")
+    origen, filas = await primero_en_llegar(fut_busqueda, tabla.wait_for(timeout=dl.ms("9) resultados", CFG.timeout_ms)))
+    if origen == "xhr":
+        log.info("9) Resultados tomados de la respuesta del portal (sin esperar el render).")
+        return filas
+    # Scraping de filas (con paginación o carga perezosa, si la tabla las tiene)
+    return await leer_filas_dom(page, dl.ms("9) tabla completa", 5000))
+
+async def paso_resultados(page, dl: Deadline, estado: EstadoFlujo, captura):
+    # 8) Lógica del profesional (medico del objetivo / OBJ_MEDICO)
+    barrido = es_barrido(estado.obj.zona) or es_barrido(estado.obj.depto)
+    obj = estado.obj
+    if barrido:
+        filas = await barrer_zonas(page, dl, obj)
+    else:
+        clave = clave_busqueda(obj)
+        al_portal = []
+
+        async def buscar():
+            al_portal.append(True)
+            filas = None
+            if estado.atajo:
+                filas = await pedir_directo(page.context, dl, "busqueda", clave, parsear_tabla_profesionales,
+                                            "9) búsqueda directa")
+                if filas is None and not await page.locator("select#servimod").first.is_visible():
+                    await abrir_formulario(page, dl, obj.servicio)
+                    await elegir_zona_depto(page, dl, obj.zona, obj.depto)
+            if filas is None:
+                filas = estado.filas_pagina = await buscar_filas(page, dl, captura, obj.medico)
+                aprender_busqueda(obj, obj.zona, obj.depto, captura)
+                estado.atajo = False
+            registrar_busqueda(obj, obj.zona, obj.depto, filas)
+            return filas
+
+        # Si otra cuenta/objetivo hizo (o está haciendo) esta misma búsqueda, las candidatas salen
+        # de ahí; la tabla de esta página se arma recién si hay que clickear 'Ver Agenda' (paso agenda)
+        filas = await CACHE_BUSQUEDAS.obtener(clave, buscar)
+        if not al_portal:
+            log.info("9) Búsqueda reciente o en curso en otra cuenta; no se consulta el portal.")
+            estado.atajo = True
+
+    estado.filas = filas
+    if not filas:
+        log.warning("No se encontraron filas en la tabla (0 resultados).")
+        estado.fin = "sin resultados"
+        return
 
-    objetivo = candidatas[0]
-    log.info(f"Seleccionada: {objetivo}")
+    log.info(f"Resultados detectados: {len(filas)} fila(s).")
+    candidatas = filtrar_candidatas(filas, estado.obj)
+    if not candidatas:
+        estado.fin = "sin candidatas"
+        return
 
-    # Click en el ícono "Ver Agenda"
-    fila_index = objetivo["rowIndex"]
+    estado.candidatas = candidatas[:CFG.agenda_candidatas]
+    estado.objetivo = candidatas[0]
+    if barrido:
+        # La agenda se abre desde la tabla de esta página: se repite ahí la búsqueda ganadora
+        elegida = estado.objetivo
+        log.info(f"Barrido: candidata en {elegida['zona']} / {elegida['depto']}; se la busca en la página principal.")
+        await elegir_zona_depto(page, dl, elegida["zona"], elegida["depto"])
+        propias = await buscar_filas(page, dl, captura, estado.obj.medico)
+        CACHE_BUSQUEDAS.guardar(CacheBusquedas.clave(estado.obj.servicio, elegida["zona"], elegida["depto"],
+                                                     estado.obj.medico), propias)
+        fila = next((f for f in propias if clave_fila(f) == clave_fila(elegida)), None)
+        if fila is None:
+            raise ErrorTransitorio("La candidata del barrido no aparece al repetir la búsqueda.")
+        estado.objetivo = {**fila, "zona": elegida["zona"], "depto": elegida["depto"]}
+        estado.candidatas[0] = estado.objetivo
+        estado.filas_pagina = propias
+    log.info(f"Seleccionada: {estado.objetivo}")
+    if not estado.atajo:
+        await evidencia(page, dl, "resultados")
+
+def registrar_busqueda(obj: Objetivo, zona: str, depto: str, filas: list):
+    if HISTORIAL:
+        HISTORIAL.registrar("filas", servicio=obj.servicio, zona=zona, depto=depto,
+                            filas=[{k: f.get(k, "") for k in ("profesional", "domicilio", "disp")} for f in filas])
+
+def registrar_agenda(estado: EstadoFlujo, por_semana: dict):
+    if not HISTORIAL:
+        return
+    # Hasta dónde llegó lo leído sin huecos (para saber si un turno que no está se fue de verdad)
+    contiguas = next(k for k in range(len(por_semana) + 1) if k not in por_semana)
+    cubre = lunes_de(dt.date.today()) + dt.timedelta(days=7 * contiguas - 1)
+    HISTORIAL.registrar("agenda", servicio=estado.obj.servicio,
+                        zona=estado.objetivo.get("zona", estado.obj.zona),
+                        depto=estado.objetivo.get("depto", estado.obj.depto),
+                        profesional=estado.objetivo.get("profesional", ""),
+                        domicilio=estado.objetivo.get("domicilio", ""),
+                        cubre_hasta=cubre.isoformat(),
+                        slots=[{"fecha": s.get("fecha", ""), "hora": s["hora"]} for s in estado.slots])
+
+# ================== BARRIDO DE ZONAS / DEPARTAMENTOS ==================
+def es_barrido(valor: str) -> bool:
+    return valor.strip().upper() in ("*", "TODOS", "TODAS")
+
+def clave_fila(f) -> tuple:
+    return tuple(" ".join(f.get(k, "").lower().split()) for k in ("profesional", "domicilio", "servicio"))
+
+async def opciones_select(page, css: str) -> list:
+    return await page.eval_on_selector_all(
+        f"{css} option",
+        "os => os.map(o => o.textContent.trim()).filter(t => t && !/^(seleccion|--)/i.test(t))")
+
+async def deptos_de_zona(page, dl: Deadline, zona: str) -> list:
+    """Selecciona la zona en page y devuelve los departamentos que carga el portal."""
+    await seleccionar_por_texto(page, "select#id_zona", zona, dl.ms("barrido: zona", CFG.timeout_ms))
+    try:
+        await page.wait_for_function(
+            "() => Array.from(document.querySelectorAll('select#id_dpto option'))"
+            ".filter(o => o.textContent.trim() && !/^(seleccion|--)/i.test(o.textContent.trim())).length > 0",
+            timeout=dl.ms("barrido: departamentos", 10000))
+    except PWTimeout:
+        return []
+    return await opciones_select(page, "select#id_dpto")
+
+async def buscar_combinacion(context, dl: Deadline, obj: Objetivo, zona: str, depto: str, sem) -> list:
+    """
+    Una búsqueda del barrido en una página propia (misma sesión/cookies que la principal).
+    Pasa por CACHE_BUSQUEDAS: si la misma combinación ya se buscó hace poco, o se está
+    buscando ahora para otro objetivo, no se abre otra página.
+    """
+    async def buscar():
+        async with sem:
+            filas = await pedir_directo(context, dl, "busqueda", clave_busqueda(obj, zona, depto),
+                                        parsear_tabla_profesionales, "barrido: búsqueda directa")
+            if filas is not None:
+                registrar_busqueda(obj, zona, depto, filas)
+                return filas
+            page = await context.new_page()
+            captura = CapturaXHR(page, CFG.xhr_busqueda_patron, CFG.xhr_agenda_patron) if CFG.xhr_captura else None
+            try:
+                await abrir_formulario(page, dl, obj.servicio)
+                await elegir_zona_depto(page, dl, zona, depto)
+                filas = await buscar_filas(page, dl, captura, obj.medico)
+                registrar_busqueda(obj, zona, depto, filas)
+                aprender_busqueda(obj, zona, depto, captura)
+                return filas
+            finally:
+                if captura:
+                    captura.cerrar()
+                await page.close()
+
+    filas = await CACHE_BUSQUEDAS.obtener(CacheBusquedas.clave(obj.servicio, zona, depto, obj.medico), buscar)
+    return [{**f, "zona": zona, "depto": depto} for f in filas]
+
+async def barrer_zonas(page, dl: Deadline, obj: Objetivo) -> list:
+    """
+    8-9 en modo barrido (OBJ_ZONA y/o OBJ_DEPTO = '*'): arma las combinaciones zona/depto
+    leyendo los selects de la página principal, corre las búsquedas en páginas paralelas
+    (hasta BARRIDO_CONCURRENCIA a la vez) y devuelve una sola lista de filas sin repetidos,
+    ordenada por fecha disponible.
+    """
+    zonas = await opciones_select(page, "select#id_zona") if es_barrido(obj.zona) else [obj.zona]
+    combinaciones = []
+    for zona in zonas:
+        deptos = await deptos_de_zona(page, dl, zona) if es_barrido(obj.depto) else [obj.depto]
+        combinaciones += [(zona, d) for d in deptos]
+    log.info(f"8) Barrido: {len(combinaciones)} búsqueda(s) en {len(zonas)} zona(s), "
+             f"hasta {CFG.barrido_concurrencia} en paralelo…")
+
+    sem = asyncio.Semaphore(CFG.barrido_concurrencia)
+    res = await asyncio.gather(*(buscar_combinacion(page.context, dl, obj, z, d, sem) for z, d in combinaciones),
+                               return_exceptions=True)
+    filas, vistas = [], set()
+    for (zona, depto), r in zip(combinaciones, res):
+        if isinstance(r, PresupuestoAgotado):
+            raise r
+        if isinstance(r, BaseException):
+            log.warning(f"Barrido: falló {zona} / {depto} ({r.__class__.__name__}: {r})")
+            continue
+        for f in r:
+            if clave_fila(f) not in vistas:
+                vistas.add(clave_fila(f))
+                filas.append(f)
+
+    def fecha_disp(f):
+        try:
+            return dt.datetime.strptime(f["disp"].strip(), "%d-%m-%Y")
+        except ValueError:
+            return dt.datetime.max
+    filas.sort(key=fecha_disp)
+    log.info(f"9) Barrido: {len(filas)} fila(s) distintas entre todas las búsquedas.")
+    return filas
+
+async def abrir_agenda(page, dl: Deadline, estado: EstadoFlujo, captura):
+    """10-11) Abre la agenda de estado.objetivo desde la tabla de page y deja iframe y slots en estado."""
+    # Click en el ícono "Ver Agenda" de la fila elegida (en un reintento se recarga solo la agenda)
+    fila_index = await fila_a_la_vista(page, dl, estado.objetivo)
     log.info(f"Haciendo click en 'Ver Agenda' (fila {fila_index})…")
     agenda_icon = page.locator(f"#tblResultadoProfesionales tbody tr:nth-of-type({fila_index + 1}) img#img_agenda_prof")
-    await agenda_icon.first.click(timeout=TOUT)
+    await LIMITADOR.adquirir("agenda")
+    fut_agenda = captura.agenda() if captura else None
+    await agenda_icon.first.click(timeout=dl.ms("10) ver agenda", CFG.timeout_ms))
+
+    # 10) Agenda: respuesta del portal o, si no llega antes, iframe renderizado
+    log.info("10) Esperando agenda…")
+    origen, res = await primero_en_llegar(fut_agenda, esperar_agenda_dom(page, dl))
+    if origen == "xhr":
+        log.info("11) Agenda tomada de la respuesta del portal (sin esperar el render).")
+        slots = res
+        # El iframe sigue haciendo falta para clickear el horario
+        iframe = await buscar_iframe_agenda(page, timeout_ms=dl.ms("iframe agenda", 10000))
+    else:
+        iframe = res
+        if not iframe:
+            raise ErrorTransitorio("No encontré el iframe de agenda.")
+        log.info("11) Leyendo tabla de horarios disponibles (estructura real)…")
+        slots = await leer_agenda_dom(iframe)
+
+    estado.iframe, estado.semana_iframe = iframe, 0
+    por_semana = {0: slots}
+    semanas = semanas_a_leer(unir_semanas(por_semana), estado.obj)
+    if semanas:
+        # Con turno objetivo se deja de avanzar apenas aparece
+        basta = (lambda k, s: bool(buscar_exacto(unir_semanas({k: s}), estado.obj))) \
+            if estado.obj.fecha_txt or estado.obj.hora_txt else None
+        por_semana.update(await leer_semanas_siguientes(page, dl, estado, captura, semanas, basta))
+    estado.slots = unir_semanas(por_semana)
+    registrar_agenda(estado, por_semana)
+    if captura and atajos_activos():
+        ATAJOS.aprender("agenda", clave_agenda(estado.obj.servicio, estado.objetivo), captura.req_agenda)
+    await evidencia(page, dl, "agenda", estado.iframe)
+
+# ================== AGENDAS DE VARIAS CANDIDATAS ==================
+@dataclasses.dataclass
+class Carril:
+    """Una página con tabla de resultados desde la que se abren agendas (la principal o una auxiliar)."""
+    page: object = None
+    captura: Optional[CapturaXHR] = None
+    busqueda: Optional[tuple] = None      # (zona, depto) que muestra su tabla
+    filas: list = dataclasses.field(default_factory=list)
+    auxiliar: bool = False
+
+    async def cerrar(self):
+        if not self.auxiliar or self.page is None:
+            return
+        if self.captura:
+            self.captura.cerrar()
+        try:
+            await self.page.close()
+        except Exception:
+            pass
 
-    # Esperar a que desaparezca el overlay/toaster
-    await wait_blocker_gone(page, timeout_ms=20000)
+async def cerrar_carriles(estado: EstadoFlujo, salvo=None):
+    """Cierra las páginas auxiliares de paso_agenda, menos la página salvo (si se pasa)."""
+    quedan = []
+    for carril in estado.carriles:
+        if salvo is not None and carril.page is salvo:
+            quedan.append(carril)
+        else:
+            await carril.cerrar()
+    estado.carriles = quedan
 
-    # 10) Leer iframe de la agenda
-    log.info("10) Esperando iframe de Agenda…")
-    iframe = None
-    for _ in range(20):
-        for f in page.frames:
-            if "pickMostrarAgenda_iframe" in (f.name or ""):
-                iframe = f
-                break
-        if iframe:
-            break
-        await asyncio.sleep(0.5)
-    if not iframe:
-        log.error("No encontré el iframe de agenda.")
-        return
+def busqueda_de(fila: dict, obj: Objetivo) -> tuple:
+    return fila.get("zona", obj.zona), fila.get("depto", obj.depto)
 
-    # Extraer información de la tabla dentro del iframe
-    # 11) Leer tabla de horarios disponibles (espera robusta)
-    log.info("11) Esperando que cargue la agenda dentro del iframe…")
-    try:
-        await iframe.wait_for_selector("div.horario_disponible, table.tabla_dias_horarios", timeout=10000)
-    except Exception:
-        log.warning("No se detectó ninguna celda con horario_disponible antes de timeout.")
-    
-    log.info("11) Leyendo tabla de horarios disponibles (estructura real)…")
-    horarios = await iframe.evaluate("""
-        () => {
-            const cab = document.querySelectorAll('table.tabla_dias_horarios th.cabecera_dia, table.tabla_dias_horarios th.cabecera_hoy');
-            const dias_labels = Array.from(cab).map(th => th.innerText.trim().replace(/\\s+/g,' '));
-            const data = {};
-            for (const lbl of dias_labels) data[lbl] = [];
-    
-            const filas = document.querySelectorAll('table.tabla_dias_horarios tbody tr');
-            filas.forEach(tr => {
-                const celdas = tr.querySelectorAll('td');
-                celdas.forEach((td, idx) => {
-                    const divs = td.querySelectorAll('div.horario_disponible');
-                    divs.forEach(div => {
-                        const txt = div.textContent.trim();
-                        if (txt) {
-                            const dia = dias_labels[idx] || `Columna ${idx}`;
-                            data[dia] = data[dia] || [];
-                            data[dia].push(txt);
-                        }
-                    });
-                });
-            });
-            return data;
-        }
-    """)
+async def ubicar_en_carril(carril: Carril, dl: Deadline, obj: Objetivo, fila: dict) -> dict:
+    """
+    La fila equivalente en la tabla del carril (con su propio rowIndex). Si el carril no
+    muestra la búsqueda de la candidata (otra zona/depto en el barrido, o página recién
+    abierta) se la repite ahí.
+    """
+    busqueda = busqueda_de(fila, obj)
+    if carril.busqueda != busqueda:
+        if carril.busqueda is None:
+            await abrir_formulario(carril.page, dl, obj.servicio)
+        await elegir_zona_depto(carril.page, dl, *busqueda)
+        carril.filas = await buscar_filas(carril.page, dl, carril.captura, obj.medico)
+        carril.busqueda = busqueda
+    propia = next((f for f in carril.filas if clave_fila(f) == clave_fila(fila)), None)
+    if propia is None:
+        raise ErrorTransitorio(f"La candidata {fila.get('profesional', '')!r} no aparece en la tabla.")
+    return {**propia, **{k: fila[k] for k in ("zona", "depto") if k in fila}}
+
+async def paso_agenda(page, dl: Deadline, estado: EstadoFlujo, captura):
+    """
+    10-11) Agendas de las candidatas en orden, de a AGENDA_PAGINAS a la vez: mientras se
+    evalúan los horarios de una, la de la siguiente ya se está cargando en otra página (misma
+    sesión). Se queda con la primera candidata que tenga un turno aceptable y no abre más; si
+    ninguna tiene, sigue con la primera (paso turno dirá 'sin turno en franja').
+    Con resultados sin tabla en la página (atajo o caché) se prueban primero las agendas
+    directas y, si hace falta abrir una en el iframe, se busca antes en el formulario.
+    """
+    if estado.atajo:
+        if await agendas_directas(page, dl, estado):
+            informar_horarios(estado)
+            return
+        await tabla_por_formulario(page, dl, estado, captura)
+    await cerrar_carriles(estado)
+    candidatas = [estado.objetivo] + [c for c in estado.candidatas[1:] if clave_fila(c) != clave_fila(estado.objetivo)]
+    n = min(CFG.agenda_paginas, len(candidatas))
+    carriles = [Carril(page, captura, busqueda_de(estado.objetivo, estado.obj), estado.filas_pagina)]
+    carriles += [Carril(auxiliar=True) for _ in range(n - 1)]
+    estado.carriles = carriles[1:]
+    resultados = [asyncio.get_running_loop().create_future() for _ in candidatas]
+    mejor = [len(candidatas)]     # índice de la mejor candidata con turno aceptable hasta ahora
+    if len(candidatas) > 1:
+        log.info(f"10) {len(candidatas)} candidata(s); agendas en {n} página(s) a la vez.")
+
+    def resolver(i, valor=None, error=None):
+        if resultados[i].done():
+            return
+        if error is None:
+            resultados[i].set_result(valor)
+        else:
+            resultados[i].set_exception(error)
+            resultados[i].exception()     # se marca como leída (puede que nadie la espere)
 
+    async def correr_carril(j):
+        carril = carriles[j]
+        for i in range(j, len(candidatas), n):
+            if i > mejor[0]:
+                return
+            try:
+                if carril.page is None:
+                    carril.page = await page.context.new_page()
+                    if CFG.xhr_captura:
+                        carril.captura = CapturaXHR(carril.page, CFG.xhr_busqueda_patron, CFG.xhr_agenda_patron)
+                fila = candidatas[i] if i == 0 else await ubicar_en_carril(carril, dl, estado.obj, candidatas[i])
+                cand = dataclasses.replace(estado, objetivo=fila, slots=[], iframe=None, semana_iframe=0,
+                                           pagina=None if carril.page is page else carril.page)
+                await abrir_agenda(carril.page, dl, cand, carril.captura)
+            except PresupuestoAgotado as e:
+                for k in range(i, len(candidatas), n):
+                    resolver(k, error=e)
+                return
+            except Exception as e:
+                resolver(i, error=e)
+                continue
+            aceptable = elegir_turno(cand.slots, estado.obj, avisar=False) is not None
+            resolver(i, (cand, aceptable))
+            if aceptable:
+                # El iframe de este carril queda con esta agenda para clickear el horario
+                mejor[0] = min(mejor[0], i)
+                return
 
+    tareas = [asyncio.create_task(correr_carril(j)) for j in range(n)]
+    elegido, primero, errores = None, None, []
+    try:
+        for i, fut in enumerate(resultados):
+            try:
+                cand, aceptable = await fut
+            except PresupuestoAgotado:
+                raise
+            except Exception as e:
+                log.warning(f"10) Falló la agenda de la candidata {i + 1} ({e.__class__.__name__}: {e}).")
+                errores.append(e)
+                continue
+            primero = primero or cand
+            if aceptable:
+                elegido = cand
+                break
+            if i + 1 < len(candidatas):
+                log.info(f"10) Candidata {i + 1} ({cand.objetivo.get('profesional', '')}) sin turno aceptable; "
+                         f"se sigue con la siguiente.")
+    finally:
+        for t in tareas:
+            t.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+    elegido = elegido or primero
+    if elegido is None:
+        raise errores[0]
+    if elegido.objetivo is not estado.objetivo:
+        log.info(f"Seleccionada: {elegido.objetivo}")
+    estado.objetivo, estado.slots = elegido.objetivo, elegido.slots
+    estado.iframe, estado.semana_iframe, estado.pagina = elegido.iframe, elegido.semana_iframe, elegido.pagina
+    await cerrar_carriles(estado, salvo=estado.pagina)
+    informar_horarios(estado)
+
+def informar_horarios(estado: EstadoFlujo):
+    horarios = agrupar_por_dia(estado.slots)
     if not horarios:
         log.warning("No se detectaron horarios disponibles en la agenda.")
+        estado.fin = "agenda sin horarios"
     else:
         for dia, horas in horarios.items():
             if horas:
@@ -1604,161 +1269,597 @@ async def flujo_turnos_nuevo(page):
             else:
                 log.info(f"{dia}: sin horarios disponibles")
 
-    
-
-
-
-# 12) Seleccionar turno según franja horaria configurada
-    from datetime import datetime
-
-    log.info("12) Seleccionando turno dentro de franja horaria configurada…")
-
-    hora_min = os.getenv("OBJ_HORA_MIN", "00:00").strip()
-    hora_max = os.getenv("OBJ_HORA_MAX", "23:59").strip()
-    # Si alguno viene "false", asignar valores amplios por defecto
-    if hora_min.lower() == "false" or not hora_min:
-        hora_min = "00:00"
-    if hora_max.lower() == "false" or not hora_max:
-        hora_max = "23:59"
-    prioridad = (os.getenv("OBJ_HORA_PRIORIDAD", "EARLIEST") or "EARLIEST").upper()
+def semanas_a_leer(slots0, obj: Objetivo) -> list:
+    """
+    Semanas extra (1 = la siguiente a la que abre) que hace falta mirar. Ninguna si el turno
+    objetivo ya está en la primera; solo la de fecha_txt si el día no es flexible.
+    """
+    semanas = list(range(1, CFG.agenda_semanas))
+    if (obj.fecha_txt or obj.hora_txt) and buscar_exacto(slots0, obj):
+        log.info("11) El turno objetivo está en la semana que abre la agenda: no se miran las demás.")
+        return []
+    if obj.fecha_txt and not obj.dia_flexible:
+        fechas = [dt.date.fromisoformat(s["fecha"]) for s in slots0 if s.get("fecha")]
+        ref = min(fechas) if fechas else dt.date.today()
+        k = (obj.fecha_txt - lunes_de(ref)).days // 7
+        if k >= CFG.agenda_semanas:
+            log.warning(f"La fecha objetivo {obj.fecha_txt:%d-%m-%Y} queda fuera de las "
+                        f"{CFG.agenda_semanas} semana(s) que se miran (AGENDA_SEMANAS).")
+        return [k] if 1 <= k < CFG.agenda_semanas else []
+    return semanas
+
+async def leer_semanas_siguientes(page, dl: Deadline, estado: EstadoFlujo, captura, semanas, basta=None,
+                                  url: Optional[str] = None) -> dict:
+    """
+    11b) Semanas extra de la agenda, {semana: slots}. Primero la caché (daemon), después en
+    paralelo por URL si la request de la agenda lleva la fecha y, si no, navegando con
+    'semana siguiente' (hasta que basta(semana, slots) dé True). url: la de la agenda, si no
+    es la capturada (agenda pedida por atajo, sin iframe). Es de mejor esfuerzo: ante un
+    error se sigue con lo que se leyó.
+    """
+    clave = f"{estado.objetivo['profesional']}|{estado.objetivo['domicilio']}"
+    por_semana = {k: v for k in semanas if (v := CACHE_AGENDA.obtener(clave, k)) is not None}
+    if por_semana:
+        log.info(f"11b) Semanas {', '.join(str(k + 1) for k in por_semana)} de la agenda tomadas de la caché.")
+    faltan = [k for k in semanas if k not in por_semana]
 
-    def hora_a_minutos(h):
-        try:
-            hh, mm = map(int, h.split(":"))
-            return hh * 60 + mm
-        except Exception:
-            return None
+    def guardar(k, slots):
+        por_semana[k] = slots
+        CACHE_AGENDA.guardar(clave, k, slots)
 
-    hmin = hora_a_minutos(hora_min)
-    hmax = hora_a_minutos(hora_max)
-
-    # Buscar el primer día con horarios disponibles
-    dia_valido, horas_validas = None, []
-    for dia, horas in horarios.items():
-        if horas:
-            filtradas = []
-            for h in horas:
-                hm = hora_a_minutos(h)
-                if hm and hmin <= hm <= hmax:
-                    filtradas.append(h)
-            if filtradas:
-                dia_valido = dia
-                horas_validas = filtradas
+    try:
+        url = url or (captura.url_agenda if captura else None)
+        # Con HAR (grabar/reproducir) no se pide por URL: context.request no pasa por el HAR
+        # (ni se graba ni lo sirve route_from_har) e iría al portal real; se navega con clicks
+        urls = urls_por_semana(url, CFG.agenda_semanas) if url and not CFG.har_modo else None
+        if faltan and urls:
+            async def pedir(k):
+                await LIMITADOR.adquirir("agenda")
+                r = await page.context.request.get(urls[k - 1], timeout=dl.ms(f"agenda semana {k + 1}", CFG.timeout_ms))
+                if not r.ok:
+                    return None
+                return parsear_cuerpo(await r.text(), r.headers.get("content-type", ""), parsear_agenda)
+
+            log.info(f"11b) Pidiendo {len(faltan)} semana(s) más de agenda en paralelo…")
+            res = await asyncio.gather(*(pedir(k) for k in faltan), return_exceptions=True)
+            for k, r in zip(faltan, res):
+                if isinstance(r, list):
+                    guardar(k, r)
+            faltan = [k for k in faltan if k not in por_semana]
+
+        # Sin URL por fecha: se navega semana a semana (la respuesta de cada una se toma por XHR si llega antes)
+        for k in range(1, max(faltan) + 1 if faltan and estado.iframe else 1):
+            previa = await cabecera_semana(estado.iframe)
+            await LIMITADOR.adquirir("agenda")
+            fut = captura.agenda() if captura and k in faltan else None
+            if not await clickear_semana(estado.iframe, CFG.agenda_siguiente_sel, dl.ms("agenda: semana siguiente", CFG.timeout_ms)):
+                log.info(f"11b) La agenda no tiene semana {k + 1} (o no encontré el botón).")
                 break
-
-    if not dia_valido:
-        if OBJ_HORA_FLEXIBLE:
-            # No hay horario dentro del rango, tomar el primero disponible
-            for dia, horas in horarios.items():
-                if horas:
-                    dia_valido = dia
-                    hora_elegida = sorted(horas)[0]
-                    log.info(f"No se encontró horario en rango, usando primero disponible: {dia_valido} / {hora_elegida}")
+            cambio = esperar_cambio_semana(estado.iframe, previa, dl.ms("agenda: semana siguiente", 10000))
+            origen, res = await primero_en_llegar(fut, cambio)
+            if origen == "xhr":
+                await esperar_cambio_semana(estado.iframe, previa, dl.ms("agenda: semana siguiente", 10000))
+            estado.semana_iframe = k
+            if k in faltan:
+                guardar(k, res if origen == "xhr" else await leer_agenda_dom(estado.iframe))
+                if basta and basta(k, por_semana[k]):
+                    log.info(f"11b) Turno objetivo encontrado en la semana {k + 1}.")
                     break
-            else:
-                log.warning("No se encontró ningún horario disponible en ningún día.")
-                return
-        else:
-            log.warning(f"No se encontró ningún horario entre {hora_min} y {hora_max}, y flexibilidad está desactivada.")
-            return
+    except (ErrorFatal, asyncio.CancelledError):
+        raise
+    except Exception as e:
+        log.warning(f"11b) Se corta el recorrido de semanas ({e.__class__.__name__}: {e}); se sigue con lo leído.")
+    return por_semana
+
+def agrupar_por_dia(slots):
+    horarios = {}
+    for slot in slots:
+        horarios.setdefault(slot["dia"], []).append(slot["hora"])
+    return horarios
+
+def hora_a_minutos(h):
+    try:
+        hh, mm = map(int, h.split(":"))
+        return hh * 60 + mm
+    except Exception:
+        return None
+
+def buscar_exacto(slots, obj: Objetivo) -> list:
+    """Slots que coinciden con fecha_txt y/o hora_txt del objetivo ([] si no hay objetivo exacto)."""
+    if not obj.fecha_txt and not obj.hora_txt:
+        return []
+    fecha = obj.fecha_txt.isoformat() if obj.fecha_txt else None
+    hora = hora_a_minutos(obj.hora_txt) if obj.hora_txt else None
+    return [s for s in slots
+            if (fecha is None or s.get("fecha") == fecha)
+            and (hora is None or hora_a_minutos(s["hora"]) == hora)]
+
+def cercania(slot, obj: Objetivo):
+    """
+    Clave de orden: distancia en días a fecha_txt, orden en la agenda y, dentro del día,
+    distancia a hora_txt (o la más temprana/tardía según hora_prioridad).
+    """
+    m = hora_a_minutos(slot["hora"])
+    if obj.fecha_txt:
+        f = slot.get("fecha")
+        dias = abs((dt.date.fromisoformat(f) - obj.fecha_txt).days) if f else 10 ** 6
     else:
-        if prioridad == "LATEST":
-            hora_elegida = sorted(horas_validas)[-1]
-        else:
-            hora_elegida = sorted(horas_validas)[0]
-        log.info(f"Día elegido: {dia_valido} / Hora elegida: {hora_elegida}")
+        dias = 0
+    if obj.hora_txt:
+        hora = abs(m - hora_a_minutos(obj.hora_txt))
+    else:
+        hora = -m if obj.hora_prioridad == "LATEST" else m
+    return dias, slot.get("semana", 0), slot.get("col", 0), hora
 
+def elegir_turno(slots, obj: Objetivo, avisar: bool = True) -> Optional[dict]:
+    """
+    12) Elige el slot a reservar. Con fecha_txt/hora_txt, el turno exacto si está (sin mirar
+    la franja). Si no, el más cercano dentro de la franja hora_min/hora_max y, si no hay nada
+    en franja y hora_flexible, el más cercano de todos. Con dia_flexible=false solo se
+    consideran turnos de fecha_txt. None si no hay turno. avisar=False: sin logs (solo se
+    pregunta si hay turno).
+    """
+    info, warning = (log.info, log.warning) if avisar else (log.debug, log.debug)
+    exactos = buscar_exacto(slots, obj)
+    if exactos:
+        s = min(exactos, key=lambda s: cercania(s, obj))
+        info(f"Turno objetivo disponible: {s['dia']} / {s['hora']}")
+        return s
+    if obj.fecha_txt or obj.hora_txt:
+        info("El turno objetivo no está disponible; se buscan alternativas.")
+
+    validos = [s for s in slots if hora_a_minutos(s["hora"]) is not None]
+    if obj.fecha_txt and not obj.dia_flexible:
+        validos = [s for s in validos if s.get("fecha") == obj.fecha_txt.isoformat()]
+    hmin, hmax = hora_a_minutos(obj.hora_min), hora_a_minutos(obj.hora_max)
+    en_franja = [s for s in validos if hmin <= hora_a_minutos(s["hora"]) <= hmax]
+    if en_franja:
+        s = min(en_franja, key=lambda s: cercania(s, obj))
+        info(f"Día elegido: {s['dia']} / Hora elegida: {s['hora']}")
+        return s
+
+    if not obj.hora_flexible:
+        warning(f"No se encontró ningún horario entre {obj.hora_min} y {obj.hora_max}, y flexibilidad está desactivada.")
+        return None
+    if validos:
+        s = min(validos, key=lambda s: cercania(s, obj))
+        info(f"No se encontró horario en rango, usando el más cercano: {s['dia']} / {s['hora']}")
+        return s
+    warning("No se encontró ningún horario disponible en ningún día.")
+    return None
+
+async def paso_turno(page, dl: Deadline, estado: EstadoFlujo, captura):
+    log.info("12) Seleccionando turno dentro de franja horaria configurada…")
+    slot = elegir_turno(estado.slots, estado.obj)
+    if not slot:
+        estado.fin = "sin turno en franja"
+        return
+    dia, hora_elegida, semana = slot["dia"], slot["hora"], slot.get("semana", 0)
+
+    # Click en el div correspondiente
+    log.info("Haciendo click en el horario disponible…")
+    estado.iframe = estado.iframe or await buscar_iframe_agenda(estado.pagina or page,
+                                                                timeout_ms=dl.ms("iframe agenda", 10000, reserva=False))
+    if not estado.iframe:
+        raise ErrorTransitorio("No encontré el iframe de agenda para clickear el horario.")
+    # Desde acá se usa la reserva del presupuesto
+    desfasada = False
+    try:
+        await LIMITADOR.adquirir("reserva")
+        await ir_a_semana(estado, semana, dl, reserva=False)
+        if not await columna_coincide(estado.iframe, slot):
+            desfasada = True
+            raise ErrorTransitorio(f"La agenda ya no muestra {dia} en la columna leída; se vuelve a leer.")
+        await estado.iframe.click(selector_horario(slot),
+                                  timeout=dl.ms("12) click horario", CFG.timeout_ms, reserva=False))
+    except Exception:
+        if semana or desfasada:
+            # Puede venir de la caché y ya no estar: se vuelve a leer la agenda en el reintento
+            CACHE_AGENDA.invalidar(f"{estado.objetivo['profesional']}|{estado.objetivo['domicilio']}")
+            CACHE_BUSQUEDAS.invalidar(CacheBusquedas.clave(
+                estado.obj.servicio, estado.objetivo.get("zona", estado.obj.zona),
+                estado.objetivo.get("depto", estado.obj.depto), estado.obj.medico))
+            estado.volver_a("resultados")
+        raise
+    estado.eleccion = (dia, hora_elegida)
+    await short_sleep(0.5)
+
+async def paso_confirmacion(page, dl: Deadline, estado: EstadoFlujo, captura):
+    """
+    Con el horario ya clickeado no se reintenta nada: cualquier error se loguea y el flujo termina.
+    Los cuadros aparecen en la página de la agenda elegida (la principal o una auxiliar).
+    """
+    page = estado.pagina or page
+    # 13) Esperar cuadro de confirmación
+    log.info("13) Esperando cuadro de confirmación de turno…")
+    try:
+        # Esperar unos instantes extra por si se está animando
+        await short_sleep(5.0)
 
-        # Click en el div correspondiente
-        log.info("Haciendo click en el horario disponible…")
-        # Buscar el div con esa hora exacta
-        await iframe.click(f"div.horario_disponible:text('{hora_elegida}')")
-        await short_sleep(0.5)
+        log.info("Cuadro de confirmación detectado. Simulando Tab + Enter para aceptar…")
 
+        # Aseguramos foco en la página principal
+        await page.bring_to_front()
 
-        # 13) Esperar cuadro de confirmación
-        log.info("13) Esperando cuadro de confirmación de turno…")
-        try:
+        # Tecleamos Tab (para enfocar el botón Aceptar) y luego Enter
+        await page.keyboard.press("Tab")
+        await asyncio.sleep(0.3)
 
-            # Esperar unos instantes extra por si se está animando
-            await short_sleep(5.0)
-        
-            log.info("Cuadro de confirmación detectado. Simulando Tab + Enter para aceptar…")
-        
-            # Aseguramos foco en la página principal
-            await page.bring_to_front()
-        
-            # Tecleamos Tab (para enfocar el botón Aceptar) y luego Enter
-            await page.keyboard.press("Tab")
-            await asyncio.sleep(0.3)
-            
-            if DRY_RUN:
-                log.info("(DRY_RUN activo) No se presiona Enter; flujo detenido antes de confirmar turno.")
-                return
-            else:
-                await page.keyboard.press("Enter")
-                log.info("Teclas Tab + Enter enviadas correctamente. Esperando que se cierre el cuadro…")        
-                # Esperamos a que desaparezca el cuadro
-                await page.wait_for_selector("#pickCustomTwoButtons", state="detached", timeout=10000)
-                log.info("Cuadro de confirmación cerrado correctamente.")
-        
-        except Exception as e:
-            log.error(f"No se pudo aceptar el cuadro de confirmación: {e}")
+        if CFG.dry_run:
+            log.info("(DRY_RUN activo) No se presiona Enter; flujo detenido antes de confirmar turno.")
+            estado.fin = "dry_run"
             return
 
+        await LIMITADOR.adquirir("reserva")
+        await page.keyboard.press("Enter")
+        log.info("Teclas Tab + Enter enviadas correctamente. Esperando que se cierre el cuadro…")
+        # Esperamos a que desaparezca el cuadro
+        await page.wait_for_selector("#pickCustomTwoButtons", state="detached",
+                                     timeout=dl.ms("13) confirmación", 10000, reserva=False))
+        log.info("Cuadro de confirmación cerrado correctamente.")
+    except Exception as e:
+        log.error(f"No se pudo aceptar el cuadro de confirmación: {e}")
+        estado.fin = "confirmación fallida"
+        await evidencia_error(page, dl, "confirmacion", estado, e, reserva=False)
+        return
 
+    # 14) Esperar cuadro final de reserva
+    log.info("14) Esperando cuadro final con datos del turno…")
+    try:
+        await page.wait_for_selector("div.pick_print table",
+                                     timeout=dl.ms("14) datos del turno", 20000, reserva=False))
+        turno_info = await page.evaluate("""
+            () => {
+                const tbl = document.querySelector("div.pick_print table");
+                if (!tbl) return [];
+                const txt = tbl.innerText.trim().split("\\n");
+                return txt;
+            }
+        """)
+        estado.confirmacion = turno_info
+        log.info("==== TURNO CONFIRMADO ====")
+        for line in turno_info:
+            log.info(line)
+        log.info("===========================")
+        await evidencia(page, dl, "confirmacion", reserva=False)
+    except Exception as e:
+        log.error(f"No se pudo leer la confirmación del turno: {e}")
+        await evidencia_error(page, dl, "datos_turno", estado, e, reserva=False)
+
+def evento_del_resultado(estado: EstadoFlujo) -> Optional[Evento]:
+    """
+    Traduce el resultado del flujo a un evento: reservado, casi (había horarios pero no se
+    pudo reservar) o encontrado. None si no se llegó a ver ningún horario.
+    """
+    if not estado.objetivo or not estado.slots:
+        return None
+    prof = estado.objetivo.get("profesional", "")
+    detalle = {
+        "profesional": prof,
+        "domicilio": estado.objetivo.get("domicilio", ""),
+        "servicio": estado.objetivo.get("servicio", ""),
+        "horarios": ", ".join(f"{s['dia']} {s['hora']}" for s in estado.slots[:20]),
+    }
+    if estado.eleccion:
+        detalle["elegido"] = " ".join(estado.eleccion)
+    if estado.confirmacion:
+        detalle["confirmacion"] = " / ".join(estado.confirmacion)
+        dia, hora = estado.eleccion or ("", "")
+        return Evento("reservado", f"Turno reservado: {prof} {dia} {hora}", detalle,
+                      clave=f"reservado|{prof}|{dia}|{hora}")
+    clave_slots = "|".join(f"{s['dia']} {s['hora']}" for s in estado.slots[:20])
+    if estado.fin in ("sin turno en franja", "confirmación fallida"):
+        detalle["motivo"] = estado.fin
+        return Evento("casi", f"Hay horarios de {prof} pero no se reservó ({estado.fin})", detalle,
+                      clave=f"casi|{prof}|{clave_slots}")
+    if estado.fin == "dry_run":
+        detalle["motivo"] = "DRY_RUN"
+    return Evento("encontrado", f"Horarios disponibles: {prof}", detalle,
+                  clave=f"encontrado|{prof}|{clave_slots}")
+
+PASOS = (
+    ("sesion", paso_sesion),
+    ("formulario", paso_formulario),
+    ("resultados", paso_resultados),
+    ("agenda", paso_agenda),
+    ("turno", paso_turno),
+    ("confirmado", paso_confirmacion),
+)
+# Click en el horario + confirmación: no se interrumpen aunque cancelen la corrida
+PASOS_CRITICOS = ("turno", "confirmado")
+
+async def validar_checkpoint(page, estado: EstadoFlujo):
+    """
+    Antes de reanudar, retrocede hasta el último checkpoint que la página todavía sostiene
+    (p. ej. si se perdió la tabla de resultados, se vuelve a armar el formulario).
+    """
+    if estado.checkpoint is None or estado.llego("turno"):
+        return
+    try:
+        # Con atajo o caché la página no tiene formulario ni tabla (la agenda los arma si hace falta)
+        if (estado.llego("resultados") and not estado.atajo
+                and not await page.locator("#tblResultadoProfesionales").first.is_visible()):
+            estado.volver_a("sesion")
+        if (estado.llego("formulario") and not estado.atajo
+                and not await page.locator("select#servimod").first.is_visible()):
+            estado.volver_a("sesion")
+        if await page.locator('input[type="password"]').first.is_visible():
+            estado.volver_a(None)
+    except Exception:
+        estado.volver_a(None)
 
-
-            # 14) Esperar cuadro final de reserva
-            log.info("14) Esperando cuadro final con datos del turno…")
+async def flujo_turnos_nuevo(page, dl: Deadline, captura: Optional[CapturaXHR] = None,
+                             estado: Optional[EstadoFlujo] = None, circuito: Optional[CircuitBreaker] = None,
+                             hasta: Optional[str] = None,
+                             notificador: Optional[Notificador] = None) -> EstadoFlujo:
+    """
+    Máquina de pasos con checkpoints:
+      sesion      -> login
+      formulario  -> listarCompleto, pestaña 'Nuevo', Servicio/Zona/Depto
+      resultados  -> Buscar (con o sin médico), leer #tblResultadoProfesionales y elegir fila
+      agenda      -> 'Ver Agenda' de la fila elegida y leer horarios
+      turno       -> elegir horario según franja y clickearlo
+      confirmado  -> aceptar el cuadro y leer los datos del turno
+    Ante un error transitorio se reintenta desde el último checkpoint válido (no desde el login).
+    Cada espera toma su timeout de dl; los pasos de reserva del turno usan la reserva.
+    El resultado se publica en el notificador (sin bloquear) al terminar.
+    """
+    estado = estado or EstadoFlujo(CFG.cuentas[0], CFG.objetivos[0])
+    cuenta_actual.set(estado.cuenta.id)
+
+    async def correr(pasos) -> bool:
+        """Corre los pasos pendientes; False si el flujo terminó o se llegó a 'hasta'."""
+        for nombre, paso in pasos:
+            if estado.fin:
+                return False
+            if estado.llego(nombre):
+                continue
+            t0 = time.monotonic()
             try:
-                await page.wait_for_selector("div.pick_print table", timeout=20000)
-                turno_info = await page.evaluate("""
-                    () => {
-                        const tbl = document.querySelector("div.pick_print table");
-                        if (!tbl) return {};
-                        const txt = tbl.innerText.trim().split("\\n");
-                        return txt;
-                    }
-                """)
-                log.info("==== TURNO CONFIRMADO ====")
-                for line in turno_info:
-                    log.info(line)
-                log.info("===========================")
+                await paso(page, dl, estado, captura)
             except Exception as e:
-                log.error(f"No se pudo leer la confirmación del turno: {e}")
+                log.warning(f"Falló el paso '{nombre}' (último checkpoint: {estado.checkpoint or 'ninguno'}).")
+                if not isinstance(e, PresupuestoAgotado):
+                    await evidencia_error(page, dl, nombre, estado, e, reserva=nombre not in ("turno", "confirmado"))
+                raise
+            finally:
+                estado.tiempos[nombre] = estado.tiempos.get(nombre, 0.0) + time.monotonic() - t0
+            if estado.fin:
+                return False
+            estado.checkpoint = nombre
+            if nombre == hasta:
+                return False
+        return True
 
+    async def avanzar():
+        await validar_checkpoint(page, estado)
+        if await correr([p for p in PASOS if p[0] not in PASOS_CRITICOS]):
+            await blindar(correr([p for p in PASOS if p[0] in PASOS_CRITICOS]))
 
-    log.info("10) Flujo completado. La ventana quedará ABIERTA para revisión manual.")
+    try:
+        await reintentar(avanzar, paso="flujo", intentos=CFG.reintentos, base_s=CFG.reintento_base_s,
+                         tope_s=CFG.reintento_tope_s, dl=dl, circuito=circuito)
+    finally:
+        # Páginas auxiliares de las agendas: queda abierta solo la del turno clickeado (revisión manual)
+        await cerrar_carriles(estado, salvo=estado.pagina if estado.eleccion else None)
+
+    log.info(f"Tiempos por paso: {estado.resumen_tiempos()}")
+    if notificador:
+        evento = evento_del_resultado(estado)
+        if evento:
+            notificador.publicar(evento)
+    if estado.fin:
+        log.info(f"Flujo terminado sin reservar: {estado.fin}.")
+    else:
+        log.info("10) Flujo completado. La ventana quedará ABIERTA para revisión manual.")
+    return estado
 
 # ================== MAIN ==================
-async def amain() -> int:
-    log.info("==== INICIO OSEP TURNOS (FLUJO NUEVO) ====")
-    if not OSEP_USER or not OSEP_PASS:
-        log.error("Definí OSEP_USER y OSEP_PASS en .env")
-        return 2
-
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=HEADLESS, args=["--no-sandbox"])
-        context = await browser.new_context()
-        page = await context.new_page()
-        await page.bring_to_front()
+@dataclasses.dataclass
+class Sesion:
+    """Un contexto de navegador por cuenta (cookies propias), con su página y su captura XHR."""
+    context: object
+    page: object
+    captura: Optional[CapturaXHR] = None
+    logueada: bool = False
+    escaneos: int = 0        # flujos corridos con este contexto (el pool lo recicla al llegar al tope)
+    har: Optional[pathlib.Path] = None    # HAR que se está grabando (se redacta al cerrar)
+    cuenta: Optional[Cuenta] = None
+
+    async def cerrar(self):
+        if self.captura:
+            self.captura.cerrar()
         try:
-            await page.evaluate("window.moveTo(0,0); window.resizeTo(screen.availWidth, screen.availHeight);")
+            await self.context.close()
         except Exception:
             pass
+        if self.har and self.har.exists():
+            har.redactar_har(self.har, self.cuenta.usuario, self.cuenta.password)
+
+def ruta_har(cuenta_id: str) -> pathlib.Path:
+    base = CFG.har_archivo or CFG.estado_dir / "sesion.har"
+    if len(CFG.cuentas) > 1:
+        sufijo = re.sub(r"[^\w.-]", "_", cuenta_id)
+        base = base.with_stem(f"{base.stem}-{sufijo}")
+    return base
+
+async def abrir_sesion(browser, cuenta_id: str) -> Sesion:
+    cuenta = next((c for c in CFG.cuentas if c.id == cuenta_id), None)
+    grabar = ruta_har(cuenta_id) if CFG.har_modo == "grabar" else None
+    context = await nuevo_contexto(browser, **(har.opciones_grabar(grabar) if grabar else {}))
+    if CFG.har_modo == "reproducir":
+        await har.reproducir(context, ruta_har(cuenta_id))
+    page = await context.new_page()
+    captura = CapturaXHR(page, CFG.xhr_busqueda_patron, CFG.xhr_agenda_patron) if CFG.xhr_captura else None
+    return Sesion(context, page, captura, har=grabar, cuenta=cuenta)
+
+def cuenta_del_flujo(cuenta: Cuenta) -> Cuenta:
+    """Al reproducir un HAR el login usa los marcadores con que se redactó la grabación."""
+    if CFG.har_modo == "reproducir":
+        return dataclasses.replace(cuenta, usuario=har.USUARIO_REDACTADO, password=har.CLAVE_REDACTADA)
+    return cuenta
+
+async def bench_har(browser, veces: int) -> int:
+    """
+    Reproduce el HAR 'veces' veces (contexto nuevo cada vez, sin red) y loguea la latencia
+    total y por paso del flujo: sirve como benchmark de regresión del propio bot.
+    """
+    cuenta, obj = CFG.pares()[0]
+    totales, por_paso = [], {}
+    for i in range(veces):
+        ses = await abrir_sesion(browser, cuenta.id)
+        estado = EstadoFlujo(cuenta_del_flujo(cuenta), obj)
+        t0 = time.perf_counter()
+        try:
+            await flujo_turnos_nuevo(ses.page, Deadline(CFG.presupuesto_s, CFG.reserva_booking_s), ses.captura, estado)
+        finally:
+            await ses.cerrar()
+        totales.append(time.perf_counter() - t0)
+        for paso, seg in estado.tiempos.items():
+            por_paso.setdefault(paso, []).append(seg)
+    log.info(f"Bench HAR ({veces} corridas): flujo {resumen_latencias(totales)}")
+    for paso in CHECKPOINTS:
+        if paso in por_paso:
+            log.info(f"  {paso:<11} {resumen_latencias(por_paso[paso])}")
+    return 0
 
+async def amain() -> int:
+    log.info("==== INICIO OSEP TURNOS (FLUJO NUEVO) ====")
+    try:
+        recargable = ConfigRecargable()
+    except ConfigError as e:
+        log.error(str(e))
+        return 2
+    configurar(recargable.cfg)
+    log.info(f"Config: {len(CFG.cuentas)} cuenta(s), {len(CFG.objetivos)} objetivo(s)"
+             + (f" desde {CFG.archivo}" if CFG.archivo else " desde el entorno") + ".")
+
+    # Una sola corrida a la vez: si hay otra en curso se sale sin lanzar el navegador
+    lease = Lease(CFG.estado_dir / "lease.sqlite3", ttl_s=CFG.lease_ttl_s or CFG.presupuesto_s + 60)
+    if not await asyncio.to_thread(lease.adquirir):
+        log.info(f"Hay otra corrida en curso ({lease.actual['dueno']}, vence en "
+                 f"{lease.actual['vence_en_s']:.0f}s); se sale sin hacer nada.")
+        return 0
+    latido = asyncio.create_task(lease.latir(), name="lease")
+    instalar_senales(asyncio.current_task())
+    try:
+        if CFG.workers > 1:
+            return await correr_coordinador(recargable)
+        return await correr_bot(recargable)
+    except asyncio.CancelledError:
+        log.warning("Corrida cancelada (señal o cancelación del workflow).")
+        return 5
+    finally:
+        latido.cancel()
+        await asyncio.to_thread(lease.liberar)
+
+async def portal_disponible(salud: SaludPortal, circuito: CircuitBreaker) -> bool:
+    """
+    Sondeo HTTP barato (y cacheado) del portal. Si está caído se cuenta como fallo del
+    circuito y como corrida salteada, sin lanzar ni usar el navegador.
+    """
+    if not CFG.salud_timeout_s or CFG.har_modo == "reproducir":
+        return True
+    sonda = await salud.aconsultar(CFG.portal_url, CFG.salud_timeout_s)
+    if sonda.ok:
+        log.info(f"Portal disponible ({sonda.motivo}, {sonda.seg:.2f}s{', caché' if sonda.cacheada else ''}).")
+        return True
+    if not sonda.cacheada:
+        circuito.fallo(f"salud: {sonda.motivo}")
+    salud.registrar_salto()
+    log.warning(f"Portal NO disponible ({sonda.motivo}{', caché' if sonda.cacheada else ''}); "
+                f"se saltea sin usar el navegador. Corridas salteadas: {salud.saltos}.")
+    return False
+
+async def correr_bot(recargable: ConfigRecargable) -> int:
+    dl = Deadline(CFG.presupuesto_s, CFG.reserva_booking_s)
+
+    # Las reproducciones de HAR no deben abrir (ni respetar) el circuito del portal real
+    nombre_circuito = "circuito-har.json" if CFG.har_modo == "reproducir" else "circuito.json"
+    circuito = CircuitBreaker(CFG.estado_dir / nombre_circuito, CFG.circuito_umbral, CFG.circuito_enfriamiento_s)
+    if not circuito.permitir():
+        log.warning(f"Circuito abierto (último error: {circuito.ultimo_error}); se saltea la corrida. "
+                    f"Próximo intento en {circuito.segundos_restantes():.0f}s.")
+        return 0
+    salud = SaludPortal(CFG.estado_dir / "salud.json", CFG.salud_cache_ttl_s)
+    # En modo daemon se espera a que vuelva antes de lanzar el navegador
+    while not await portal_disponible(salud, circuito):
+        if not CFG.daemon_intervalo_s:
+            return 0
+        await asyncio.sleep(max(CFG.daemon_intervalo_s, circuito.segundos_restantes()))
 
+    async with async_playwright() as p:
+        browser = await lanzar(p, headless=CFG.headless)
+        if CFG.har_modo == "reproducir" and CFG.har_repeticiones > 1:
+            try:
+                return await bench_har(browser, CFG.har_repeticiones)
+            finally:
+                await browser.close()
+        sesiones = PoolSesiones(lambda cid: abrir_sesion(browser, cid), CFG.contexto_max_escaneos, CFG.memoria_max_mb)
+        resueltos = set()  # (cuenta.id, objetivo.id) que ya tienen turno
+        notificador = armar_notificador() if CFG.har_modo != "reproducir" else None
+        if notificador:
+            notificador.iniciar()
+        iniciar_evidencias()
 
         try:
-            await login(page)
-
-            if STOP_AFTER_LOGIN:
-                log.info("STOP_AFTER_LOGIN activo: fin de prueba.")
-                return 0
-
-            await flujo_turnos_nuevo(page)
-            return 0
+            ciclo = 0
+            while True:
+                # El primer ciclo ya se chequeó antes de lanzar el navegador
+                disponible = ciclo == 0 or await portal_disponible(salud, circuito)
+                ciclo += 1
+                for cuenta, obj in (CFG.pares() if disponible else []):
+                    clave = (cuenta.id, obj.id)
+                    if clave in resueltos:
+                        continue
+                    ses = await sesiones.obtener(cuenta.id)
+                    if len(CFG.pares()) > 1:
+                        log.info(f"---- Cuenta {cuenta.id!r} / objetivo {obj.id!r} ----")
+                    # Con la sesión ya abierta se arranca directo desde el formulario
+                    estado = EstadoFlujo(cuenta_del_flujo(cuenta), obj, checkpoint="sesion" if ses.logueada else None)
+                    try:
+                        await flujo_turnos_nuevo(ses.page, dl, ses.captura, estado, circuito,
+                                                 hasta="sesion" if CFG.stop_after_login else None,
+                                                 notificador=notificador)
+                        circuito.exito()
+                    except (ErrorFatal, PresupuestoAgotado):
+                        raise
+                    except Exception as e:
+                        if not CFG.daemon_intervalo_s:
+                            raise
+                        log.error(f"Ciclo fallido ({e.__class__.__name__}: {e}); se sigue en el próximo ciclo.")
+                    ses.logueada = estado.llego("sesion")
+                    ses.escaneos += 1
+                    if estado.llego("turno"):
+                        resueltos.add(clave)
+
+                if CFG.stop_after_login:
+                    log.info("STOP_AFTER_LOGIN activo: fin de prueba.")
+                    return 0
+                if not CFG.daemon_intervalo_s or all((c.id, o.id) in resueltos for c, o in CFG.pares()):
+                    return 0
+
+                # Modo daemon: mismo navegador y sesiones; cada par se reanuda desde el checkpoint 'sesion'
+                log.info(f"Memoria: {await sesiones.reporte()}")
+                intervalo = CFG.daemon_intervalo_s
+                espera = intervalo if circuito.permitir() else max(intervalo, circuito.segundos_restantes())
+                log.info(f"Modo daemon: próximo ciclo en {espera:.0f}s…")
+                await asyncio.sleep(espera)
+                if recargable.recargar_si_cambio():
+                    configurar(recargable.cfg)
+                    sesiones.max_escaneos, sesiones.max_rss_mb = CFG.contexto_max_escaneos, CFG.memoria_max_mb
+                    activas = {c.id for c in CFG.cuentas}
+                    for cid in [cid for cid in sesiones.sesiones if cid not in activas]:
+                        await sesiones.descartar(cid)
+                dl = Deadline(CFG.presupuesto_s, CFG.reserva_booking_s)
+
+        except PresupuestoAgotado as e:
+            log.error(f"Corrida abortada: {e}.")
+            return 4
+
+        except ErrorFatal as e:
+            log.error(f"Error no recuperable (sin reintentos): {e}")
+            return 3
 
         except Exception as e:
             log.error("Error en ejecución:\n" + "".join(traceback.format_exception(e)))
@@ -1766,35 +1867,166 @@ async def amain() -> int:
 
         finally:
             try:
-                await context.close()
+                log.info(f"Memoria al cerrar: {await sesiones.reporte()}")
             except Exception:
                 pass
+            log.info(f"Caché de búsquedas: {CACHE_BUSQUEDAS.resumen()}.")
+            log.info(f"Limitador: {LIMITADOR.resumen()}")
+            log.info(f"Selectores: {SELECTORES.resumen()}")
+            log.info(f"Atajos: {ATAJOS.resumen()}")
+            SELECTORES.guardar()
+            if EVID:
+                await asyncio.to_thread(EVID.cerrar)
+            await sesiones.cerrar()
             try:
                 await browser.close()
             except Exception:
                 pass
-
-# ================== Footer compatible Spyder/Terminal (Windows) ==================
-if __name__ == "__main__":
-    def _runner():
-        if sys.platform.startswith("win"):
+            if notificador:
+                await notificador.cerrar(timeout_s=max(1.0, min(15.0, dl.restante_s(reserva=False))))
+
+# ================== MULTIPROCESO ==================
+def worker_main(indice: int, cola, resultados, cfg: Config, procesos: int = 1):
+    """Entrada de cada proceso worker (ver turnos/workers.py): un navegador y su pool de contextos."""
+    global PROCESOS
+    PROCESOS = procesos
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # el Ctrl+C lo maneja el coordinador
+    console_handler.setFormatter(logging.Formatter(f"%(asctime)s | w{indice} | %(levelname)-7s | %(message)s"))
+    configurar(cfg)
+    bucle.correr(correr_worker, indice, cola, resultados)
+
+async def correr_worker(indice: int, cola, resultados):
+    circuito = CircuitBreaker(CFG.estado_dir / "circuito.json", CFG.circuito_umbral, CFG.circuito_enfriamiento_s)
+    async with async_playwright() as p:
+        browser = await lanzar(p, headless=CFG.headless)
+        sesiones = PoolSesiones(lambda cid: abrir_sesion(browser, cid), CFG.contexto_max_escaneos, CFG.memoria_max_mb)
+        iniciar_evidencias(f"_w{indice}")
+        try:
+            while True:
+                msg = await asyncio.to_thread(cola.get)
+                if msg is None:
+                    break
+                if msg[0] == "config":
+                    configurar(msg[1])
+                    continue
+                _, cid, oid, inicio = msg
+                item = (cid, oid)
+                resultados.put(("tomado", indice, item))
+                cuenta = next((c for c in CFG.cuentas if c.id == cid), None)
+                obj = next((o for o in CFG.objetivos if o.id == oid), None)
+                if cuenta is None or obj is None:
+                    resultados.put(("resultado", indice, item, {"error": "par fuera de la config vigente"}))
+                    continue
+                ses = await sesiones.obtener(cid)
+                estado = EstadoFlujo(cuenta_del_flujo(cuenta), obj, checkpoint="sesion" if ses.logueada else None)
+                # El presupuesto es del ciclo del coordinador, no de cada par
+                dl = Deadline(max(1.0, CFG.presupuesto_s - (time.time() - inicio)), CFG.reserva_booking_s)
+                t0 = time.perf_counter()
+                espera0 = LIMITADOR.espera_total_s()
+                error, fatal = None, False
+                try:
+                    await flujo_turnos_nuevo(ses.page, dl, ses.captura, estado, circuito,
+                                             hasta="sesion" if CFG.stop_after_login else None)
+                    circuito.exito()
+                except Exception as e:
+                    error, fatal = f"{e.__class__.__name__}: {e}", isinstance(e, ErrorFatal)
+                    log.error(f"Par {item} fallido ({error}).")
+                ses.logueada = estado.llego("sesion")
+                ses.escaneos += 1
+                evento = evento_del_resultado(estado)
+                resultados.put(("resultado", indice, item, {
+                    "fin": estado.fin, "checkpoint": estado.checkpoint, "reservado": estado.llego("turno"),
+                    "error": error, "fatal": fatal, "seg": time.perf_counter() - t0,
+                    "tiempos": dict(estado.tiempos), "rss_mb": sesiones.medir_rss(),
+                    "espera_limite_s": LIMITADOR.espera_total_s() - espera0,
+                    "evento": evento.como_dict() if evento else None,
+                }))
+        finally:
+            log.info(f"Limitador: {LIMITADOR.resumen()}")
+            log.info(f"Selectores: {SELECTORES.resumen()}")
+            log.info(f"Atajos: {ATAJOS.resumen()}")
+            SELECTORES.guardar()
+            if EVID:
+                await asyncio.to_thread(EVID.cerrar)
+            await sesiones.cerrar()
             try:
-                asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+                await browser.close()
             except Exception:
                 pass
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            rc = loop.run_until_complete(amain())
-        finally:
-            loop.run_until_complete(loop.shutdown_asyncgens())
-            loop.close()
-        os._exit(rc)
 
+async def correr_coordinador(recargable: ConfigRecargable) -> int:
+    """
+    Reparte los pares (cuenta, objetivo) entre WORKERS procesos (tope: núcleos disponibles),
+    junta resultados/métricas, publica las notificaciones y relanza workers caídos.
+    """
+    circuito = CircuitBreaker(CFG.estado_dir / "circuito.json", CFG.circuito_umbral, CFG.circuito_enfriamiento_s)
+    if not circuito.permitir():
+        log.warning(f"Circuito abierto (último error: {circuito.ultimo_error}); se saltea la corrida.")
+        return 0
+    salud = SaludPortal(CFG.estado_dir / "salud.json", CFG.salud_cache_ttl_s)
+    while not await portal_disponible(salud, circuito):
+        if not CFG.daemon_intervalo_s:
+            return 0
+        await asyncio.sleep(max(CFG.daemon_intervalo_s, circuito.segundos_restantes()))
+    n = max(1, min(CFG.workers, os.cpu_count() or 1, len(CFG.pares())))
+    coord = Coordinador(n, worker_main, args_extra=lambda: (CFG, n)).iniciar()
+    notificador = armar_notificador()
+    if notificador:
+        notificador.iniciar()
+    resueltos, rc, ciclo = set(), 0, 0
     try:
-        asyncio.get_running_loop()
-        t = threading.Thread(target=_runner, daemon=True)
-        t.start()
-        t.join()
-    except RuntimeError:
-        sys.exit(asyncio.run(amain()))
\ No newline at end of file
+        while True:
+            if ciclo and not await portal_disponible(salud, circuito):
+                await asyncio.sleep(CFG.daemon_intervalo_s)
+                continue
+            ciclo += 1
+            inicio = time.time()
+            pendientes = {(c.id, o.id) for c, o in CFG.pares() if (c.id, o.id) not in resueltos}
+            for cid, oid in sorted(pendientes):
+                coord.enviar(f"{cid}|{oid}", (cid, oid), ("par", cid, oid, inicio))
+            recibidos = {}
+            while len(recibidos) < len(pendientes):
+                if time.time() - inicio > CFG.presupuesto_s + 60:
+                    log.error(f"Ciclo vencido con {len(pendientes) - len(recibidos)} par(es) sin resultado.")
+                    break
+                msg = await coord.recibir(1.0)
+                if msg is None or msg[0] == "tomado":
+                    continue
+                tipo, i, item, datos = msg
+                recibidos[item] = {**datos, "worker": i}
+                if datos.get("evento") and notificador:
+                    notificador.publicar(Evento(**datos["evento"]))
+                if datos.get("reservado"):
+                    resueltos.add(item)
+                if datos.get("fatal"):
+                    rc = 3
+
+            seg = [d["seg"] for d in recibidos.values() if "seg" in d]
+            errores = sum(1 for d in recibidos.values() if d.get("error"))
+            duracion = time.time() - inicio
+            log.info(f"Ciclo: {len(recibidos)}/{len(pendientes)} par(es) en {duracion:.1f}s "
+                     f"({len(recibidos) / max(duracion, 1e-6) * 60:.1f} pares/min), {errores} con error, "
+                     f"{len(resueltos)} resuelto(s); por par {resumen_latencias(seg)}")
+            for i in range(n):
+                propios = [d for d in recibidos.values() if d["worker"] == i]
+                rss = max((d["rss_mb"] for d in propios if d.get("rss_mb") is not None), default=None)
+                espera = sum(d.get("espera_limite_s", 0.0) for d in propios)
+                log.info(f"  worker {i}: {len(propios)} par(es), reinicios {coord.reinicios[i]}, "
+                         f"{espera:.1f}s esperando al limitador"
+                         + (f", navegador {rss:.0f} MB RSS" if rss is not None else ""))
+
+            if CFG.stop_after_login or not CFG.daemon_intervalo_s or pendientes <= resueltos:
+                return rc
+            await asyncio.sleep(CFG.daemon_intervalo_s)
+            if recargable.recargar_si_cambio():
+                configurar(recargable.cfg)
+                coord.difundir(("config", CFG))
+    finally:
+        await coord.cerrar(gracia_s=max(5.0, CFG.reserva_booking_s))
+        if notificador:
+            await notificador.cerrar()
+
+# ================== ARRANQUE ==================
+if __name__ == "__main__":
+    # uvloop en Linux si está instalado; en Spyder/Jupyter la corrida va en un hilo propio
+    sys.exit(bucle.correr(amain))
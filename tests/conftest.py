@@ -0,0 +1,18 @@
+import pytest
+
+
+class RelojFalso:
+    """Reemplazo de time.time/time.monotonic para los módulos que reciben reloj=."""
+    def __init__(self, t: float = 1000.0):
+        self.t = t
+
+    def __call__(self) -> float:
+        return self.t
+
+    def avanzar(self, seg: float):
+        self.t += seg
+
+
+@pytest.fixture
+def reloj():
+    return RelojFalso()
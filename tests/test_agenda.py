@@ -0,0 +1,71 @@
+import datetime as dt
+
+from turnos.agenda import CacheSemanas, lunes_de, parsear_fecha_cabecera, unir_semanas, urls_por_semana
+
+MIERCOLES = dt.date(2026, 10, 21)
+
+
+def test_cabecera_con_dia_y_mes_toma_el_anio_mas_cercano():
+    assert parsear_fecha_cabecera("Jue 22/10", 0, MIERCOLES) == dt.date(2026, 10, 22)
+    assert parsear_fecha_cabecera("Lun 04/01", 0, dt.date(2026, 12, 30)) == dt.date(2027, 1, 4)
+    assert parsear_fecha_cabecera("Mié 30.12", 0, dt.date(2027, 1, 2)) == dt.date(2026, 12, 30)
+    assert parsear_fecha_cabecera("Vie 23/10/26", 0, MIERCOLES) == dt.date(2026, 10, 23)
+    assert parsear_fecha_cabecera("31/02/2026", 0, MIERCOLES) is None
+    assert parsear_fecha_cabecera("Columna 3", 0, MIERCOLES) is None
+
+
+def test_cabecera_con_solo_el_dia():
+    assert parsear_fecha_cabecera("Miércoles", 0, MIERCOLES) == MIERCOLES
+    assert parsear_fecha_cabecera("Vie", 0, MIERCOLES) == dt.date(2026, 10, 23)
+    assert parsear_fecha_cabecera("Mié", 2, MIERCOLES) == dt.date(2026, 11, 4)
+    # La grilla arranca el lunes: un lunes o un domingo de la semana 0 no saltan a otra semana
+    assert lunes_de(MIERCOLES) == dt.date(2026, 10, 19)
+    assert parsear_fecha_cabecera("Lun", 0, MIERCOLES) == dt.date(2026, 10, 19)
+    assert parsear_fecha_cabecera("Dom", 0, MIERCOLES) == dt.date(2026, 10, 25)
+    assert parsear_fecha_cabecera("Lun", 1, MIERCOLES) == dt.date(2026, 10, 26)
+
+
+def test_29_de_febrero_solo_en_bisiestos():
+    assert parsear_fecha_cabecera("Mar 29/02", 0, dt.date(2028, 1, 10)) == dt.date(2028, 2, 29)
+    assert parsear_fecha_cabecera("29/02", 0, MIERCOLES) is None
+
+
+def test_urls_por_semana_corre_las_fechas_de_la_query():
+    url = "https://portal/agenda?prof=7&fecha=19/10/2026&hasta=2026-10-25&vacio="
+    assert urls_por_semana(url, 3) == [
+        "https://portal/agenda?prof=7&fecha=26/10/2026&hasta=2026-11-01&vacio=",
+        "https://portal/agenda?prof=7&fecha=02/11/2026&hasta=2026-11-08&vacio=",
+    ]
+    assert urls_por_semana(url, 1) == []
+    assert urls_por_semana("https://portal/agenda?prof=7", 3) is None
+
+
+def test_unir_semanas_fecha_cada_slot():
+    slots = unir_semanas({0: [{"dia": "Jue 22/10", "hora": "08:00", "col": 1}],
+                          1: [{"dia": "Jue 29/10", "hora": "08:00", "col": 1}, {"dia": "Columna 4", "hora": "09:00", "col": 4}]},
+                         MIERCOLES)
+    assert [s["fecha"] for s in slots] == ["2026-10-22", "2026-10-29", None]
+
+
+def test_unir_semanas_separa_rotulos_repetidos():
+    slots = unir_semanas({1: [{"dia": "Lun", "hora": "09:00", "col": 0}],
+                          0: [{"dia": "Lun", "hora": "08:00", "col": 0}, {"dia": "Mar", "hora": "08:00", "col": 1}],
+                          2: None})
+    assert [(s["dia"], s["hora"], s["semana"]) for s in slots] == [
+        ("Lun", "08:00", 0), ("Mar", "08:00", 0), ("Lun (sem. 2)", "09:00", 1)]
+
+
+def test_cache_semanas_vence_y_se_invalida(reloj):
+    cache = CacheSemanas(ttl_s=60, reloj=reloj)
+    cache.guardar("prof", 1, [{"hora": "08:00"}])
+    cache.guardar("prof", 2, [])
+    assert cache.obtener("prof", 1) == [{"hora": "08:00"}] and cache.obtener("prof", 2) == []
+    cache.invalidar("prof")
+    assert cache.obtener("prof", 1) is None
+    cache.guardar("prof", 1, [{"hora": "08:00"}])
+    reloj.avanzar(61)
+    assert cache.obtener("prof", 1) is None
+    # ttl 0 (fuera del modo daemon): no guarda nada
+    apagada = CacheSemanas(ttl_s=0)
+    apagada.guardar("prof", 1, [])
+    assert apagada.obtener("prof", 1) is None
@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+
+from turnos.analitica import cargar, episodios, por_profesional, reporte
+from turnos.historial import Historial
+
+
+def _agenda(t, *horas, profesional="PEREZ"):
+    return {"t": t, "tipo": "agenda", "servicio": "ODONTO", "profesional": profesional, "domicilio": "Centro",
+            "cubre_hasta": "2030-12-31", "slots": [{"fecha": "2030-01-07", "hora": h} for h in horas]}
+
+
+def _filas(t, *disp):
+    return {"t": t, "tipo": "filas", "servicio": "ODONTO",
+            "filas": [{"profesional": p, "domicilio": "Centro", "disp": d} for p, d in disp]}
+
+
+def _historial(tmp_path, registros):
+    d = tmp_path / "historial"
+    d.mkdir()
+    (d / "2026-10.jsonl").write_text("".join(json.dumps(r) + "\n" for r in registros), encoding="utf-8")
+    return Historial(d)
+
+
+def test_episodios_de_cada_turno(tmp_path):
+    d = cargar(_historial(tmp_path, [_agenda(0, "08:00"), _agenda(600, "08:00", "09:00"), _agenda(1200, "09:00")]))
+    assert len(d["esc_t"]) == 3
+    ep = episodios(d)
+    orden = np.argsort(ep["inicio"])
+    # 08:00 estuvo de 0 a 1200 (desapareció en el tercer escaneo); 09:00 apareció después y sigue
+    assert ep["inicio"][orden].tolist() == [0, 600]
+    assert ep["vida_s"][orden][0] == 1200 and np.isnan(ep["vida_s"][orden][1])
+    assert ep["censurado"][orden].tolist() == [False, True]
+    assert ep["liberado"][orden].tolist() == [False, True]
+    assert ep["vencido"][orden].tolist() == [False, False]
+
+
+def test_un_escaneo_que_no_llega_a_la_fecha_no_prueba_que_lo_tomaron(tmp_path):
+    corto = {**_agenda(600), "cubre_hasta": "2029-12-31"}
+    ep = episodios(cargar(_historial(tmp_path, [_agenda(0, "08:00"), corto])))
+    assert ep["censurado"].tolist() == [True]
+
+
+def test_disponibilidad_por_profesional_y_reporte(tmp_path):
+    dia = 86400
+    h = _historial(tmp_path, [_filas(0, ("PEREZ", "05-01-1970"), ("GOMEZ", "---")),
+                              _filas(dia, ("PEREZ", "---"), ("GOMEZ", "03-01-1970")),
+                              _agenda(0, "08:00"), _agenda(600)])
+    d = cargar(h, filtros={"servicio": "odontó"})
+    assert d["f_ok"].tolist() == [True, False, False, True]
+    filas = por_profesional(d)
+    assert [(p, n, pct) for p, n, pct, _ in filas] == [("GOMEZ | Centro", 2, 50.0), ("PEREZ | Centro", 2, 50.0)]
+    rep = reporte(d)
+    assert (rep["turnos_vistos"], rep["tomados"], rep["filas_resultados"]) == (1, 1, 4)
+    assert rep["vida_tramos_min"]["10-30"] == 1
+
+
+def test_filtros_e_historial_vacio(tmp_path):
+    h = _historial(tmp_path, [_agenda(0, "08:00"), _agenda(0, "10:00", profesional="GOMEZ")])
+    d = cargar(h, filtros={"profesional": "gómez"})
+    assert d["agendas"] == ["GOMEZ | Centro"]
+    vacio = cargar(h, desde_ts=10)
+    assert len(episodios(vacio)["inicio"]) == 0 and reporte(vacio)["vida_min"] == {}
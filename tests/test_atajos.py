@@ -0,0 +1,31 @@
+from turnos.atajos import Atajos, clave_agenda
+
+REQUEST = {"url": "https://portal/turnos/buscar", "method": "POST", "post_data": "a=1", "headers": {}}
+
+
+def test_se_olvida_despues_de_max_fallos_seguidos(tmp_path):
+    ruta = tmp_path / "atajos.json"
+    atajos = Atajos(ruta, max_fallos=2)
+    atajos.aprender("busqueda", "k", REQUEST)
+    atajos.fallo("busqueda", "k", "sin tabla")
+    atajos.exito("busqueda", "k")
+    atajos.fallo("busqueda", "k", "sin tabla")
+    assert Atajos(ruta).obtener("busqueda", "k") == {**REQUEST, "fallos": 1}
+    atajos.fallo("busqueda", "k", "sin tabla")
+    assert atajos.obtener("busqueda", "k") is None
+    assert Atajos(ruta).obtener("busqueda", "k") is None
+    assert [p.name for p in tmp_path.iterdir()] == ["atajos.json"]
+
+
+def test_el_temporal_de_otro_proceso_no_se_pisa(tmp_path):
+    # Otro worker a mitad de guardar: su temporal lleva su pid
+    ajeno = tmp_path / "atajos.json.999999.tmp"
+    ajeno.write_text('{"busqueda": {', encoding="utf-8")
+    Atajos(tmp_path / "atajos.json").aprender("busqueda", "k", REQUEST)
+    assert ajeno.read_text(encoding="utf-8") == '{"busqueda": {'
+    assert Atajos(tmp_path / "atajos.json").obtener("busqueda", "k") == {**REQUEST, "fallos": 0}
+
+
+def test_clave_agenda_normaliza_espacios_y_mayusculas():
+    assert clave_agenda("ODONTO", {"profesional": "PEREZ  Juan", "domicilio": "Belgrano 5 "}) == \
+        "odonto|perez juan|belgrano 5"
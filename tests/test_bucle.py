@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+import pytest
+
+from turnos import bucle
+
+
+async def _principal(rc):
+    await asyncio.sleep(0)
+    return rc, threading.current_thread().name, type(asyncio.get_running_loop()).__module__
+
+
+def test_eleccion_del_loop(monkeypatch):
+    assert bucle.fabrica_bucle("asyncio") == ("asyncio", None)
+    monkeypatch.setattr(bucle, "_uvloop", lambda: None)
+    assert bucle.fabrica_bucle("uvloop") == ("asyncio", None)
+    monkeypatch.setenv("BUCLE", "cualquiera")
+    assert bucle.fabrica_bucle() == ("asyncio", None)
+
+
+def test_correr_devuelve_el_codigo_de_salida():
+    rc, hilo, _ = bucle.correr(_principal, 3, preferencia="asyncio")
+    assert rc == 3 and hilo == threading.current_thread().name
+
+
+def test_con_un_loop_ya_corriendo_va_en_otro_hilo():
+    async def dentro():
+        return bucle.correr(_principal, 0, preferencia="asyncio")
+    rc, hilo, _ = asyncio.run(dentro())
+    assert rc == 0 and hilo == "osep-main"
+
+    async def falla():
+        raise KeyError("x")
+
+    async def dentro_falla():
+        return bucle.correr(falla)
+    with pytest.raises(KeyError):
+        asyncio.run(dentro_falla())
+
+
+def test_benchmark_del_loop():
+    r = asyncio.run(bucle._medir(2, 0.2))
+    assert r["paginas"] == 2 and r["mensajes_s"] > 0 and r["p95_us"] >= r["p50_us"]
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from turnos.cache_busquedas import CacheBusquedas
+
+FILAS = [{"profesional": "PEREZ JUAN", "disp": "20-10-2026", "rowIndex": 0}]
+
+
+def test_la_clave_ignora_tildes_mayusculas_y_espacios():
+    assert CacheBusquedas.clave("Clínica  Médica", "ZONA ESTE", "San Martín") == \
+        CacheBusquedas.clave("CLINICA MEDICA", "zona este", "SAN MARTIN ")
+    assert CacheBusquedas.clave("ODONTO", "*", "*", "perez") != CacheBusquedas.clave("ODONTO", "*", "*")
+
+
+def test_vencimiento_y_copias(reloj):
+    cache = CacheBusquedas(ttl_s=60, reloj=reloj)
+    cache.guardar("k", FILAS)
+    filas = cache.fresco("k")
+    filas[0]["disp"] = "otra"
+    assert cache.fresco("k") == FILAS
+    reloj.avanzar(61)
+    assert cache.fresco("k") is None
+    assert CacheBusquedas(ttl_s=0).fresco("k") is None
+
+
+def test_tope_de_entradas_descarta_la_menos_usada():
+    cache = CacheBusquedas(ttl_s=60, max_entradas=2)
+    cache.guardar("a", FILAS)
+    cache.guardar("b", FILAS)
+    cache.fresco("a")
+    cache.guardar("c", FILAS)
+    assert cache.fresco("b") is None and cache.fresco("a") == FILAS and cache.fresco("c") == FILAS
+
+
+def test_busquedas_simultaneas_van_una_sola_vez_al_portal():
+    cache = CacheBusquedas(ttl_s=60)
+    llamadas = []
+
+    async def producir():
+        llamadas.append(1)
+        await asyncio.sleep(0.01)
+        return FILAS
+
+    async def correr():
+        return await asyncio.gather(*(cache.obtener("k", producir) for _ in range(3)))
+
+    assert asyncio.run(correr()) == [FILAS] * 3
+    assert len(llamadas) == 1
+    assert (cache.fallos, cache.coalescidas) == (1, 2)
+    assert asyncio.run(cache.obtener("k", producir)) == FILAS and cache.aciertos == 1
+
+
+def test_si_cancelan_a_la_que_busca_las_demas_buscan_de_nuevo():
+    cache = CacheBusquedas(ttl_s=60)
+    llamadas = []
+
+    async def producir():
+        llamadas.append(1)
+        await asyncio.sleep(0.01)
+        return FILAS
+
+    async def correr():
+        primera = asyncio.create_task(cache.obtener("k", producir))
+        await asyncio.sleep(0)
+        esperan = [asyncio.create_task(cache.obtener("k", producir)) for _ in range(2)]
+        await asyncio.sleep(0)
+        primera.cancel()
+        return await asyncio.gather(primera, *esperan, return_exceptions=True)
+
+    primera, *resto = asyncio.run(correr())
+    assert isinstance(primera, asyncio.CancelledError) and resto == [FILAS] * 2
+    assert len(llamadas) == 2 and cache.fresco("k") == FILAS
+
+
+def test_los_errores_no_se_cachean():
+    cache = CacheBusquedas(ttl_s=60)
+
+    async def falla():
+        raise RuntimeError("portal")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.obtener("k", falla))
+    assert cache.fresco("k") is None
+
+
+def test_se_comparte_por_disco(tmp_path, reloj):
+    ruta = tmp_path / "busquedas.json"
+    CacheBusquedas(ttl_s=60, ruta=ruta, reloj=reloj).guardar("k", FILAS)
+    otra = CacheBusquedas(ttl_s=60, ruta=ruta, reloj=reloj)
+    assert otra.fresco("k") == FILAS
+    otra.invalidar("k")
+    assert CacheBusquedas(ttl_s=60, ruta=ruta, reloj=reloj).fresco("k") is None
+    assert [p.name for p in tmp_path.iterdir()] == ["busquedas.json"]
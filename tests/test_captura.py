@@ -0,0 +1,115 @@
+import json
+import asyncio
+from types import SimpleNamespace
+
+from turnos.captura import (CapturaXHR, parsear_agenda, parsear_cuerpo, parsear_json_profesionales,
+                            parsear_tabla_profesionales)
+
+TABLA = """
+<table id="tblResultadoProfesionales"><tbody>
+  <tr><td>PEREZ  JUAN</td><td>San Martín 10</td><td>CLINICA</td><td>LU 8 a 12</td><td>20-10-2026</td><td><a>Ver</a></td></tr>
+  <tr><td colspan="6">Sin datos</td></tr>
+  <tr><td>GOMEZ ANA</td><td>Belgrano 5<br>PB</td><td>CLINICA</td><td>MA 9 a 13</td><td>---</td><td><a>Ver</a></td></tr>
+</tbody></table>"""
+
+AGENDA = """
+<table class="tabla_dias_horarios">
+  <thead><tr><th class="cabecera_dia">Lun 19/10</th><th class="cabecera_hoy">Mar 20/10</th></tr></thead>
+  <tbody><tr>
+    <td><div class="horario_disponible">08:00</div></td>
+    <td><div class="horario_disponible">08:00</div><div class="horario_disponible">09:30</div></td>
+  </tr></tbody>
+</table>"""
+
+
+def test_tabla_de_profesionales():
+    filas = parsear_tabla_profesionales(TABLA)
+    assert [(f["profesional"], f["domicilio"], f["disp"], f["rowIndex"]) for f in filas] == [
+        ("PEREZ JUAN", "San Martín 10", "20-10-2026", 0), ("GOMEZ ANA", "Belgrano 5 PB", "---", 2)]
+    assert parsear_tabla_profesionales("<table id='otra'></table>") is None
+
+
+def test_agenda_registra_la_columna_de_cada_horario():
+    assert parsear_agenda(AGENDA) == [
+        {"dia": "Lun 19/10", "hora": "08:00", "col": 0},
+        {"dia": "Mar 20/10", "hora": "08:00", "col": 1},
+        {"dia": "Mar 20/10", "hora": "09:30", "col": 1},
+    ]
+    assert parsear_agenda("<p>sesión vencida</p>") is None
+
+
+def test_json_de_profesionales():
+    datatables = {"data": [["PEREZ", "Dom 1", "CLINICA", "LU", "20-10-2026", "<a>Ver</a>"], ["corta"]]}
+    filas = parsear_json_profesionales(datatables)
+    assert len(filas) == 1 and filas[0]["agenda"] == "Ver"
+    objetos = [{"Nombre": "GOMEZ", "Direccion": "Belgrano 5", "primerTurno": "21-10-2026"}]
+    fila = parsear_json_profesionales(objetos)[0]
+    assert (fila["profesional"], fila["domicilio"], fila["disp"]) == ("GOMEZ", "Belgrano 5", "21-10-2026")
+    assert parsear_json_profesionales({"otra": "cosa"}) is None
+
+
+def test_json_que_no_es_la_busqueda_no_la_resuelve():
+    # Otros JSON que el patrón amplio /turnos/ también agarra
+    assert parsear_json_profesionales([]) is None
+    assert parsear_json_profesionales({"data": [], "recordsFiltered": 0}) is None
+    assert parsear_json_profesionales({"data": [{"id": 3, "estado": "ok"}]}) is None
+    assert parsear_json_profesionales([["", "", "", "", "", ""]]) is None
+    assert parsear_cuerpo('{"data": {"sesion": "viva"}}', "application/json", parsear_tabla_profesionales) is None
+
+
+def test_json_paginado_en_el_servidor_se_deja_al_dom():
+    fila = ["PEREZ", "Dom 1", "CLINICA", "LU", "20-10-2026", "Ver"]
+    assert parsear_json_profesionales({"recordsFiltered": 40, "data": [fila] * 10}) is None
+    assert parsear_json_profesionales({"iTotalDisplayRecords": 2, "aaData": [fila] * 2}) is not None
+
+
+def test_cuerpo_json_con_la_agenda_embebida():
+    cuerpo = json.dumps({"ok": True, "html": AGENDA})
+    assert len(parsear_cuerpo(cuerpo, "application/json", parsear_agenda)) == 3
+    assert parsear_cuerpo(AGENDA, "text/html", parsear_agenda)[0]["hora"] == "08:00"
+    assert parsear_cuerpo('{"ok": true}', "application/json", parsear_agenda) is None
+
+
+class _Pagina:
+    def __init__(self):
+        self.oyentes = []
+
+    def on(self, evento, fn):
+        self.oyentes.append(fn)
+
+    def remove_listener(self, evento, fn):
+        self.oyentes.remove(fn)
+
+    async def responder(self, url, cuerpo, tipo="xhr", ok=True, ctype="text/html", metodo="GET"):
+        async def text():
+            return cuerpo
+        resp = SimpleNamespace(url=url, ok=ok, headers={"content-type": ctype}, text=text,
+                               request=SimpleNamespace(resource_type=tipo, method=metodo, url=url, post_data=None,
+                                                       headers={"Accept": "text/html", "Cookie": "JSESSIONID=1"}))
+        for fn in list(self.oyentes):
+            await fn(resp)
+
+
+def test_captura_resuelve_con_la_respuesta_que_coincide():
+    async def correr():
+        page = _Pagina()
+        captura = CapturaXHR(page, r"/turnos/", r"agenda")
+        busqueda, agenda = captura.busqueda(), captura.agenda()
+        await page.responder("https://portal/turnos/buscar", TABLA, tipo="image")
+        await page.responder("https://portal/turnos/buscar", "error", ok=False)
+        await page.responder("https://portal/turnos/sesion", "[]", ctype="application/json")
+        assert not busqueda.done()
+        await page.responder("https://portal/turnos/buscar", TABLA)
+        await page.responder("https://portal/agenda?x=1", AGENDA, tipo="document")
+        filas, slots = busqueda.result(), agenda.result()
+        assert captura.url_agenda == "https://portal/agenda?x=1"
+        # Lo que se guarda para repetir la request no lleva cookies
+        assert captura.req_busqueda == {"url": "https://portal/turnos/buscar", "method": "GET", "post_data": None,
+                                        "headers": {"Accept": "text/html"}}
+        pendiente = captura.busqueda()
+        captura.cerrar()
+        return filas, slots, pendiente, page.oyentes
+
+    filas, slots, pendiente, oyentes = asyncio.run(correr())
+    assert len(filas) == 2 and len(slots) == 3
+    assert pendiente.cancelled() and oyentes == []
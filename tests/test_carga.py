@@ -0,0 +1,74 @@
+import argparse
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+
+from turnos.captura import parsear_agenda, parsear_tabla_profesionales
+from turnos.carga import PROFESIONALES, PortalSimulado, armar_config, main
+
+
+@pytest.fixture(scope="module")
+def portal():
+    p = PortalSimulado(latencia_ms=0, jitter_ms=0).iniciar()
+    yield p
+    p.cerrar()
+
+
+def _get(portal, ruta):
+    with urllib.request.urlopen(portal.url + ruta, timeout=5) as r:
+        return r.read().decode("utf-8")
+
+
+def test_busqueda_y_agenda_del_portal_simulado(portal):
+    assert "name=\"password\"" in _get(portal, "")
+    assert _get(portal, "/deptos?zona=ZONA%20ESTE") == "<option>SAN MARTIN</option><option>RIVADAVIA</option>"
+    assert len(parsear_tabla_profesionales(_get(portal, "/turnos/buscar?serv=X"))) == PROFESIONALES
+    assert [f["profesional"] for f in parsear_tabla_profesionales(_get(portal, "/turnos/buscar?prof=04"))] == \
+        ["PROFESIONAL 04"]
+    agenda = _get(portal, "/turnos/agenda?prof=3&fecha=21/10/2026")
+    slots = parsear_agenda(agenda)
+    # La semana va de lunes a viernes y es la misma para el mismo profesional y semana
+    assert slots and {s["dia"].split()[-1] for s in slots} <= {"19/10", "20/10", "21/10", "22/10", "23/10"}
+    assert parsear_agenda(_get(portal, "/turnos/agenda?prof=3&fecha=19/10/2026")) == slots
+
+
+def test_la_agenda_tiene_links_a_la_semana_anterior_y_siguiente(portal):
+    agenda = _get(portal, "/turnos/agenda?prof=3&fecha=21/10/2026")
+    links = dict((rotulo, href) for href, rotulo in re.findall(r"<a href='([^']+)'>(\w+)</a>", agenda))
+    assert links == {"Anterior": "agenda?prof=3&fecha=12/10/2026", "Siguiente": "agenda?prof=3&fecha=26/10/2026"}
+    siguiente = parsear_agenda(_get(portal, "/turnos/" + links["Siguiente"]))
+    assert siguiente and {s["dia"].split()[-1] for s in siguiente} <= {"26/10", "27/10", "28/10", "29/10", "30/10"}
+
+
+def test_login_y_rutas_desconocidas(portal):
+    antes = portal.requests
+    req = urllib.request.Request(portal.url + "/login", data=b"usuario=1&password=x", method="POST")
+    opener = urllib.request.build_opener(type("SinRedireccion", (urllib.request.HTTPRedirectHandler,),
+                                              {"redirect_request": lambda *a: None}))
+    with pytest.raises(urllib.error.HTTPError) as e:
+        opener.open(req, timeout=5)
+    assert e.value.code == 302 and e.value.headers["Set-Cookie"].startswith("JSESSIONID=")
+    with pytest.raises(urllib.error.HTTPError) as e:
+        _get(portal, "/otra")
+    assert e.value.code == 404
+    assert portal.requests == antes + 2
+
+
+def test_config_de_carga_un_par_por_cuenta(tmp_path):
+    args = argparse.Namespace(con_limite=False, timeout_ms=5000, semanas=2, ver=False, atajos=False)
+    cfg = armar_config(None, 3, "http://127.0.0.1:1/webapp_pri", args, tmp_path)
+    assert [(c.id, o.nombre) for c, o in cfg.pares()] == [("c0", "o0"), ("c1", "o1"), ("c2", "o2")]
+    assert cfg.dry_run and cfg.limite_rps == 0 and cfg.busqueda_cache_ttl_s == 0
+    # Sin --atajos todas las rondas van por el formulario
+    assert not cfg.atajos
+    assert armar_config(None, 1, "http://x", argparse.Namespace(**{**vars(args), "atajos": True}), tmp_path).atajos
+    assert armar_config(None, 1, "http://x", argparse.Namespace(**{**vars(args), "con_limite": True}),
+                        tmp_path).limite_rps > 0
+
+
+def test_ayuda_de_la_linea_de_comandos(capsys):
+    with pytest.raises(SystemExit):
+        main(["--help"])
+    assert "--latencia-ms" in capsys.readouterr().out
@@ -0,0 +1,77 @@
+import os
+import json
+
+import pytest
+
+from turnos.config import ConfigError, ConfigRecargable, cargar_config
+
+ENTORNO = {"OSEP_USER": "12345", "OSEP_PASS": "secreta", "OBJ_SERVICIO": "CLINICA MEDICA",
+           "OBJ_ZONA": "ZONA ESTE", "OBJ_DEPTO": "SAN MARTIN"}
+
+
+def _escribir(ruta, datos):
+    ruta.write_text(json.dumps(datos), encoding="utf-8")
+    return ruta
+
+
+def test_config_minima_desde_el_entorno():
+    cfg = cargar_config(entorno={**ENTORNO, "OBJ_HORA_MIN": "8:00", "DRY_RUN": "sí", "OBJ_DIAS_VALIDOS": "lu, mi"})
+    (cuenta, obj), = cfg.pares()
+    assert cuenta.id == "12345" and obj.id == "CLINICA MEDICA/ZONA ESTE/SAN MARTIN"
+    assert obj.hora_min == "08:00" and obj.dias_validos == ("LU", "MI")
+    assert cfg.dry_run is True and cfg.archivo is None
+    assert "secreta" not in repr(cuenta)
+
+
+def test_los_errores_se_juntan_en_un_solo_config_error():
+    with pytest.raises(ConfigError) as e:
+        cargar_config(entorno={**ENTORNO, "OBJ_HORA_MIN": "18:00", "OBJ_HORA_MAX": "9:00",
+                               "TIMEOUT_MS": "cero", "DRY_RUN": "quizás", "OSEP_PASS": "",
+                               "LOGIN_COOKIE": "JSESSION("})
+    msg = str(e.value)
+    assert "hora_min (18:00) es posterior a hora_max (09:00)" in msg
+    assert "timeout_ms" in msg and "booleano inválido: 'quizás'" in msg
+    assert "falta password" in msg
+    assert "login_cookie" in msg
+
+
+def test_archivo_con_cuentas_y_objetivos(tmp_path):
+    ruta = _escribir(tmp_path / "config.json", {
+        "timeout_ms": 5000,
+        "cuentas": [{"usuario": "1", "password_env": "CLAVE_1", "nombre": "ana"}, {"usuario": "2", "password": "y"}],
+        "objetivos": [{"servicio": "ODONTO", "zona": "*", "depto": "*", "cuentas": ["ana"],
+                       "fecha_txt": "29/02/2028"},
+                      {"servicio": "PEDIATRIA", "zona": "ZONA ESTE", "depto": "SAN MARTIN"}],
+    })
+    cfg = cargar_config(archivo=ruta, entorno={"CLAVE_1": "x"})
+    assert cfg.timeout_ms == 5000 and cfg.archivo == ruta
+    assert cfg.objetivos[0].fecha_txt.isoformat() == "2028-02-29"
+    assert [(c.id, o.servicio) for c, o in cfg.pares()] == [("ana", "ODONTO"), ("ana", "PEDIATRIA"), ("2", "PEDIATRIA")]
+
+
+def test_archivo_invalido(tmp_path):
+    ruta = _escribir(tmp_path / "config.json", {
+        "clave_rara": 1, "cuentas": [{"usuario": "1", "password": "x"}, {"usuario": "1", "password": "z"}],
+        "objetivos": [{"servicio": "ODONTO", "zona": "*", "depto": "*", "cuentas": ["otra"]}]})
+    with pytest.raises(ConfigError) as e:
+        cargar_config(archivo=ruta, entorno={})
+    assert "clave desconocida 'clave_rara'" in str(e.value)
+    assert "cuenta desconocida 'otra'" in str(e.value)
+    assert "ids repetidos" in str(e.value)
+    ruta.write_text("{", encoding="utf-8")
+    with pytest.raises(ConfigError, match="mal formado"):
+        cargar_config(archivo=ruta, entorno={})
+
+
+def test_recarga_solo_si_el_archivo_cambio_y_valida(tmp_path):
+    base = {"cuentas": [{"usuario": "1", "password": "x"}],
+            "objetivos": [{"servicio": "ODONTO", "zona": "*", "depto": "*"}]}
+    ruta = _escribir(tmp_path / "config.json", {**base, "timeout_ms": 1000})
+    rc = ConfigRecargable(ruta, entorno={})
+    assert not rc.recargar_si_cambio()
+    _escribir(ruta, {**base, "timeout_ms": "no"})
+    os.utime(ruta, (1, 1))
+    assert not rc.recargar_si_cambio() and rc.cfg.timeout_ms == 1000
+    _escribir(ruta, {**base, "timeout_ms": 2000})
+    os.utime(ruta, (2, 2))
+    assert rc.recargar_si_cambio() and rc.cfg.timeout_ms == 2000
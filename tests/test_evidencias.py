@@ -0,0 +1,69 @@
+import os
+import gzip
+import time
+import asyncio
+
+from turnos.evidencias import Evidencias
+
+
+class _Pagina:
+    def __init__(self, html="<p>resultados</p>", falla=False):
+        self.html, self.falla = html, falla
+        self.pedidos = []
+
+    async def screenshot(self, **kw):
+        self.pedidos.append(kw)
+        if self.falla:
+            raise TimeoutError("screenshot")
+        return b"\xff\xd8jpeg"
+
+    async def content(self):
+        return self.html
+
+
+def test_escribe_captura_dom_y_json_en_segundo_plano(tmp_path):
+    ev = Evidencias(tmp_path).iniciar()
+    asyncio.run(ev.capturar(_Pagina(), "resultados", frame=_Pagina("<table>agenda</table>")))
+    ev.guardar_json("error_agenda", {"checkpoint": "agenda"})
+    ev.cerrar()
+    assert sorted(p.name for p in ev.dir.iterdir()) == [
+        "001_resultados.html.gz", "001_resultados.jpg", "001_resultados_frame.html.gz", "002_error_agenda.json"]
+    assert gzip.decompress((ev.dir / "001_resultados_frame.html.gz").read_bytes()) == b"<table>agenda</table>"
+    assert ev.escritos == 4 and ev.descartadas == 0
+
+
+def test_solo_lo_visible_y_con_el_timeout_recortado(tmp_path):
+    ev, pagina = Evidencias(tmp_path), _Pagina()
+    asyncio.run(ev.capturar(pagina, "agenda", timeout_ms=800))
+    asyncio.run(ev.capturar(pagina, "agenda", timeout_ms=60000))
+    asyncio.run(ev.capturar(pagina, "error_agenda", completa=True))
+    assert [(p["full_page"], p["timeout"]) for p in pagina.pedidos] == [
+        (False, 800), (False, Evidencias.TOPE_CAPTURA_MS), (True, Evidencias.TOPE_CAPTURA_MS)]
+
+
+def test_nunca_levanta_y_respeta_el_tope_por_corrida(tmp_path):
+    ev = Evidencias(tmp_path, max_corrida_mb=20 / 1024 / 1024).iniciar()
+    asyncio.run(ev.capturar(_Pagina(falla=True), "agenda"))
+    ev.guardar_json("uno", {"x": 1})
+    ev.guardar_json("dos", {"x": 2})
+    ev.cerrar()
+    assert ev.escritos == 1 and ev.descartadas == 1
+
+
+def test_cola_llena_descarta_sin_esperar(tmp_path):
+    ev = Evidencias(tmp_path, max_cola=1)   # sin iniciar: nadie vacía la cola
+    ev.guardar_json("uno", {})
+    ev.guardar_json("dos", {})
+    assert ev.descartadas == 1
+
+
+def test_purga_corridas_viejas_y_el_exceso_de_mb(tmp_path):
+    vieja, media, nueva = (tmp_path / f"evidencia_2026010{i}_000000" for i in (1, 2, 3))
+    for i, d in enumerate((vieja, media, nueva)):
+        d.mkdir()
+        (d / "a.jpg").write_bytes(b"x" * 1024 * 600)
+        t = time.time() - (10 - i) * 86400 if d is vieja else time.time() - (3 - i) * 3600
+        os.utime(d, (t, t))
+    ev = Evidencias(tmp_path, retencion_dias=7, max_total_mb=1).iniciar()
+    ev.cerrar()
+    assert [p.name for p in tmp_path.iterdir()] == [nueva.name]
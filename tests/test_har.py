@@ -0,0 +1,59 @@
+import json
+
+from turnos.har import CLAVE_REDACTADA, COOKIE_REDACTADA, USUARIO_REDACTADO, redactar_har
+from turnos.metricas import percentil, resumen_latencias
+
+
+def _har(tmp_path, *entradas):
+    ruta = tmp_path / "sesion.har"
+    ruta.write_text(json.dumps({"log": {"entries": list(entradas)}}), encoding="utf-8")
+    return ruta
+
+
+LOGIN = {
+    "request": {"url": "https://portal/login", "method": "POST",
+                "headers": [{"name": "Cookie", "value": "JSESSIONID=abc; otro=1"},
+                            {"name": "Authorization", "value": "Basic eHl6"}],
+                "cookies": [{"name": "JSESSIONID", "value": "abc"}],
+                "postData": {"mimeType": "application/x-www-form-urlencoded",
+                             "text": "usuario=afiliado7&password=s%26creta",
+                             "params": [{"name": "usuario", "value": "afiliado7"},
+                                        {"name": "password", "value": "s&creta"}]}},
+    "response": {"headers": [{"name": "Set-Cookie", "value": "JSESSIONID=nuevo; Path=/; HttpOnly"}]},
+}
+
+
+def test_no_quedan_credenciales_ni_cookies(tmp_path):
+    ruta = _har(tmp_path, LOGIN)
+    redactar_har(ruta, "afiliado7", "s&creta")
+    texto = ruta.read_text(encoding="utf-8")
+    assert "afiliado7" not in texto and "creta" not in texto and "abc" not in texto
+    login, = json.loads(texto)["log"]["entries"]
+    assert login["request"]["postData"]["text"] == f"usuario={USUARIO_REDACTADO}&password={CLAVE_REDACTADA}"
+    assert login["request"]["headers"] == [{"name": "Cookie", "value": f"JSESSIONID={COOKIE_REDACTADA}; otro={COOKIE_REDACTADA}"},
+                                           {"name": "Authorization", "value": COOKIE_REDACTADA}]
+    assert login["response"]["headers"][0]["value"] == f"JSESSIONID={COOKIE_REDACTADA}; Path=/; HttpOnly"
+
+
+def test_se_redacta_campo_por_campo(tmp_path):
+    busqueda = {"request": {"url": "https://portal/turnos/buscar", "method": "POST", "headers": [],
+                            "postData": {"mimeType": "application/x-www-form-urlencoded",
+                                         "text": "serv=ODONTO%20GENERAL&q=12345x&nro=12345"}}}
+    api = {"request": {"url": "https://portal/api", "method": "POST", "headers": [],
+                       "postData": {"mimeType": "application/json",
+                                    "text": '{"dni": "12345", "pass": "x1", "prof": 12345, "zona": "ESTE"}'}}}
+    ruta = _har(tmp_path, busqueda, api)
+    redactar_har(ruta, "12345", "x1")
+    busqueda, api = json.loads(ruta.read_text(encoding="utf-8"))["log"]["entries"]
+    # Los campos que no son credenciales quedan igual (route_from_har compara el cuerpo)
+    assert busqueda["request"]["postData"]["text"] == f"serv=ODONTO%20GENERAL&q=12345x&nro={USUARIO_REDACTADO}"
+    assert json.loads(api["request"]["postData"]["text"]) == {
+        "dni": USUARIO_REDACTADO, "pass": CLAVE_REDACTADA, "prof": 12345, "zona": "ESTE"}
+
+
+def test_percentiles():
+    assert percentil([], 50) == 0.0
+    assert percentil([3, 1, 2], 50) == 2
+    assert percentil([0, 10], 95) == 9.5
+    assert resumen_latencias([]) == "sin datos"
+    assert resumen_latencias([1, 3]).startswith("n=2 p50 2.00s")
@@ -0,0 +1,31 @@
+import time
+from types import SimpleNamespace
+
+from turnos import historial as historial_mod
+from turnos.historial import Historial
+
+
+def _a_las(anio, mes, dia):
+    return time.mktime((anio, mes, dia, 12, 0, 0, 0, 0, -1))
+
+
+def test_un_archivo_por_mes_y_leer_saltea_los_meses_viejos(tmp_path, monkeypatch):
+    ahora = [_a_las(2026, 9, 30)]
+    monkeypatch.setattr(historial_mod, "time", SimpleNamespace(time=lambda: ahora[0], strftime=time.strftime,
+                                                               localtime=time.localtime))
+    h = Historial(tmp_path / "historial")
+    h.registrar("filas", servicio="ODONTO", filas=[])
+    ahora[0] = _a_las(2026, 10, 1)
+    h.registrar("agenda", servicio="ODONTO", slots=[{"fecha": "2026-10-05", "hora": "08:00"}])
+    h.registrar("filas", servicio="PEDIATRIA", filas=[])
+    # Una corrida cortada a mitad de escritura deja una línea incompleta
+    with open(tmp_path / "historial" / "2026-10.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"t": 1')
+
+    assert sorted(p.name for p in (tmp_path / "historial").iterdir()) == ["2026-09.jsonl", "2026-10.jsonl"]
+    assert [r["servicio"] for r in h.leer()] == ["ODONTO", "ODONTO", "PEDIATRIA"]
+    assert [r["tipo"] for r in h.leer(_a_las(2026, 10, 1))] == ["agenda", "filas"]
+
+
+def test_sin_directorio_no_hay_registros(tmp_path):
+    assert list(Historial(tmp_path / "nada").leer()) == []
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from turnos.lease import Lease, blindar
+
+
+def test_un_solo_dueno_hasta_que_vence(tmp_path, reloj):
+    ruta = tmp_path / "lease.db"
+    a, b = Lease(ruta, ttl_s=60, reloj=reloj), Lease(ruta, ttl_s=60, reloj=reloj)
+    assert a.adquirir()
+    assert not b.adquirir()
+    assert b.actual["dueno"] == a.dueno and b.actual["vence_en_s"] == 60
+    reloj.avanzar(61)
+    assert b.adquirir()
+    # a perdió el lease al vencer: no lo renueva ni lo borra al liberar
+    assert not a.renovar() and not a.tomado
+    a.liberar()
+    assert not Lease(ruta, ttl_s=60, reloj=reloj).adquirir()
+
+
+def test_renovar_y_liberar(tmp_path, reloj):
+    ruta = tmp_path / "lease.db"
+    a = Lease(ruta, ttl_s=60, reloj=reloj)
+    assert a.adquirir()
+    reloj.avanzar(50)
+    assert a.renovar()
+    reloj.avanzar(50)
+    assert not Lease(ruta, ttl_s=60, reloj=reloj).adquirir()
+    a.liberar()
+    assert Lease(ruta, ttl_s=60, reloj=reloj).adquirir()
+
+
+def test_se_toma_el_de_un_proceso_que_ya_no_existe(tmp_path):
+    ruta = tmp_path / "lease.db"
+    assert Lease(ruta, ttl_s=600).adquirir()
+    b = Lease(ruta, ttl_s=600)
+    b._huerfano = lambda host, pid: True
+    assert b.adquirir()
+
+
+def test_blindar_termina_la_reserva_antes_de_cancelar():
+    hechos = []
+
+    async def reserva():
+        await asyncio.sleep(0.05)
+        hechos.append("confirmado")
+        return "ok"
+
+    async def correr():
+        tarea = asyncio.create_task(blindar(reserva()))
+        await asyncio.sleep(0.01)
+        tarea.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarea
+        return await blindar(reserva())
+
+    assert asyncio.run(correr()) == "ok"
+    assert hechos == ["confirmado", "confirmado"]
@@ -0,0 +1,57 @@
+import asyncio
+
+from turnos.limitador import Cubeta, Limitador, cuenta_actual
+
+
+def test_cubeta_repone_a_su_tasa(reloj):
+    c = Cubeta(tasa_s=2, capacidad=2, reloj=reloj)
+    for _ in range(2):
+        assert c.espera_s() == 0
+        c.tomar()
+    assert c.espera_s() == 0.5
+    reloj.avanzar(0.5)
+    assert c.espera_s() == 0
+    reloj.avanzar(10)
+    c.espera_s()
+    assert c.fichas == 2
+
+
+def test_sin_limite_no_espera_ni_registra():
+    lim = Limitador()
+    asyncio.run(lim.adquirir("busqueda", cuenta="a"))
+    assert lim.esperas == {} and lim.resumen() == "sin límite"
+
+
+def test_rafaga_y_espera_por_cuenta():
+    lim = Limitador(tasa_s=0, tasa_cuenta_s=50, rafaga_cuenta=1)
+
+    async def correr():
+        for _ in range(2):
+            await lim.adquirir("busqueda", cuenta="a")
+        # La cuenta sale del contexto del flujo
+        cuenta_actual.set("b")
+        await lim.adquirir("busqueda")
+
+    asyncio.run(correr())
+    esperas = lim.esperas["busqueda"]
+    assert len(esperas) == 3
+    assert esperas[0] < 0.01 and esperas[1] >= 0.01 and esperas[2] < 0.01
+    assert set(lim.cuentas) == {"a", "b"}
+
+
+def test_la_reserva_pasa_antes_que_los_escaneos():
+    lim = Limitador(tasa_s=20, rafaga=1)
+    orden = []
+
+    async def accion(nombre):
+        await lim.adquirir(nombre, cuenta="a")
+        orden.append(nombre)
+
+    async def correr():
+        await lim.adquirir("login", cuenta="a")
+        escaneo = asyncio.create_task(accion("agenda"))
+        await asyncio.sleep(0.01)
+        await asyncio.gather(escaneo, accion("reserva"))
+
+    asyncio.run(correr())
+    assert orden == ["reserva", "agenda"]
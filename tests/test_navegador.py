@@ -0,0 +1,64 @@
+import asyncio
+
+from turnos.navegador import PoolSesiones, rss_navegador_mb
+
+
+class _Sesion:
+    def __init__(self, n, clave):
+        self.n, self.clave = n, clave
+        self.escaneos = 0
+        self.cerrada = False
+
+    async def cerrar(self):
+        self.cerrada = True
+
+
+def _pool(**kw):
+    abiertas = []
+
+    async def abrir(clave):
+        abiertas.append(_Sesion(len(abiertas), clave))
+        return abiertas[-1]
+    return PoolSesiones(abrir, **kw), abiertas
+
+
+def test_reutiliza_la_sesion_y_la_recicla_a_los_n_escaneos():
+    pool, abiertas = _pool(max_escaneos=2, medir_rss=lambda: None)
+
+    async def correr():
+        for _ in range(3):
+            ses = await pool.obtener("cuenta")
+            ses.escaneos += 1
+        await pool.obtener("otra")
+        await pool.cerrar()
+
+    asyncio.run(correr())
+    assert [(s.n, s.clave) for s in abiertas] == [(0, "cuenta"), (1, "cuenta"), (2, "otra")]
+    assert pool.recicladas == 1 and all(s.cerrada for s in abiertas) and pool.sesiones == {}
+
+
+def test_si_el_navegador_pasa_el_techo_de_memoria_se_reciclan_todas(reloj):
+    rss, medidas = [100.0], []
+
+    def medir():
+        medidas.append(rss[0])
+        return rss[0]
+    pool, abiertas = _pool(max_rss_mb=500, medir_rss=medir, cada_s=30, reloj=reloj)
+
+    async def correr():
+        await pool.obtener("a")
+        await pool.obtener("b")
+        rss[0] = 900.0
+        await pool.obtener("a")     # dentro del intervalo: no se vuelve a medir
+        reloj.avanzar(30)
+        await pool.obtener("a")
+        await pool.obtener("b")
+
+    asyncio.run(correr())
+    assert medidas == [100.0, 900.0]
+    assert [(s.clave, s.cerrada) for s in abiertas] == [("a", True), ("b", True), ("a", False), ("b", False)]
+    assert pool.recicladas == 2
+
+
+def test_rss_del_navegador_sin_chromium_es_cero_o_no_disponible():
+    assert rss_navegador_mb() in (0.0, None)
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from turnos.notificador import ArchivoSink, Dedupe, Evento, MemoriaSink, Notificador, Sink
+
+
+class _SinkRoto(Sink):
+    nombre = "roto"
+
+    async def enviar(self, eventos):
+        raise RuntimeError("sin red")
+
+
+def _correr(notificador, *tandas):
+    async def correr():
+        notificador.iniciar()
+        for tanda in tandas:
+            for e in tanda:
+                notificador.publicar(e)
+            await notificador.cola.join()
+        await notificador.cerrar()
+    asyncio.run(correr())
+
+
+def test_agrupa_y_deduplica_en_el_lote_y_entre_lotes():
+    sink = MemoriaSink()
+    n = Notificador([sink], Dedupe(), espera_lote_s=0.01)
+    a, b = Evento("encontrado", "A", clave="a"), Evento("encontrado", "B", clave="b")
+    _correr(n, [a, a, b], [a, Evento("casi", "sin clave")])
+    assert [[e.titulo for e in lote] for lote in sink.lotes] == [["A", "B"], ["sin clave"]]
+
+
+def test_alcanza_un_sink_para_darlo_por_avisado(tmp_path):
+    sink = MemoriaSink()
+    _correr(Notificador([_SinkRoto(), sink], Dedupe(tmp_path / "dedupe.json"), espera_lote_s=0.01),
+            [Evento("encontrado", "A", clave="a")])
+    assert len(sink.eventos) == 1
+    assert Dedupe(tmp_path / "dedupe.json").ya_notificado("a")
+
+
+def test_si_fallan_todos_los_sinks_se_reintenta_despues():
+    dedupe = Dedupe()
+    _correr(Notificador([_SinkRoto()], dedupe, espera_lote_s=0.01), [Evento("encontrado", "A", clave="a")])
+    assert not dedupe.ya_notificado("a")
+
+
+def test_cola_llena_descarta_sin_bloquear():
+    async def correr():
+        n = Notificador([MemoriaSink()], max_cola=1)
+        assert n.publicar(Evento("casi", "1"))
+        assert not n.publicar(Evento("casi", "2"))
+        return n.descartados
+    assert asyncio.run(correr()) == 1
+
+
+def test_un_sink_lento_no_frena_a_los_demas():
+    rapido, lento = MemoriaSink(), MemoriaSink(demora_s=5)
+    _correr(Notificador([rapido, lento], espera_lote_s=0.01, timeout_sink_s=0.05),
+            [Evento("reservado", "A", clave="a")])
+    assert len(rapido.eventos) == 1 and lento.eventos == []
+
+
+def test_archivo_sink_agrega_una_linea_por_evento(tmp_path):
+    ruta = tmp_path / "avisos.log"
+    _correr(Notificador([ArchivoSink(ruta)], espera_lote_s=0.01),
+            [Evento("encontrado", "PEREZ 08:00", clave="a"), Evento("reservado", "PEREZ 08:00", clave="b")])
+    assert ruta.read_text(encoding="utf-8").count("PEREZ 08:00") == 2
+
+
+def test_dedupe_vence(reloj):
+    d = Dedupe(ttl_s=60, reloj=reloj)
+    d.marcar("a")
+    assert d.ya_notificado("a") and not d.ya_notificado("")
+    reloj.avanzar(60)
+    assert not d.ya_notificado("a")
+
+
+def test_un_sink_sin_enviar_no_se_puede_crear():
+    class Incompleto(Sink):
+        nombre = "incompleto"
+
+    with pytest.raises(TypeError):
+        Incompleto()
@@ -0,0 +1,29 @@
+import pytest
+
+from turnos.presupuesto import Deadline, PresupuestoAgotado
+
+
+def test_el_timeout_sale_de_lo_que_queda(reloj):
+    dl = Deadline(60, reserva_s=10, reloj=reloj)
+    assert dl.ms("login", 20000) == 20000
+    reloj.avanzar(45)
+    # Quedan 15 s, 10 son de la reserva de booking
+    assert dl.ms("agenda", 20000) == 5000
+    assert dl.ms("confirmar", 20000, reserva=False) == 15000
+    assert dl.transcurrido_s() == 45
+
+
+def test_agotado_antes_de_arrancar_el_paso(reloj):
+    dl = Deadline(60, reserva_s=10, reloj=reloj)
+    reloj.avanzar(49.6)
+    with pytest.raises(PresupuestoAgotado, match="se guardan 10s de reserva"):
+        dl.chequear("resultados")
+    with pytest.raises(PresupuestoAgotado, match="presupuesto agotado en 'agenda'"):
+        dl.ms("agenda", 20000)
+    dl.chequear("confirmar", reserva=False)
+    assert dl.ms("confirmar", 20000, reserva=False) == 10400
+
+
+def test_nunca_menos_que_el_minimo(reloj):
+    dl = Deadline(60, reloj=reloj)
+    assert dl.ms("paso", 100) == Deadline.MIN_MS
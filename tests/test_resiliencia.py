@@ -0,0 +1,108 @@
+import asyncio
+import random
+
+import pytest
+from playwright.async_api import Error as PWError, TimeoutError as PWTimeout
+
+from turnos.presupuesto import PresupuestoAgotado
+from turnos.resiliencia import (CaptchaRequerido, CircuitBreaker, ErrorFatal, ErrorTransitorio, PortalCaido, backoff_s,
+                                es_falla_portal, es_transitorio, reintentar)
+
+
+def test_clasificacion_de_errores():
+    assert es_transitorio(ErrorTransitorio("no apareció la tabla"))
+    assert es_transitorio(PWTimeout("Timeout 20000ms exceeded."))
+    assert es_transitorio(PWError("net::ERR_CONNECTION_REFUSED at https://portal"))
+    assert not es_transitorio(PWError("Element is not attached to the DOM"))
+    assert not es_transitorio(ErrorFatal("credenciales"))
+    assert not es_transitorio(PresupuestoAgotado("sin tiempo"))
+    assert es_transitorio(PortalCaido("HTTP 503"))
+    assert not es_transitorio(CaptchaRequerido("recaptcha"))
+
+
+def test_backoff_con_tope():
+    rng = random.Random(1)
+    assert all(0 <= backoff_s(i, 2, 30, rng) <= min(30, 2 * 2 ** i) for i in range(10))
+
+
+def _reintentar(errores, circuito=None, intentos=None):
+    pendientes = list(errores)
+    llamadas = []
+
+    async def fn():
+        llamadas.append(1)
+        if pendientes:
+            raise pendientes.pop(0)
+        return "ok"
+    res = asyncio.run(reintentar(fn, paso="prueba", intentos=intentos or len(errores) + 1, base_s=0, tope_s=0,
+                                 circuito=circuito))
+    return res, len(llamadas)
+
+
+def test_reintenta_los_transitorios_y_corta_con_los_fatales(tmp_path):
+    assert _reintentar([ErrorTransitorio("uno"), PWTimeout("dos")]) == ("ok", 3)
+    with pytest.raises(ErrorFatal):
+        _reintentar([ErrorFatal("credenciales")])
+    with pytest.raises(ErrorTransitorio):
+        _reintentar([ErrorTransitorio("uno"), ErrorTransitorio("dos")], intentos=2)
+
+
+def test_solo_las_fallas_del_portal_cuentan_para_el_circuito():
+    assert es_falla_portal(PortalCaido("HTTP 503"))
+    assert es_falla_portal(PWError("net::ERR_NAME_NOT_RESOLVED at https://portal"))
+    assert es_falla_portal(PWTimeout("page.goto: Timeout 30000ms exceeded. navigating to \"https://portal\""))
+    assert not es_falla_portal(PWTimeout("locator.click: Timeout 15000ms exceeded."))
+    assert not es_falla_portal(ErrorTransitorio("no apareció la tabla"))
+
+
+def test_los_numeros_de_un_timeout_no_son_un_5xx():
+    assert not es_falla_portal(PWTimeout("Locator.click: Timeout 15034ms exceeded."))
+    assert not es_falla_portal(PWTimeout("locator.wait_for: Timeout 1503ms exceeded."))
+    assert not es_transitorio(PWError("Element 504 is not attached to the DOM"))
+    assert es_falla_portal(PWError("Request failed with status 503"))
+    assert es_falla_portal(PWError("HTTP 502 Bad Gateway"))
+    assert es_falla_portal(PWError("504 Gateway Timeout at https://portal/turnos"))
+
+
+def test_circuito_abierto_no_reintenta(tmp_path):
+    circuito = CircuitBreaker(tmp_path / "circuito.json", umbral=1)
+    # Un paso puntual que falla se reintenta sin tocar el circuito
+    assert _reintentar([ErrorTransitorio("uno")], circuito) == ("ok", 2)
+    assert circuito.estado == "cerrado"
+    with pytest.raises(PortalCaido):
+        _reintentar([PortalCaido("HTTP 503")], circuito)
+    assert circuito.estado == "abierto"
+
+
+def test_circuito_abre_semiabre_y_cierra(tmp_path, reloj):
+    ruta = tmp_path / "circuito.json"
+    c = CircuitBreaker(ruta, umbral=2, enfriamiento_s=100, reloj=reloj)
+    c.fallo("uno")
+    assert c.permitir()
+    c.fallo("dos")
+    assert not c.permitir() and c.segundos_restantes() == 100
+    # El estado se comparte entre corridas
+    assert not CircuitBreaker(ruta, umbral=2, reloj=reloj).permitir()
+    reloj.avanzar(100)
+    assert c.permitir() and c.estado == "semiabierto"
+    c.fallo("tres")
+    assert c.estado == "abierto"
+    reloj.avanzar(100)
+    assert c.permitir()
+    c.exito()
+    assert c.estado == "cerrado" and c.fallos == 0
+
+
+def test_los_workers_comparten_el_circuito(tmp_path, reloj):
+    ruta = tmp_path / "circuito.json"
+    a = CircuitBreaker(ruta, umbral=2, enfriamiento_s=100, reloj=reloj)
+    b = CircuitBreaker(ruta, umbral=2, enfriamiento_s=100, reloj=reloj)
+    # Cada uno suma sobre los fallos del otro y ve que se abrió sin reiniciar
+    a.fallo("uno")
+    b.fallo("dos")
+    assert b.estado == "abierto" and not a.permitir()
+    reloj.avanzar(100)
+    assert a.permitir()
+    a.exito()
+    assert b.permitir() and b.estado == "cerrado" and b.fallos == 0
+    assert [p.name for p in tmp_path.iterdir()] == ["circuito.json"]
@@ -0,0 +1,68 @@
+import time
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from turnos.salud import SaludPortal, sondear
+
+RESPUESTAS = {
+    "/ok": (200, "<title>OSEP - Turnos</title>"),
+    "/caido": (503, "<title>Service Unavailable</title>"),
+    "/mantenimiento": (200, "<title>Sitio en\n mantenimiento</title>"),
+    "/no-existe": (404, ""),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *a):
+        pass
+
+    def do_GET(self):
+        estado, cuerpo = RESPUESTAS[self.path]
+        self.send_response(estado)
+        self.end_headers()
+        self.wfile.write(cuerpo.encode("utf-8"))
+
+
+@pytest.fixture(scope="module")
+def portal():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_sondeo(portal):
+    assert sondear(f"{portal}/ok", 2).ok
+    # Un 4xx es un portal vivo que contestó
+    assert sondear(f"{portal}/no-existe", 2).ok
+    caido = sondear(f"{portal}/caido", 2)
+    assert not caido.ok and caido.estado == 503 and caido.motivo == "HTTP 503"
+    mant = sondear(f"{portal}/mantenimiento", 2)
+    assert not mant.ok and "Sitio en mantenimiento" in mant.motivo
+
+
+def test_sin_conexion():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        puerto = s.getsockname()[1]
+    sonda = sondear(f"http://127.0.0.1:{puerto}/", 2)
+    assert not sonda.ok and sonda.estado is None and sonda.motivo.startswith("sin conexión")
+
+
+def test_el_resultado_se_cachea_en_disco(portal, tmp_path):
+    ruta = tmp_path / "salud.json"
+    salud = SaludPortal(ruta, ttl_s=60)
+    assert not salud.consultar(f"{portal}/caido", 2).cacheada
+    salud.registrar_salto()
+    # Otra corrida dentro del ttl y con la misma URL: no vuelve a sondear
+    otra = SaludPortal(ruta, ttl_s=60)
+    assert (otra.sondeos, otra.saltos) == (1, 1)
+    cacheada = otra.consultar(f"{portal}/caido", 2)
+    assert cacheada.cacheada and not cacheada.ok
+    assert not otra.consultar(f"{portal}/ok", 2).cacheada
+    vencida = SaludPortal(ruta, ttl_s=60, reloj=lambda: time.time() + 61)
+    assert not vencida.consultar(f"{portal}/ok", 2).cacheada and vencida.sondeos == 3
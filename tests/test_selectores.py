@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from turnos.selectores import CacheSelectores
+
+
+def _variantes(llamadas, funcionan):
+    def variante(nombre):
+        async def probar(ultima):
+            llamadas.append((nombre, ultima))
+            if nombre not in funcionan:
+                raise TimeoutError(nombre)
+            return nombre
+        return probar
+    return {n: variante(n) for n in ("id", "texto", "clase")}
+
+
+def test_la_ganadora_se_prueba_primero_y_se_persiste(tmp_path):
+    ruta = tmp_path / "selectores.json"
+    cache, llamadas = CacheSelectores(ruta), []
+    assert asyncio.run(cache.probar("buscar", _variantes(llamadas, {"clase"}))) == "clase"
+    assert llamadas == [("id", False), ("texto", False), ("clase", True)]
+
+    otra, llamadas = CacheSelectores(ruta), []
+    assert asyncio.run(otra.probar("buscar", _variantes(llamadas, {"clase"}))) == "clase"
+    assert llamadas == [("clase", False)]
+    assert otra.resumen() == "buscar: 0/1 fallback(s) (50% histórico)"
+    assert [p.name for p in tmp_path.iterdir()] == ["selectores.json"]
+
+
+def test_false_cuenta_como_fallo_y_si_fallan_todas_se_relanza():
+    cache = CacheSelectores()
+
+    async def no_esta(ultima):
+        return False
+
+    async def rompe(ultima):
+        raise ValueError("selector inválido")
+
+    assert asyncio.run(cache.probar("nuevo", {"a": no_esta, "b": lambda u: asyncio.sleep(0, "ok")})) == "ok"
+    with pytest.raises(ValueError):
+        asyncio.run(cache.probar("login", {"a": no_esta, "b": rompe}))
+    with pytest.raises(LookupError):
+        asyncio.run(cache.probar("login", {"b": rompe, "a": no_esta}))
+    assert cache.resumen() == "nuevo: 1/1 fallback(s) (100% histórico)"
+
+
+def test_archivo_corrupto_arranca_de_cero(tmp_path):
+    ruta = tmp_path / "selectores.json"
+    ruta.write_text("{", encoding="utf-8")
+    assert CacheSelectores(ruta).orden("buscar", ["a", "b"]) == ["a", "b"]
@@ -0,0 +1,57 @@
+import os
+import time
+import asyncio
+import pathlib
+
+from turnos.workers import Coordinador
+
+
+def _trabajador(indice, cola, resultados, marcas):
+    """Worker de prueba: 'muere' tira el proceso la primera vez que lo toma."""
+    while True:
+        item = cola.get()
+        if item is None:
+            return
+        resultados.put(("tomado", indice, item))
+        marca = pathlib.Path(marcas) / item
+        if item.startswith("muere") and not marca.exists():
+            marca.touch()
+            os._exit(3)
+        resultados.put(("resultado", indice, item, {"pid": os.getpid()}))
+
+
+def _juntar(coord, items, timeout_s=30):
+    async def correr():
+        coord.iniciar()
+        for it in items:
+            coord.enviar(it, it, it)
+        finales, fin = {}, time.monotonic() + timeout_s
+        while len(finales) < len(items) and time.monotonic() < fin:
+            msg = await coord.recibir(0.2)
+            if msg and msg[0] in ("resultado", "perdido"):
+                finales[msg[2]] = msg
+        await coord.cerrar(gracia_s=10)
+        return finales
+    return asyncio.run(correr())
+
+
+def test_cada_clave_va_siempre_al_mismo_worker(tmp_path):
+    coord = Coordinador(2, _trabajador, args_extra=lambda: (str(tmp_path),))
+    items = ["c1|o1", "c2|o1", "c1|o2", "c3|o3"]
+    finales = _juntar(coord, items)
+    assert {it: m[1] for it, m in finales.items()} == {it: coord.shard(it) for it in items}
+    assert all(m[0] == "resultado" for m in finales.values())
+    assert all(not p.is_alive() for p in coord.procesos)
+
+
+def test_worker_caido_se_relanza_y_el_trabajo_se_reencola(tmp_path):
+    coord = Coordinador(1, _trabajador, args_extra=lambda: (str(tmp_path),))
+    finales = _juntar(coord, ["muere", "sigue"])
+    assert finales["muere"][0] == "resultado" and finales["sigue"][0] == "resultado"
+    assert coord.reinicios == [1]
+
+
+def test_sin_reencolar_se_informa_perdido(tmp_path):
+    coord = Coordinador(1, _trabajador, args_extra=lambda: (str(tmp_path),), reencolar=0)
+    finales = _juntar(coord, ["muere"])
+    assert finales["muere"][0] == "perdido" and "caído" in finales["muere"][3]["error"]
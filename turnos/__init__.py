@@ -0,0 +1,3 @@
+"""
+Módulos de soporte del bot de turnos OSEP (el flujo principal vive en app.py).
+"""
@@ -0,0 +1,126 @@
+"""
+Agenda de varias semanas.
+
+La agenda del portal muestra una semana por vez. Para mirar más adelante hay dos caminos:
+- si la request de la agenda (capturada por CapturaXHR) lleva la fecha en la query,
+  se arman las URLs de las semanas siguientes y se piden todas a la vez;
+- si no, se navega con el botón de semana siguiente dentro del iframe.
+Las semanas ya leídas se guardan un rato (modo daemon) para no volver a pedirlas cada ciclo.
+Las cabeceras de los días ("Lun 20/10", "Martes", …) se traducen a fechas reales.
+"""
+import re, time, datetime as dt
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+_FORMATOS_FECHA = (
+    (re.compile(r"^\d{2}/\d{2}/\d{4}$"), "%d/%m/%Y"),
+    (re.compile(r"^\d{2}-\d{2}-\d{4}$"), "%d-%m-%Y"),
+    (re.compile(r"^\d{4}-\d{2}-\d{2}$"), "%Y-%m-%d"),
+)
+
+
+def lunes_de(fecha: dt.date) -> dt.date:
+    """Lunes de la semana de fecha: la grilla del portal va de lunes a domingo (semana 0 = la de hoy)."""
+    return fecha - dt.timedelta(days=fecha.weekday())
+
+
+_DIAS_SEMANA = {"lun": 0, "mar": 1, "mie": 2, "mié": 2, "jue": 3, "vie": 4, "sab": 5, "sáb": 5, "dom": 6}
+_RE_FECHA_CAB = re.compile(r"(\d{1,2})[/.-](\d{1,2})(?:[/.-](\d{2,4}))?")
+
+
+def parsear_fecha_cabecera(rotulo: str, semana: int = 0, hoy: Optional[dt.date] = None) -> Optional[dt.date]:
+    """
+    Fecha de una cabecera de la agenda. Con día/mes sin año se toma el año que deja la
+    fecha más cerca de hoy (cruce de diciembre a enero; un 29/02 solo cae en los bisiestos).
+    Si solo trae el nombre del día es ese día de la semana de la grilla: el lunes de la
+    semana de hoy más las semanas avanzadas. None si no se reconoce.
+    """
+    hoy = hoy or dt.date.today()
+    m = _RE_FECHA_CAB.search(rotulo)
+    if m:
+        d, mes = int(m.group(1)), int(m.group(2))
+        anio = m.group(3)
+        if anio:
+            anio = int(anio)
+            try:
+                return dt.date(anio + 2000 if anio < 100 else anio, mes, d)
+            except ValueError:
+                return None
+        candidatas = []
+        for k in (-1, 0, 1):
+            try:
+                candidatas.append(dt.date(hoy.year + k, mes, d))
+            except ValueError:
+                continue
+        return min(candidatas, key=lambda f: abs((f - hoy).days)) if candidatas else None
+    palabra = rotulo.strip().lower()[:3]
+    if palabra in _DIAS_SEMANA:
+        return lunes_de(hoy) + dt.timedelta(days=_DIAS_SEMANA[palabra] + 7 * semana)
+    return None
+
+
+def urls_por_semana(url: str, semanas: int) -> Optional[list]:
+    """
+    URLs de las semanas 1..semanas-1 corriendo 7 días cada fecha de la query.
+    None si la URL no tiene ninguna fecha reconocible (hay que navegar con clicks).
+    """
+    partes = urlsplit(url)
+    query = parse_qsl(partes.query, keep_blank_values=True)
+    fechas = {}
+    for i, (_, v) in enumerate(query):
+        for patron, fmt in _FORMATOS_FECHA:
+            if patron.match(v):
+                fechas[i] = (dt.datetime.strptime(v, fmt).date(), fmt)
+                break
+    if not fechas:
+        return None
+    urls = []
+    for k in range(1, semanas):
+        nueva = [(c, (fechas[i][0] + dt.timedelta(days=7 * k)).strftime(fechas[i][1]) if i in fechas else v)
+                 for i, (c, v) in enumerate(query)]
+        urls.append(urlunsplit(partes._replace(query=urlencode(nueva, safe="/:"))))
+    return urls
+
+
+def unir_semanas(por_semana: dict, hoy: Optional[dt.date] = None) -> list:
+    """
+    {semana: slots} -> una sola lista con 'semana' y 'fecha' (ISO o None) en cada slot.
+    Si un rótulo de día se repite entre semanas (cabeceras sin fecha) se le agrega la
+    semana para no mezclarlos.
+    """
+    out, vistos = [], set()
+    for k in sorted(por_semana):
+        propios = set()
+        for s in por_semana[k] or []:
+            dia = s["dia"]
+            if dia in vistos:
+                dia = f"{dia} (sem. {k + 1})"
+            propios.add(s["dia"])
+            fecha = parsear_fecha_cabecera(s["dia"], k, hoy)
+            out.append({**s, "dia": dia, "semana": k, "fecha": fecha.isoformat() if fecha else None})
+        vistos |= propios
+    return out
+
+
+class CacheSemanas:
+    """Semanas de agenda ya leídas por (profesional/sede, semana), con vencimiento corto."""
+    def __init__(self, ttl_s: float = 0.0, reloj=time.monotonic):
+        self.ttl_s = ttl_s
+        self._reloj = reloj
+        self._datos = {}
+
+    def obtener(self, clave: str, semana: int):
+        if self.ttl_s <= 0:
+            return None
+        d = self._datos.get((clave, semana))
+        if d is None or self._reloj() - d[0] > self.ttl_s:
+            return None
+        return d[1]
+
+    def guardar(self, clave: str, semana: int, slots):
+        if self.ttl_s > 0 and slots is not None:
+            self._datos[(clave, semana)] = (self._reloj(), list(slots))
+
+    def invalidar(self, clave: str):
+        for k in [k for k in self._datos if k[0] == clave]:
+            del self._datos[k]
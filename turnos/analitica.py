@@ -0,0 +1,281 @@
+"""
+Analítica de disponibilidad sobre el historial de escaneos (turnos/historial.py).
+
+    python -m turnos.analitica [--dias 90] [--servicio ODONTO] [--zona …] [--depto CAPITAL]
+                               [--profesional …] [--top 15] [--json salida.json]
+
+Carga el historial en arreglos columnares (NumPy) y calcula:
+- a qué día/hora aparecen turnos nuevos (mapa de calor día de semana × hora),
+- cuánto duran los turnos hasta que alguien los toma (distribución de vida),
+- disponibilidad por profesional (% de escaneos con fecha disponible, días hasta la fecha).
+
+Todo lo pesado es vectorizado: meses de escaneos cada 10 minutos se procesan en segundos.
+"""
+import os, sys, json, time, argparse, pathlib, functools, datetime as dt
+import numpy as np
+
+from turnos.historial import Historial
+from turnos.cache_busquedas import normalizar
+
+DIAS = ("Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom")
+TRAMOS_VIDA_MIN = (10, 30, 60, 180, 720, 1440)
+
+
+class _Factor:
+    """Texto -> id entero (para columnas categóricas)."""
+    def __init__(self):
+        self.ids, self.valores = {}, []
+
+    def __call__(self, v) -> int:
+        i = self.ids.get(v)
+        if i is None:
+            i = self.ids[v] = len(self.valores)
+            self.valores.append(v)
+        return i
+
+
+def _coincide(r, filtros) -> bool:
+    return all(not f or f in normalizar(r.get(k, "")) for k, f in filtros.items())
+
+
+# Hay pocas fechas/horas distintas y cientos de miles de filas: se parsea cada una una sola vez
+@functools.lru_cache(maxsize=None)
+def _fecha_ts(fecha: str, hora: str = "") -> float:
+    try:
+        d = dt.datetime.fromisoformat(fecha)
+        if hora:
+            h, m = (hora.split(":") + ["0"])[:2]
+            d = d.replace(hour=int(h), minute=int(m[:2]))
+        return d.timestamp()
+    except (ValueError, TypeError):
+        return np.nan
+
+
+@functools.lru_cache(maxsize=None)
+def _disp_ts(disp: str) -> float:
+    try:
+        return dt.datetime.strptime(disp.strip(), "%d-%m-%Y").timestamp()
+    except ValueError:
+        return np.nan
+
+
+def cargar(historial: Historial, desde_ts: float = 0.0, filtros: dict = None) -> dict:
+    """
+    Lee el historial una vez y arma las columnas:
+      agenda: esc_t, esc_agenda, esc_cubre   (un escaneo de agenda por fila)
+              v_esc, v_slot, v_slot_t        (un turno visto por fila)
+      filas:  f_t, f_prof, f_ok, f_disp_t    (una fila de resultados por fila)
+    """
+    filtros = {k: normalizar(v) for k, v in (filtros or {}).items()}
+    filtro_prof = filtros.pop("profesional", "")
+    agendas, slots, profs = _Factor(), _Factor(), _Factor()
+    esc_t, esc_agenda, esc_cubre = [], [], []
+    v_esc, v_slot, v_slot_t = [], [], []
+    f_t, f_prof, f_ok, f_disp_t = [], [], [], []
+    for r in historial.leer(desde_ts):
+        if not _coincide(r, filtros):
+            continue
+        if r["tipo"] == "agenda":
+            if filtro_prof and filtro_prof not in normalizar(r.get("profesional", "")):
+                continue
+            a = agendas(f"{r.get('profesional', '')} | {r.get('domicilio', '')}")
+            e = len(esc_t)
+            esc_t.append(r["t"])
+            esc_agenda.append(a)
+            esc_cubre.append(_fecha_ts(r.get("cubre_hasta", "")) + 86400 if r.get("cubre_hasta") else np.inf)
+            for s in r.get("slots", []):
+                v_esc.append(e)
+                v_slot.append(slots((a, s.get("fecha", ""), s.get("hora", ""))))
+                v_slot_t.append(_fecha_ts(s.get("fecha", ""), s.get("hora", "")))
+        elif r["tipo"] == "filas":
+            for f in r.get("filas", []):
+                if filtro_prof and filtro_prof not in normalizar(f.get("profesional", "")):
+                    continue
+                disp = f.get("disp", "")
+                f_t.append(r["t"])
+                f_prof.append(profs(f"{f.get('profesional', '')} | {f.get('domicilio', '')}"))
+                f_ok.append(disp.strip() not in ("", "---"))
+                f_disp_t.append(_disp_ts(disp))
+    return {
+        "esc_t": np.asarray(esc_t, dtype=np.float64),
+        "esc_agenda": np.asarray(esc_agenda, dtype=np.int32),
+        "esc_cubre": np.asarray(esc_cubre, dtype=np.float64),
+        "v_esc": np.asarray(v_esc, dtype=np.int64),
+        "v_slot": np.asarray(v_slot, dtype=np.int64),
+        "v_slot_t": np.asarray(v_slot_t, dtype=np.float64),
+        "f_t": np.asarray(f_t, dtype=np.float64),
+        "f_prof": np.asarray(f_prof, dtype=np.int32),
+        "f_ok": np.asarray(f_ok, dtype=bool),
+        "f_disp_t": np.asarray(f_disp_t, dtype=np.float64),
+        "agendas": agendas.valores,
+        "profesionales": profs.valores,
+    }
+
+
+def _siguiente_en_grupo(grupo, t):
+    """Para cada fila: posición dentro de su grupo ordenado por t e índice de la siguiente del grupo (-1 si no hay)."""
+    orden = np.lexsort((t, grupo))
+    g = grupo[orden]
+    inicio = np.r_[True, g[1:] != g[:-1]]
+    idx = np.arange(len(orden))
+    rango_ord = idx - np.maximum.accumulate(np.where(inicio, idx, 0))
+    sig_ord = np.r_[np.where(inicio[1:], -1, orden[1:]), -1]
+    rango, sig = np.empty(len(orden), np.int64), np.empty(len(orden), np.int64)
+    rango[orden], sig[orden] = rango_ord, sig_ord
+    return rango, sig
+
+
+def episodios(d: dict) -> dict:
+    """
+    Agrupa las veces que se vio cada turno en episodios (escaneos consecutivos de la misma
+    agenda). Por episodio: inicio, fin (primer escaneo siguiente en que ya no está),
+    censurado (sigue estando o ningún escaneo posterior cubre su fecha), vencido (desapareció
+    porque pasó su horario), liberado (no estaba en el primer escaneo de esa agenda).
+    """
+    if not len(d["v_esc"]):
+        vacio = np.array([])
+        return {"inicio": vacio, "vida_s": vacio, "censurado": vacio.astype(bool),
+                "vencido": vacio.astype(bool), "liberado": vacio.astype(bool)}
+    rango, sig = _siguiente_en_grupo(d["esc_agenda"], d["esc_t"])
+    esc = d["v_esc"]
+    r = rango[esc]
+    orden = np.lexsort((r, d["v_slot"]))
+    slot, r, esc = d["v_slot"][orden], r[orden], esc[orden]
+    nuevo = np.r_[True, (slot[1:] != slot[:-1]) | (np.diff(r) != 1)]
+    ini = np.flatnonzero(nuevo)
+    fin = np.r_[ini[1:] - 1, len(slot) - 1]
+    t_ini = d["esc_t"][esc[ini]]
+    slot_t = d["v_slot_t"][orden][ini]
+    sig_esc = sig[esc[fin]]
+    tiene_sig = sig_esc >= 0
+    t_fin = np.where(tiene_sig, d["esc_t"][sig_esc], np.nan)
+    # El escaneo siguiente solo prueba que el turno se fue si su agenda llegaba a esa fecha
+    cubre = np.where(tiene_sig, d["esc_cubre"][sig_esc], -np.inf)
+    censurado = ~tiene_sig | ~((cubre >= slot_t) | np.isnan(slot_t))
+    vencido = ~censurado & (t_fin >= slot_t)
+    return {
+        "inicio": t_ini,
+        "vida_s": np.where(censurado, np.nan, t_fin - t_ini),
+        "censurado": censurado,
+        "vencido": vencido,
+        "liberado": rango[esc[ini]] > 0,
+    }
+
+
+def mapa_liberaciones(inicios: np.ndarray) -> np.ndarray:
+    """Cantidad de turnos nuevos por día de semana (filas, lunes=0) y hora local (columnas)."""
+    if not len(inicios):
+        return np.zeros((7, 24), dtype=np.int64)
+    off = dt.datetime.now().astimezone().utcoffset().total_seconds()
+    local = inicios + off
+    dias = (np.floor(local / 86400).astype(np.int64) + 3) % 7      # 1970-01-01 fue jueves
+    horas = (np.mod(local, 86400) // 3600).astype(np.int64)
+    return np.bincount(dias * 24 + horas, minlength=168).reshape(7, 24)
+
+
+def por_profesional(d: dict) -> list:
+    """[(profesional, escaneos, % con disponibilidad, mediana de días hasta la fecha disp)] por % desc."""
+    if not len(d["f_prof"]):
+        return []
+    n = len(d["profesionales"])
+    vistos = np.bincount(d["f_prof"], minlength=n)
+    con = np.bincount(d["f_prof"], weights=d["f_ok"], minlength=n)
+    dias = (d["f_disp_t"] - d["f_t"]) / 86400
+    valido = d["f_ok"] & ~np.isnan(dias)
+    orden = np.lexsort((dias[valido], d["f_prof"][valido]))
+    p, x = d["f_prof"][valido][orden], dias[valido][orden]
+    cortes = np.flatnonzero(np.r_[True, p[1:] != p[:-1]]) if len(p) else np.array([], dtype=np.int64)
+    medianas = np.full(n, np.nan)
+    for i, j in zip(cortes, np.r_[cortes[1:], len(p)]):
+        medianas[p[i]] = np.median(x[i:j])
+    filas = [(d["profesionales"][i], int(vistos[i]), 100 * con[i] / vistos[i], medianas[i])
+             for i in range(n) if vistos[i]]
+    return sorted(filas, key=lambda f: (-f[2], f[0]))
+
+
+def reporte(d: dict, top: int = 15) -> dict:
+    ep = episodios(d)
+    tomados = ~ep["censurado"] & ~ep["vencido"]
+    vida_min = ep["vida_s"][tomados] / 60
+    tramos = np.histogram(vida_min, bins=(0, *TRAMOS_VIDA_MIN, np.inf))[0] if len(vida_min) else np.zeros(7, int)
+    return {
+        "escaneos_agenda": int(len(d["esc_t"])),
+        "filas_resultados": int(len(d["f_t"])),
+        "desde": float(min(d["esc_t"].min(initial=np.inf), d["f_t"].min(initial=np.inf))),
+        "hasta": float(max(d["esc_t"].max(initial=0), d["f_t"].max(initial=0))),
+        "turnos_vistos": int(len(ep["inicio"])),
+        "liberados": int(ep["liberado"].sum()),
+        "tomados": int(tomados.sum()),
+        "vencidos": int(ep["vencido"].sum()),
+        "abiertos": int(ep["censurado"].sum()),
+        "vida_min": {p: float(np.percentile(vida_min, q)) for p, q in (("p50", 50), ("p90", 90), ("max", 100))}
+                    if len(vida_min) else {},
+        "vida_tramos_min": dict(zip([f"<{TRAMOS_VIDA_MIN[0]}"]
+                                    + [f"{a}-{b}" for a, b in zip(TRAMOS_VIDA_MIN, TRAMOS_VIDA_MIN[1:])]
+                                    + [f">{TRAMOS_VIDA_MIN[-1]}"], map(int, tramos))),
+        "liberaciones": mapa_liberaciones(ep["inicio"][ep["liberado"]]).tolist(),
+        "profesionales": [{"profesional": p, "escaneos": n, "pct_disponible": round(pct, 1),
+                           "dias_hasta_disp_p50": None if np.isnan(m) else round(float(m), 1)}
+                          for p, n, pct, m in por_profesional(d)[:top]],
+    }
+
+
+def imprimir(rep: dict):
+    if not rep["escaneos_agenda"] and not rep["filas_resultados"]:
+        print("El historial está vacío para esos filtros.")
+        return
+    fmt = lambda t: time.strftime("%d-%m-%Y %H:%M", time.localtime(t))
+    print(f"Historial: {fmt(rep['desde'])} → {fmt(rep['hasta'])} · {rep['escaneos_agenda']} agenda(s) leídas · "
+          f"{rep['filas_resultados']} fila(s) de resultados")
+    print(f"Turnos: {rep['turnos_vistos']} vistos · {rep['liberados']} aparecieron entre escaneos · "
+          f"{rep['tomados']} tomados · {rep['vencidos']} vencidos · {rep['abiertos']} abiertos")
+
+    print("\nTurnos nuevos por día y hora (local):")
+    print("     " + "".join(f"{h:>4}" for h in range(24)))
+    for dia, fila in zip(DIAS, rep["liberaciones"]):
+        print(f"{dia:<5}" + "".join(f"{n:>4}" if n else "   ." for n in fila))
+
+    print("\nVida de los turnos tomados (minutos):")
+    if rep["vida_min"]:
+        v = rep["vida_min"]
+        print(f"  p50 {v['p50']:.0f} · p90 {v['p90']:.0f} · max {v['max']:.0f}")
+        total = max(1, rep["tomados"])
+        for tramo, n in rep["vida_tramos_min"].items():
+            print(f"  {tramo:>9}: {n:>6}  {'#' * round(40 * n / total)}")
+    else:
+        print("  sin datos (hace falta ver desaparecer turnos entre escaneos)")
+
+    print("\nDisponibilidad por profesional:")
+    for p in rep["profesionales"]:
+        dias = "" if p["dias_hasta_disp_p50"] is None else f" · fecha disp a {p['dias_hasta_disp_p50']:.0f} día(s) (p50)"
+        print(f"  {p['pct_disponible']:5.1f}%  de {p['escaneos']:>5} escaneo(s)  {p['profesional']}{dias}")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m turnos.analitica", description=__doc__.split("\n\n")[0].strip())
+    ap.add_argument("--dir", type=pathlib.Path,
+                    default=pathlib.Path(os.getenv("ESTADO_DIR", ".estado")).expanduser() / "historial")
+    ap.add_argument("--dias", type=float, default=0, help="solo los últimos N días (0 = todo)")
+    ap.add_argument("--servicio", default="")
+    ap.add_argument("--zona", default="")
+    ap.add_argument("--depto", default="")
+    ap.add_argument("--profesional", default="")
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--json", type=pathlib.Path, help="además, guardar el reporte en JSON")
+    a = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    d = cargar(Historial(a.dir), time.time() - a.dias * 86400 if a.dias else 0.0,
+               {"servicio": a.servicio, "zona": a.zona, "depto": a.depto, "profesional": a.profesional})
+    t1 = time.perf_counter()
+    rep = reporte(d, a.top)
+    t2 = time.perf_counter()
+    imprimir(rep)
+    print(f"\n(carga {t1 - t0:.2f}s · cálculo {t2 - t1:.2f}s)")
+    if a.json:
+        a.json.write_text(json.dumps(rep, ensure_ascii=False, indent=1), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
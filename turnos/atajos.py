@@ -0,0 +1,92 @@
+"""
+Atajos aprendidos: la request real que dispara el portal para una búsqueda (Buscar con
+servicio/zona/depto/profesional) y para la agenda de un profesional (pickMostrarAgenda).
+Se capturan la primera vez que el flujo pasa por el formulario (ver CapturaXHR) y, en las
+corridas siguientes, se piden directo con la sesión del contexto, sin pestaña 'Nuevo',
+selects ni clicks. El formulario queda de respaldo: si un atajo falla (sesión vencida,
+token de un solo uso, cambio del portal) se lo olvida después de max_fallos y se vuelve a
+aprender en la próxima pasada por el formulario.
+
+Se persisten en estado_dir/atajos.json:
+  {"busqueda": {clave: request}, "agenda": {clave: request}}
+  request = {"url", "method", "post_data", "headers", "fallos"}   (captura.describir_request)
+"""
+import os, json, logging, pathlib
+from typing import Optional
+
+log = logging.getLogger("osep")
+
+
+def clave_agenda(servicio: str, fila: dict) -> str:
+    return "|".join(" ".join(str(x).lower().split())
+                    for x in (servicio, fila.get("profesional", ""), fila.get("domicilio", "")))
+
+
+class Atajos:
+    def __init__(self, ruta: Optional[pathlib.Path] = None, max_fallos: int = 2):
+        self.ruta = pathlib.Path(ruta) if ruta else None
+        self.max_fallos = max_fallos
+        self._datos = None
+        self.usos = 0
+        self.fallos = 0
+        self.aprendidos = 0
+
+    def _cargar(self) -> dict:
+        if self._datos is None:
+            self._datos = {"busqueda": {}, "agenda": {}}
+            if self.ruta and self.ruta.exists():
+                try:
+                    self._datos.update(json.loads(self.ruta.read_text(encoding="utf-8")))
+                except (OSError, ValueError) as e:
+                    log.warning(f"Atajos: no se pudo leer {self.ruta} ({e}); se arranca de cero.")
+        return self._datos
+
+    def guardar(self):
+        if not self.ruta or self._datos is None:
+            return
+        try:
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            # Temporal propio de este proceso: los workers comparten el directorio de estado
+            tmp = self.ruta.with_name(f"{self.ruta.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self._datos, ensure_ascii=False, indent=1), encoding="utf-8")
+            tmp.replace(self.ruta)
+        except OSError as e:
+            log.debug(f"Atajos: no se pudo guardar ({e})")
+
+    def obtener(self, tipo: str, clave: str) -> Optional[dict]:
+        return self._cargar()[tipo].get(clave)
+
+    def aprender(self, tipo: str, clave: str, request: Optional[dict]):
+        if not request:
+            return
+        previo = self._cargar()[tipo].get(clave)
+        nuevo = {**request, "fallos": 0}
+        if previo == nuevo:
+            return
+        self._datos[tipo][clave] = nuevo
+        self.aprendidos += 1
+        log.debug(f"Atajos: {tipo} {clave!r} -> {request['method']} {request['url']}")
+        self.guardar()
+
+    def exito(self, tipo: str, clave: str):
+        self.usos += 1
+        req = self._cargar()[tipo].get(clave)
+        if req and req.get("fallos"):
+            req["fallos"] = 0
+            self.guardar()
+
+    def fallo(self, tipo: str, clave: str, motivo: str):
+        self.fallos += 1
+        req = self._cargar()[tipo].get(clave)
+        if not req:
+            return
+        req["fallos"] = req.get("fallos", 0) + 1
+        if req["fallos"] >= self.max_fallos:
+            del self._datos[tipo][clave]
+            log.info(f"Atajos: se olvida el de {tipo} {clave!r} ({motivo}); se vuelve al formulario.")
+        self.guardar()
+
+    def resumen(self) -> str:
+        d = self._cargar()
+        return (f"{len(d['busqueda'])} búsqueda(s) y {len(d['agenda'])} agenda(s) aprendidas; "
+                f"esta corrida: {self.usos} uso(s), {self.fallos} fallo(s), {self.aprendidos} nuevo(s)")
@@ -0,0 +1,154 @@
+"""
+Arranque del event loop: uvloop en Linux/macOS si está instalado y, si no, el loop estándar de
+asyncio (en Windows el Proactor, que Playwright necesita para los subprocesos). El cierre lo
+hace asyncio.Runner: cancela las tareas que quedaron, cierra los generadores async y el
+executor por defecto antes de cerrar el loop.
+
+BUCLE=auto|uvloop|asyncio elige el loop (auto = uvloop si se puede).
+
+Si ya hay un loop corriendo en el hilo (Spyder, Jupyter) la corrida va en un hilo propio.
+
+Benchmark del overhead del loop con muchas páginas a la vez (sin navegador):
+    python -m turnos.bucle --paginas 1,8,32,64 --segundos 3
+Cada "página" hace idas y vueltas de mensajes JSON chicos por un socket local, como las
+llamadas al driver de Playwright; un ticker mide cuánto se atrasa un sleep de 5 ms (lag).
+"""
+import os, sys, json, time, asyncio, logging, argparse, threading
+from typing import Optional
+
+from turnos.metricas import percentil
+
+log = logging.getLogger("osep")
+
+
+def _uvloop():
+    if sys.platform.startswith("win"):
+        return None
+    try:
+        import uvloop
+    except ImportError:
+        return None
+    return uvloop
+
+
+def fabrica_bucle(preferencia: Optional[str] = None):
+    """(nombre, fábrica de loops) según BUCLE; fábrica None = la de asyncio."""
+    preferencia = (preferencia or os.getenv("BUCLE", "auto")).strip().lower() or "auto"
+    if preferencia not in ("auto", "uvloop", "asyncio"):
+        log.warning(f"BUCLE={preferencia!r} no es válido (auto|uvloop|asyncio); se usa auto.")
+        preferencia = "auto"
+    if preferencia != "asyncio":
+        uvloop = _uvloop()
+        if uvloop:
+            return "uvloop", uvloop.new_event_loop
+        if preferencia == "uvloop":
+            log.warning("BUCLE=uvloop pero uvloop no está disponible en esta plataforma; se usa asyncio.")
+    return "asyncio", None
+
+
+def _correr_en_hilo(principal, args, fabrica) -> int:
+    with asyncio.Runner(loop_factory=fabrica) as runner:
+        return runner.run(principal(*args))
+
+
+def correr(principal, *args, preferencia: Optional[str] = None) -> int:
+    """Corre principal(*args) (una corrutina que devuelve el código de salida) en un loop nuevo."""
+    nombre, fabrica = fabrica_bucle(preferencia)
+    log.debug(f"Event loop: {nombre}.")
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return _correr_en_hilo(principal, args, fabrica)
+
+    # Ya hay un loop en este hilo (Spyder/Jupyter): no se puede anidar, se corre en otro hilo
+    res = {}
+
+    def objetivo():
+        try:
+            res["rc"] = _correr_en_hilo(principal, args, fabrica)
+        except BaseException as e:
+            res["error"] = e
+
+    t = threading.Thread(target=objetivo, name="osep-main")
+    t.start()
+    t.join()
+    if "error" in res:
+        raise res["error"]
+    return res["rc"]
+
+
+# ---------------- benchmark ----------------
+MENSAJE = (json.dumps({"id": 1, "guid": "frame@" + "0" * 32, "method": "evaluate",
+                       "params": {"expression": "() => document.querySelectorAll('td').length", "arg": {}}})
+           + "\n").encode("utf-8")
+
+
+async def _medir(paginas: int, segundos: float) -> dict:
+    async def atender(lector, escritor):
+        try:
+            while linea := await lector.readline():
+                escritor.write(linea)
+                await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+
+    servidor = await asyncio.start_server(atender, "127.0.0.1", 0)
+    puerto = servidor.sockets[0].getsockname()[1]
+    latencias, lags = [], []
+    fin = time.perf_counter() + segundos
+
+    async def pagina():
+        lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+        try:
+            while time.perf_counter() < fin:
+                t0 = time.perf_counter()
+                escritor.write(MENSAJE)
+                await escritor.drain()
+                await asyncio.wait_for(lector.readline(), 5)
+                latencias.append(time.perf_counter() - t0)
+        finally:
+            escritor.close()
+
+    async def ticker():
+        while time.perf_counter() < fin:
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - t0 - 0.005)
+
+    t0, cpu0 = time.perf_counter(), time.process_time()
+    await asyncio.gather(ticker(), *(pagina() for _ in range(paginas)))
+    seg, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+    servidor.close()
+    await servidor.wait_closed()
+    return {"paginas": paginas, "mensajes_s": len(latencias) / seg,
+            "p50_us": percentil(latencias, 50) * 1e6, "p95_us": percentil(latencias, 95) * 1e6,
+            "lag_p95_ms": percentil(lags, 95) * 1e3, "cpu_us_msg": cpu / max(1, len(latencias)) * 1e6}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m turnos.bucle",
+                                 description="Overhead del event loop con muchas páginas concurrentes.")
+    ap.add_argument("--paginas", default="1,8,32,64", help="cantidades de páginas a probar (coma)")
+    ap.add_argument("--segundos", type=float, default=3.0, help="duración de cada medición")
+    ap.add_argument("--bucles", default="asyncio,uvloop", help="loops a comparar (coma)")
+    a = ap.parse_args(argv)
+    paginas = [int(x) for x in a.paginas.split(",") if x.strip()]
+
+    print(f"{'loop':8} {'páginas':>7} {'msj/s':>9} {'p50 µs':>8} {'p95 µs':>8} {'lag p95 ms':>10} {'CPU µs/msj':>10}")
+    for pedido in (b.strip() for b in a.bucles.split(",") if b.strip()):
+        nombre, fabrica = fabrica_bucle(pedido)
+        if nombre != pedido:
+            print(f"{pedido:8} no disponible")
+            continue
+        for n in paginas:
+            with asyncio.Runner(loop_factory=fabrica) as runner:
+                r = runner.run(_medir(n, a.segundos))
+            print(f"{nombre:8} {n:>7} {r['mensajes_s']:>9.0f} {r['p50_us']:>8.0f} {r['p95_us']:>8.0f} "
+                  f"{r['lag_p95_ms']:>10.2f} {r['cpu_us_msg']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Caché compartida de resultados de búsqueda (filas de #tblResultadoProfesionales).
+
+La clave es la búsqueda normalizada (servicio, zona, depto, médico), no la cuenta ni el
+objetivo: si varias cuentas/objetivos buscan lo mismo, el portal recibe una sola búsqueda.
+- Entradas con vencimiento (TTL) y tope de cantidad (se descartan las más viejas).
+- Coalescing: búsquedas idénticas simultáneas esperan la misma request en curso.
+- Opcionalmente se persiste en un JSON (lo comparten procesos/corridas; el coalescing no).
+"""
+import os, json, time, asyncio, logging, pathlib, unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+log = logging.getLogger("osep")
+
+
+def normalizar(texto: str) -> str:
+    t = unicodedata.normalize("NFKD", texto or "")
+    t = "".join(c for c in t if not unicodedata.combining(c))
+    return " ".join(t.casefold().split())
+
+
+class CacheBusquedas:
+    def __init__(self, ttl_s: float = 60.0, max_entradas: int = 256, ruta: Optional[pathlib.Path] = None,
+                 reloj=time.time):
+        self.ttl_s = ttl_s
+        self.max_entradas = max_entradas
+        self.ruta = pathlib.Path(ruta) if ruta else None
+        self._reloj = reloj
+        self._datos = OrderedDict()     # clave -> (ts, filas)
+        self._en_curso = {}             # clave -> Future
+        self._mtime = None
+        self.aciertos = self.fallos = self.coalescidas = 0
+
+    @staticmethod
+    def clave(servicio: str, zona: str, depto: str, medico: str = "") -> str:
+        return "|".join(normalizar(x) for x in (servicio, zona, depto, medico))
+
+    # ---------- disco ----------
+    def _cargar_disco(self):
+        if not self.ruta:
+            return
+        try:
+            mtime = self.ruta.stat().st_mtime
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        try:
+            datos = json.loads(self.ruta.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        for clave, (ts, filas) in datos.items():
+            if clave not in self._datos or self._datos[clave][0] < ts:
+                self._datos[clave] = (ts, filas)
+        self._podar()
+
+    def _guardar_disco(self):
+        if not self.ruta:
+            return
+        try:
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            # Temporal propio de este proceso: los workers comparten el directorio de estado
+            tmp = self.ruta.with_name(f"{self.ruta.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(dict(self._datos), ensure_ascii=False), encoding="utf-8")
+            tmp.replace(self.ruta)
+            self._mtime = self.ruta.stat().st_mtime
+        except OSError as e:
+            log.debug(f"Caché de búsquedas: no se pudo guardar ({e})")
+
+    # ---------- memoria ----------
+    def _podar(self):
+        ahora = self._reloj()
+        for clave in [k for k, (ts, _) in self._datos.items() if ahora - ts > self.ttl_s]:
+            del self._datos[clave]
+        while len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)
+
+    def fresco(self, clave: str) -> Optional[list]:
+        """Filas vigentes para la clave (copia) o None."""
+        if self.ttl_s <= 0:
+            return None
+        self._cargar_disco()
+        d = self._datos.get(clave)
+        if d is None or self._reloj() - d[0] > self.ttl_s:
+            return None
+        self._datos.move_to_end(clave)
+        return [dict(f) for f in d[1]]
+
+    def guardar(self, clave: str, filas: list):
+        if self.ttl_s <= 0:
+            return
+        self._datos[clave] = (self._reloj(), [dict(f) for f in filas])
+        self._datos.move_to_end(clave)
+        self._podar()
+        self._guardar_disco()
+
+    def invalidar(self, clave: str):
+        if self._datos.pop(clave, None) is not None:
+            self._guardar_disco()
+
+    async def obtener(self, clave: str, producir):
+        """
+        Filas de la caché si están vigentes; si otra corrutina ya está buscando lo mismo se
+        espera ese resultado; si no, await producir() y se guarda. Los errores no se cachean.
+        Si cancelan a la que buscaba, las que esperaban no se cancelan: buscan de nuevo.
+        """
+        filas = self.fresco(clave)
+        if filas is not None:
+            self.aciertos += 1
+            return filas
+        if clave in self._en_curso:
+            self.coalescidas += 1
+            fut = self._en_curso[clave]
+            try:
+                filas = await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                if not fut.cancelled():
+                    raise       # la cancelada es esta corrutina
+                return await self.obtener(clave, producir)
+            return [dict(f) for f in filas]
+        self.fallos += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._en_curso[clave] = fut
+        try:
+            filas = await producir()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()   # marcado como leído aunque nadie más lo espere
+            raise
+        else:
+            self.guardar(clave, filas)
+            fut.set_result(filas)
+            return [dict(f) for f in filas]
+        finally:
+            self._en_curso.pop(clave, None)
+
+    def resumen(self) -> str:
+        return (f"{self.aciertos} acierto(s), {self.coalescidas} coalescida(s), {self.fallos} búsqueda(s) "
+                f"al portal, {len(self._datos)} entrada(s)")
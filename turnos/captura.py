@@ -0,0 +1,322 @@
+"""
+Captura de las respuestas propias del portal (búsqueda de profesionales y agenda).
+
+En lugar de esperar a que se renderice la tabla y leer innerText con JS, se
+escuchan las respuestas de red de la página y se parsean directamente en
+registros de filas y turnos. El scraping del DOM queda como plan B en app.py.
+"""
+import re, json, asyncio, logging
+from html.parser import HTMLParser
+
+log = logging.getLogger("osep")
+
+# Tipos de recurso que pueden traer datos (el resto: imágenes, css, js… se ignora)
+TIPOS_CAPTURABLES = {"xhr", "fetch", "document"}
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+COLUMNAS_FILA = ("profesional", "domicilio", "servicio", "horario", "disp", "agenda")
+
+
+# ================== MINI DOM ==================
+class Nodo:
+    __slots__ = ("tag", "attrs", "hijos", "padre")
+
+    def __init__(self, tag, attrs=None, padre=None):
+        self.tag = tag
+        self.attrs = dict(attrs or {})
+        self.hijos = []
+        self.padre = padre
+
+    def clases(self):
+        return set((self.attrs.get("class") or "").split())
+
+    def texto(self) -> str:
+        partes = []
+        pila = [self]
+        while pila:
+            n = pila.pop()
+            if isinstance(n, str):
+                partes.append(n)
+                continue
+            if n.tag == "br":
+                partes.append(" ")
+            pila.extend(reversed(n.hijos))
+        # Igual que la normalización del JS original: todo espacio colapsado a uno
+        return " ".join("".join(partes).split())
+
+    def buscar(self, pred):
+        """Recorre el subárbol (en orden de documento) devolviendo los nodos que cumplen pred."""
+        pila = list(reversed(self.hijos))
+        while pila:
+            n = pila.pop()
+            if isinstance(n, str):
+                continue
+            if pred(n):
+                yield n
+            pila.extend(reversed(n.hijos))
+
+    def hijos_tag(self, *tags):
+        return [h for h in self.hijos if not isinstance(h, str) and h.tag in tags]
+
+
+class _Arbol(HTMLParser):
+    """
+    Parser tolerante: cierra td/th/tr implícitos como lo hace el navegador con tablas mal formadas.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.raiz = Nodo("#document")
+        self.actual = self.raiz
+
+    def _cerrar_hasta(self, tags, frontera=("table",)):
+        n = self.actual
+        while n is not self.raiz and n.tag not in frontera:
+            if n.tag in tags:
+                self.actual = n.padre
+                return
+            n = n.padre
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("td", "th"):
+            self._cerrar_hasta(("td", "th"))
+        elif tag == "tr":
+            self._cerrar_hasta(("tr",))
+        nodo = Nodo(tag, attrs, self.actual)
+        self.actual.hijos.append(nodo)
+        if tag not in VOID_TAGS:
+            self.actual = nodo
+
+    def handle_startendtag(self, tag, attrs):
+        self.actual.hijos.append(Nodo(tag, attrs, self.actual))
+
+    def handle_endtag(self, tag):
+        n = self.actual
+        while n is not self.raiz:
+            if n.tag == tag:
+                self.actual = n.padre
+                return
+            n = n.padre
+        # cierre sin apertura: se ignora
+
+    def handle_data(self, data):
+        self.actual.hijos.append(data)
+
+
+def parsear_html(html: str) -> Nodo:
+    p = _Arbol()
+    p.feed(html or "")
+    p.close()
+    return p.raiz
+
+
+def _filas_tbody(tabla: Nodo):
+    cuerpos = list(tabla.buscar(lambda n: n.tag == "tbody"))
+    return cuerpos or [tabla]
+
+
+# ================== PARSERS ==================
+def parsear_tabla_profesionales(html: str):
+    """
+    Devuelve la lista de filas de #tblResultadoProfesionales (mismo formato que el scraping JS),
+    o None si el HTML no contiene la tabla.
+    """
+    raiz = parsear_html(html)
+    tabla = next(raiz.buscar(lambda n: n.tag == "table" and n.attrs.get("id") == "tblResultadoProfesionales"), None)
+    if tabla is None:
+        return None
+    out = []
+    for tbody in _filas_tbody(tabla):
+        trs = [h for h in tbody.hijos if not isinstance(h, str)]
+        for idx, tr in enumerate(trs):
+            if tr.tag != "tr":
+                continue
+            tds = tr.hijos_tag("td")
+            if len(tds) < 6:
+                continue
+            fila = {col: tds[i].texto() for i, col in enumerate(COLUMNAS_FILA)}
+            fila["rowIndex"] = idx
+            out.append(fila)
+    return out
+
+
+def parsear_agenda(html: str):
+    """
+    Devuelve los turnos de table.tabla_dias_horarios como registros {dia, hora, col},
+    o None si el HTML no contiene la tabla de la agenda.
+    """
+    raiz = parsear_html(html)
+    tabla = next(raiz.buscar(lambda n: n.tag == "table" and "tabla_dias_horarios" in n.clases()), None)
+    if tabla is None:
+        return None
+    dias_labels = [th.texto() for th in tabla.buscar(
+        lambda n: n.tag == "th" and n.clases() & {"cabecera_dia", "cabecera_hoy"})]
+    slots = []
+    for tbody in _filas_tbody(tabla):
+        for tr in tbody.hijos_tag("tr"):
+            for idx, td in enumerate(tr.hijos_tag("td")):
+                for div in td.buscar(lambda n: n.tag == "div" and "horario_disponible" in n.clases()):
+                    txt = div.texto()
+                    if txt:
+                        dia = dias_labels[idx] if idx < len(dias_labels) else f"Columna {idx}"
+                        slots.append({"dia": dia, "hora": txt, "col": idx})
+    return slots
+
+
+_ALIAS_FILA = {
+    "profesional": ("profesional", "nombre", "prestador", "medico"),
+    "domicilio":   ("domicilio", "direccion", "sede", "lugar"),
+    "servicio":    ("servicio", "especialidad"),
+    "horario":     ("horario", "horarios", "atencion"),
+    "disp":        ("disp", "disponibilidad", "fecha", "primerTurno"),
+    "agenda":      ("agenda",),
+}
+
+
+def _texto_celda(v) -> str:
+    if v is None:
+        return ""
+    v = str(v)
+    if "<" in v:
+        return parsear_html(v).texto()
+    return " ".join(v.split())
+
+
+def parsear_json_profesionales(obj):
+    """
+    Variante JSON (formato DataTables u objetos planos). Devuelve None si no reconoce la forma,
+    si ninguna fila trae el profesional (con un patrón amplio como /turnos/ llegan otros JSON
+    del portal, y una lista vacía no prueba que sea la búsqueda) o si es una sola página de un
+    resultado paginado en el servidor. En esos casos manda el DOM.
+    """
+    if isinstance(obj, dict):
+        total = next((obj[k] for k in ("recordsFiltered", "iTotalDisplayRecords", "total", "totalRegistros")
+                      if isinstance(obj.get(k), int)), None)
+        for k in ("data", "aaData", "rows", "resultados"):
+            if isinstance(obj.get(k), list):
+                obj = obj[k]
+                break
+        else:
+            return None
+        if total is not None and total > len(obj):
+            log.debug(f"Captura XHR: búsqueda paginada en el servidor ({len(obj)} de {total}); se usa el DOM.")
+            return None
+    if not isinstance(obj, list):
+        return None
+    out = []
+    for idx, item in enumerate(obj):
+        if isinstance(item, list):
+            if len(item) < 6:
+                continue
+            fila = {col: _texto_celda(item[i]) for i, col in enumerate(COLUMNAS_FILA)}
+        elif isinstance(item, dict):
+            low = {str(k).lower(): v for k, v in item.items()}
+            fila = {}
+            for col, alias in _ALIAS_FILA.items():
+                fila[col] = next((_texto_celda(low[a.lower()]) for a in alias if a.lower() in low), "")
+        else:
+            continue
+        if not fila["profesional"]:
+            continue
+        fila["rowIndex"] = idx
+        out.append(fila)
+    return out or None
+
+
+def parsear_cuerpo(texto: str, content_type: str, parser_html):
+    if "json" in (content_type or "").lower() or texto.lstrip()[:1] in ("{", "["):
+        try:
+            obj = json.loads(texto)
+        except ValueError:
+            obj = None
+        if obj is not None:
+            if parser_html is parsear_tabla_profesionales:
+                return parsear_json_profesionales(obj)
+            # JSON con el HTML de la agenda embebido
+            if isinstance(obj, dict):
+                for v in obj.values():
+                    if isinstance(v, str) and "tabla_dias_horarios" in v:
+                        return parser_html(v)
+            return None
+    return parser_html(texto)
+
+
+# ================== CAPTURA ==================
+# Headers que hacen falta para que el portal conteste igual que al XHR original
+HEADERS_UTILES = ("content-type", "x-requested-with", "accept")
+
+
+def describir_request(request) -> dict:
+    """Lo necesario para repetir una request (sin cookies: las pone el contexto). Ver turnos/atajos.py."""
+    return {"url": request.url, "method": request.method, "post_data": request.post_data,
+            "headers": {k: v for k, v in request.headers.items() if k.lower() in HEADERS_UTILES}}
+
+
+class CapturaXHR:
+    """
+    Escucha page.on("response") y resuelve futures con los datos ya parseados.
+
+    Uso: armar el future ANTES del click que dispara la request (busqueda()/agenda()),
+    y después esperar el future compitiendo contra el DOM (ver app.primero_en_llegar).
+    """
+    def __init__(self, page, patron_busqueda: str, patron_agenda: str):
+        self.page = page
+        self.re_busqueda = re.compile(patron_busqueda, re.I)
+        self.re_agenda = re.compile(patron_agenda, re.I)
+        self._fut_busqueda = None
+        self._fut_agenda = None
+        self.url_agenda = None    # última request GET que trajo la agenda (para pedir otras semanas)
+        self.req_busqueda = None  # requests que trajeron la última búsqueda/agenda (describir_request)
+        self.req_agenda = None
+        page.on("response", self._on_response)
+
+    def _nuevo_future(self):
+        return asyncio.get_running_loop().create_future()
+
+    def busqueda(self) -> asyncio.Future:
+        self._fut_busqueda = self._nuevo_future()
+        self.req_busqueda = None
+        return self._fut_busqueda
+
+    def agenda(self) -> asyncio.Future:
+        self._fut_agenda = self._nuevo_future()
+        self.req_agenda = None
+        return self._fut_agenda
+
+    async def _on_response(self, response):
+        try:
+            if response.request.resource_type not in TIPOS_CAPTURABLES:
+                return
+            url = response.url
+            pendientes = []
+            if self._fut_busqueda is not None and not self._fut_busqueda.done() and self.re_busqueda.search(url):
+                pendientes.append((self._fut_busqueda, parsear_tabla_profesionales))
+            if self._fut_agenda is not None and not self._fut_agenda.done() and self.re_agenda.search(url):
+                pendientes.append((self._fut_agenda, parsear_agenda))
+            if not pendientes or not response.ok:
+                return
+            texto = await response.text()
+            ctype = response.headers.get("content-type", "")
+            for fut, parser in pendientes:
+                datos = parsear_cuerpo(texto, ctype, parser)
+                if datos is not None and not fut.done():
+                    log.debug(f"Captura XHR: {len(datos)} registro(s) desde {url}")
+                    if fut is self._fut_agenda:
+                        self.req_agenda = describir_request(response.request)
+                        if response.request.method == "GET":
+                            self.url_agenda = url
+                    else:
+                        self.req_busqueda = describir_request(response.request)
+                    fut.set_result(datos)
+        except Exception as e:
+            # Nunca romper el flujo por la captura: el DOM sigue siendo el plan B
+            log.debug(f"Captura XHR: respuesta ignorada ({e})")
+
+    def cerrar(self):
+        for fut in (self._fut_busqueda, self._fut_agenda):
+            if fut is not None and not fut.done():
+                fut.cancel()
+        try:
+            self.page.remove_listener("response", self._on_response)
+        except Exception:
+            pass
@@ -0,0 +1,327 @@
+"""
+Prueba de carga: N pares cuenta/objetivo simulados corriendo el flujo real (login -> búsqueda
+-> agenda, sin reservar) contra un portal de mentira local, para dimensionar cuántas cuentas
+y objetivos aguanta una máquina (pool de contextos, WORKERS) antes de que suba la latencia.
+
+    python -m turnos.carga --pares 1,4,8,16 --rondas 3 --latencia-ms 150 --jitter-ms 50
+
+Por cada N: flujos/min, percentiles de latencia por paso y del flujo, errores, RSS de
+Chromium (pico y medio) y CPU (Chromium + este proceso, en % de un núcleo). Cada par tiene su
+contexto y, como el bot, hace login solo en la primera ronda. El limitador de tasa y la caché
+de búsquedas se apagan (medirían el limitador, no la máquina); --con-limite los deja.
+Cada N arranca de cero (selectores y atajos sin aprender, estado en una carpeta propia) y,
+salvo --atajos, todas las rondas van por el formulario: así los N se pueden comparar.
+
+El portal de mentira (ThreadingHTTPServer) imita lo que el flujo usa: formulario de login,
+listarCompleto con la pestaña 'Nuevo' y los selects, la búsqueda por fetch y la agenda en el
+iframe pickMostrarAgenda_iframe con la fecha en la query. Cada respuesta tarda
+--latencia-ms ± --jitter-ms.
+"""
+import os, sys, json, time, random, asyncio, logging, argparse, tempfile, pathlib, threading, dataclasses
+import datetime as dt
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from turnos.metricas import percentil
+from turnos.navegador import rss_navegador_mb, cpu_navegador_s
+
+log = logging.getLogger("osep")
+
+BASE = "/webapp_pri"
+ZONAS = {"ZONA ESTE": ["SAN MARTIN", "RIVADAVIA"], "ZONA CENTRO": ["CAPITAL", "GODOY CRUZ"]}
+SERVICIOS = ["CLINICA MEDICA", "PEDIATRIA"]
+PROFESIONALES = 12
+
+
+# ================== PORTAL DE MENTIRA ==================
+def _pagina(titulo: str, cuerpo: str) -> str:
+    return f"<!doctype html><html><head><meta charset='utf-8'><title>{titulo}</title></head><body>{cuerpo}</body></html>"
+
+LOGIN = _pagina("Portal", f"""
+<form method="post" action="{BASE}/login">
+  <input name="usuario" id="usuario"><input name="password" id="password" type="password">
+  <button type="submit">Ingresar</button>
+</form>""")
+
+INICIO = _pagina("Inicio", f"<a href='{BASE}/logout'>Salir</a><p>Bienvenido</p>")
+
+LISTAR = _pagina("Turnos", """
+<a class="nav-link" href="#divTNue" onclick="document.getElementById('divTNue').style.display='block';return false">Nuevo</a>
+<div id="divTNue" style="display:none">
+  <select id="servimod"><option>Seleccione</option>%(servicios)s</select>
+  <select id="id_zona" onchange="deptos(this.value)"><option>Seleccione</option>%(zonas)s</select>
+  <select id="id_dpto"><option>Seleccione</option></select>
+  <input id="profesionalBusquedaComodin_turn">
+  <input type="button" id="buscar" class="button buscar" value="Buscar" onclick="buscar()">
+  <div id="resultados"></div>
+</div>
+<script>
+async function deptos(zona) {
+  const r = await fetch('%(base)s/deptos?zona=' + encodeURIComponent(zona));
+  document.getElementById('id_dpto').innerHTML = '<option>Seleccione</option>' + await r.text();
+}
+async function buscar() {
+  const q = new URLSearchParams({serv: servimod.value, zona: id_zona.value, dpto: id_dpto.value,
+                                 prof: profesionalBusquedaComodin_turn.value});
+  const r = await fetch('%(base)s/turnos/buscar?' + q);
+  document.getElementById('resultados').innerHTML = await r.text();
+}
+function agenda(i) {
+  let f = document.querySelector("iframe[name='pickMostrarAgenda_iframe']");
+  if (!f) { f = document.createElement('iframe'); f.name = 'pickMostrarAgenda_iframe'; document.body.appendChild(f); }
+  const hoy = new Date(), d = String(hoy.getDate()).padStart(2, '0'), m = String(hoy.getMonth() + 1).padStart(2, '0');
+  f.src = '%(base)s/turnos/agenda?prof=' + i + '&fecha=' + d + '/' + m + '/' + hoy.getFullYear();
+}
+</script>""" % {"servicios": "".join(f"<option>{s}</option>" for s in SERVICIOS),
+               "zonas": "".join(f"<option>{z}</option>" for z in ZONAS), "base": BASE})
+
+
+def _tabla(prof: str) -> str:
+    filas = []
+    for i in range(PROFESIONALES):
+        nombre = f"PROFESIONAL {i:02d}"
+        if prof and prof.lower() not in nombre.lower():
+            continue
+        disp = (dt.date.today() + dt.timedelta(days=1 + i % 5)).strftime("%d-%m-%Y")
+        filas.append(f"<tr><td>{nombre}</td><td>CONSULTORIO {i % 3}</td><td>CLINICA MEDICA</td><td>LU MI VI 08 a 12</td>"
+                     f"<td>{disp}</td><td><img id='img_agenda_prof' src='data:,' onclick='agenda({i})' "
+                     f"style='width:12px;height:12px;cursor:pointer'></td></tr>")
+    return f"<table id='tblResultadoProfesionales'><tbody>{''.join(filas)}</tbody></table>"
+
+
+def _agenda(prof: int, fecha: str) -> str:
+    try:
+        desde = dt.datetime.strptime(fecha, "%d/%m/%Y").date()
+    except ValueError:
+        desde = dt.date.today()
+    lunes = desde - dt.timedelta(days=desde.weekday())
+    rnd = random.Random(prof * 1000 + lunes.toordinal())
+    dias = [lunes + dt.timedelta(days=k) for k in range(5)]
+    cab = "".join(f"<th class='cabecera_dia'>{d:%a} {d:%d/%m}</th>" for d in dias)
+    celdas = "".join("<td>" + "".join(f"<div class='horario_disponible'>{h:02d}:{m:02d}</div>"
+                                       for h in range(8, 13) for m in (0, 30) if rnd.random() < 0.3) + "</td>"
+                     for _ in dias)
+    # Botones de semana como links (el camino por clicks: sin URL por fecha o con HAR)
+    nav = "".join(f"<a href='agenda?prof={prof}&fecha={lunes + dt.timedelta(days=7 * k):%d/%m/%Y}'>{rotulo}</a> "
+                  for k, rotulo in ((-1, "Anterior"), (1, "Siguiente")))
+    return _pagina("Agenda", f"{nav}<table class='tabla_dias_horarios'><thead><tr>{cab}</tr></thead>"
+                             f"<tbody><tr>{celdas}</tr></tbody></table>")
+
+
+class PortalSimulado:
+    """Portal de mentira en un hilo: respuestas con latencia latencia_ms ± jitter_ms."""
+
+    def __init__(self, latencia_ms: float = 100.0, jitter_ms: float = 30.0, puerto: int = 0):
+        portal = self
+        self.latencia_ms, self.jitter_ms = latencia_ms, jitter_ms
+        self.requests = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *a):
+                pass
+
+            def handle(self):
+                try:
+                    super().handle()
+                except ConnectionError:
+                    pass    # el navegador cortó la conexión (navegación abortada o contexto cerrado)
+
+            def _responder(self, cuerpo: str, estado: int = 200, extra: dict = None):
+                datos = cuerpo.encode("utf-8")
+                self.send_response(estado)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(datos)))
+                for k, v in (extra or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def _demorar(self):
+                portal.requests += 1
+                time.sleep(max(0.0, portal.latencia_ms + random.uniform(-1, 1) * portal.jitter_ms) / 1000)
+
+            def do_GET(self):
+                self._demorar()
+                url = urlsplit(self.path)
+                q = {k: v[0] for k, v in parse_qs(url.query).items()}
+                ruta = url.path.rstrip("/")
+                if ruta == BASE:
+                    self._responder(LOGIN)
+                elif ruta == f"{BASE}/inicio":
+                    self._responder(INICIO)
+                elif ruta.endswith("/listarCompleto"):
+                    self._responder(LISTAR)
+                elif ruta == f"{BASE}/deptos":
+                    self._responder("".join(f"<option>{d}</option>" for d in ZONAS.get(q.get("zona", ""), [])))
+                elif ruta == f"{BASE}/turnos/buscar":
+                    self._responder(_tabla(q.get("prof", "")))
+                elif ruta == f"{BASE}/turnos/agenda":
+                    self._responder(_agenda(int(q.get("prof", "0") or 0), q.get("fecha", "")))
+                else:
+                    self._responder(_pagina("No encontrado", ""), 404)
+
+            def do_POST(self):
+                self._demorar()
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                self._responder("", 302, {"Location": f"{BASE}/inicio",
+                                          "Set-Cookie": f"JSESSIONID={random.getrandbits(64):x}; Path=/"})
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", puerto), Handler)
+        self._server.daemon_threads = True
+        self._hilo = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}{BASE}"
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._server.serve_forever, name="portal-simulado", daemon=True)
+        self._hilo.start()
+        return self
+
+    def cerrar(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ================== MEDICIÓN ==================
+def cpu_s() -> float:
+    """CPU (user+sys, s) de este proceso más la de Chromium (0 si no se puede medir)."""
+    propio = os.times()
+    return propio.user + propio.system + (cpu_navegador_s() or 0.0)
+
+
+async def muestrear_rss(muestras: list, cada_s: float = 0.5):
+    while True:
+        rss = await asyncio.to_thread(rss_navegador_mb)
+        if rss is not None:
+            muestras.append(rss)
+        await asyncio.sleep(cada_s)
+
+
+# ================== CARGA ==================
+def armar_config(app, n: int, url: str, args, estado_dir: pathlib.Path):
+    from turnos.config import Config, Cuenta, Objetivo
+    cuentas = tuple(Cuenta(f"usuario{i}", "clave", nombre=f"c{i}") for i in range(n))
+    zonas = list(ZONAS.items())
+    objetivos = tuple(Objetivo(SERVICIOS[i % len(SERVICIOS)], zonas[i % len(zonas)][0], zonas[i % len(zonas)][1][0],
+                               cuentas=(f"c{i}",), nombre=f"o{i}") for i in range(n))
+    extra = {} if args.con_limite else {"limite_rps": 0.0, "limite_cuenta_rps": 0.0, "busqueda_cache_ttl_s": 0.0}
+    return Config(cuentas=cuentas, objetivos=objetivos, portal_url=url, dry_run=True, estado_dir=estado_dir,
+                  timeout_ms=args.timeout_ms, presupuesto_s=3600.0, reintentos=1, historial=False,
+                  agenda_semanas=args.semanas, headless=not args.ver, atajos=args.atajos, **extra)
+
+
+async def correr_nivel(app, browser, n: int, args) -> dict:
+    from turnos.presupuesto import Deadline
+    pares = app.CFG.pares()
+    tiempos, totales, errores = {}, [], []
+    rss, cpu0, t0 = [], cpu_s(), time.perf_counter()
+    muestreo = asyncio.create_task(muestrear_rss(rss))
+
+    async def par(cuenta, obj):
+        context = await app.nuevo_contexto(browser)
+        page = await context.new_page()
+        captura = app.CapturaXHR(page, app.CFG.xhr_busqueda_patron, app.CFG.xhr_agenda_patron)
+        logueada = False
+        try:
+            for _ in range(args.rondas):
+                estado = app.EstadoFlujo(cuenta, obj, checkpoint="sesion" if logueada else None)
+                inicio = time.perf_counter()
+                try:
+                    await app.flujo_turnos_nuevo(page, Deadline(app.CFG.presupuesto_s, 0), captura, estado,
+                                                 hasta="agenda")
+                    totales.append(time.perf_counter() - inicio)
+                except Exception as e:
+                    errores.append(f"{e.__class__.__name__}: {e}")
+                logueada = estado.llego("sesion")
+                for paso, seg in estado.tiempos.items():
+                    tiempos.setdefault(paso, []).append(seg)
+        finally:
+            captura.cerrar()
+            await context.close()
+
+    try:
+        await asyncio.gather(*(par(c, o) for c, o in pares))
+    finally:
+        muestreo.cancel()
+    seg = time.perf_counter() - t0
+    return {
+        "pares": n, "camino": "atajos" if app.CFG.atajos else "formulario", "flujos": len(totales), "errores": len(errores), "seg": seg,
+        "flujos_min": len(totales) / seg * 60,
+        "flujo": {"p50": percentil(totales, 50), "p95": percentil(totales, 95)},
+        "pasos": {p: {"p50": percentil(v, 50), "p95": percentil(v, 95)} for p, v in tiempos.items()},
+        "rss_pico_mb": max(rss, default=None), "rss_medio_mb": sum(rss) / len(rss) if rss else None,
+        "cpu_pct": (cpu_s() - cpu0) / seg * 100,
+        "primer_error": errores[0] if errores else None,
+    }
+
+
+def imprimir(r: dict):
+    pasos = " · ".join(f"{p} {v['p50']:.1f}/{v['p95']:.1f}s" for p, v in r["pasos"].items())
+    rss = f"{r['rss_pico_mb']:.0f} MB pico / {r['rss_medio_mb']:.0f} medio" if r["rss_pico_mb"] is not None else "RSS n/d"
+    print(f"N={r['pares']:<3} {r['flujos']} flujo(s) en {r['seg']:.1f}s = {r['flujos_min']:.1f}/min | "
+          f"flujo p50 {r['flujo']['p50']:.1f}s p95 {r['flujo']['p95']:.1f}s | {rss} | CPU {r['cpu_pct']:.0f}% | "
+          f"errores {r['errores']}")
+    print(f"      por paso (p50/p95): {pasos}")
+    if r["primer_error"]:
+        print(f"      primer error: {r['primer_error']}")
+
+
+async def principal(args) -> int:
+    import app     # se corre desde la raíz del repo (python -m turnos.carga)
+    from playwright.async_api import async_playwright
+    from turnos.atajos import Atajos
+    from turnos.selectores import CacheSelectores
+    if not args.verbose:
+        logging.getLogger("osep").setLevel(logging.WARNING)
+    portal = PortalSimulado(args.latencia_ms, args.jitter_ms).iniciar()
+    resultados = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="osep-carga-") as tmp:
+            async with async_playwright() as p:
+                print(f"Camino: {'atajos (búsqueda/agenda pedidas directo)' if args.atajos else 'formulario'}")
+                for n in args.pares:
+                    # Lo aprendido en un N no se arrastra al siguiente (mediría otro camino)
+                    app.SELECTORES, app.ATAJOS = CacheSelectores(), Atajos()
+                    app.configurar(armar_config(app, n, portal.url, args, pathlib.Path(tmp) / f"n{n}"))
+                    browser = await app.lanzar(p, headless=app.CFG.headless)
+                    try:
+                        r = await correr_nivel(app, browser, n, args)
+                    finally:
+                        await browser.close()
+                    imprimir(r)
+                    resultados.append(r)
+    finally:
+        portal.cerrar()
+    print(f"Portal simulado: {portal.requests} request(s) atendidas.")
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(resultados, ensure_ascii=False, indent=1), encoding="utf-8")
+    return 1 if any(r["errores"] for r in resultados) else 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m turnos.carga",
+                                 description="Prueba de carga del flujo contra un portal simulado local.")
+    ap.add_argument("--pares", default="1,2,4,8", help="cantidades de pares cuenta/objetivo a probar (coma)")
+    ap.add_argument("--rondas", type=int, default=2, help="flujos por par (login solo en la primera)")
+    ap.add_argument("--latencia-ms", type=float, default=100.0, help="latencia de cada respuesta del portal")
+    ap.add_argument("--jitter-ms", type=float, default=30.0)
+    ap.add_argument("--semanas", type=int, default=2, help="semanas de agenda a leer (AGENDA_SEMANAS)")
+    ap.add_argument("--timeout-ms", type=int, default=20000)
+    ap.add_argument("--con-limite", action="store_true", help="dejar el limitador de tasa y la caché de búsquedas")
+    ap.add_argument("--atajos", action="store_true",
+                    help="medir el camino de atajos (desde la segunda ronda) en vez del formulario")
+    ap.add_argument("--ver", action="store_true", help="navegador visible")
+    ap.add_argument("--json", help="guardar los resultados en este archivo")
+    ap.add_argument("-v", "--verbose", action="store_true", help="logs del flujo (INFO)")
+    args = ap.parse_args(argv)
+    args.pares = [int(x) for x in args.pares.split(",") if x.strip()]
+    from turnos import bucle
+    return bucle.correr(principal, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
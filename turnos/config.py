@@ -0,0 +1,501 @@
+"""
+Configuración tipada, validada una sola vez al arrancar.
+
+Fuentes (de menor a mayor prioridad):
+  1) defaults de este módulo
+  2) variables de entorno / .env (mismos nombres de siempre: TIMEOUT_MS, OBJ_SERVICIO, …)
+  3) CONFIG_FILE (JSON o TOML) con claves en minúscula (timeout_ms, dry_run, …) y además
+     listas "cuentas" y "objetivos" para correr varias cuentas/objetivos en el mismo proceso.
+
+Si el archivo define "cuentas" u "objetivos", esas listas reemplazan a las que salen de
+OSEP_USER/OSEP_PASS y OBJ_*. Cualquier valor inválido se reporta junto con los demás en
+un único ConfigError, antes de lanzar el navegador.
+"""
+import os, re, json, logging, pathlib, dataclasses, datetime as dt, tomllib
+from typing import Optional
+
+log = logging.getLogger("osep")
+
+RAIZ = pathlib.Path(__file__).resolve().parent.parent
+
+
+class ConfigError(ValueError):
+    pass
+
+
+# ================== PARSERS ==================
+def _bool(v) -> bool:
+    if isinstance(v, bool):
+        return v
+    s = str(v).strip().lower()
+    if s in ("true", "1", "si", "sí", "yes", "on"):
+        return True
+    if s in ("false", "0", "no", "off"):
+        return False
+    raise ValueError(f"booleano inválido: {v!r}")
+
+def _int_pos(v) -> int:
+    n = int(v)
+    if n <= 0:
+        raise ValueError(f"debe ser > 0: {v!r}")
+    return n
+
+def _int_nn(v) -> int:
+    n = int(v)
+    if n < 0:
+        raise ValueError(f"debe ser >= 0: {v!r}")
+    return n
+
+def _float_nn(v) -> float:
+    n = float(v)
+    if n < 0:
+        raise ValueError(f"debe ser >= 0: {v!r}")
+    return n
+
+def _float_pos(v) -> float:
+    n = float(v)
+    if n <= 0:
+        raise ValueError(f"debe ser > 0: {v!r}")
+    return n
+
+def _texto(v) -> str:
+    return str(v).strip()
+
+def _filtro(v) -> str:
+    """Texto de filtro: vacío o 'false' => sin filtro."""
+    s = str(v).strip()
+    return "" if s.lower() == "false" else s
+
+def _url(v) -> str:
+    s = str(v).strip()
+    if not re.match(r"^https?://", s):
+        raise ValueError(f"URL inválida: {v!r}")
+    return s
+
+def _regex(v) -> str:
+    re.compile(v)
+    return str(v)
+
+def _ruta(v) -> pathlib.Path:
+    return pathlib.Path(str(v)).expanduser()
+
+def _lista(v) -> tuple:
+    if isinstance(v, (list, tuple)):
+        items = v
+    else:
+        items = str(v).split(",")
+    return tuple(str(x).strip() for x in items if str(x).strip())
+
+def _lista_upper(v) -> tuple:
+    return tuple(x.upper() for x in _lista(v))
+
+def parsear_hora(v) -> Optional[str]:
+    """'6:00' -> '06:00'. Vacío/'false' -> None."""
+    s = str(v).strip()
+    if not s or s.lower() == "false":
+        return None
+    m = re.fullmatch(r"(\d{1,2})[:.](\d{2})", s)
+    if not m or int(m.group(1)) > 23 or int(m.group(2)) > 59:
+        raise ValueError(f"hora inválida (HH:MM): {v!r}")
+    return f"{int(m.group(1)):02d}:{m.group(2)}"
+
+def parsear_fecha(v) -> Optional[dt.date]:
+    """Acepta dd-mm-aaaa, dd/mm/aaaa o aaaa-mm-dd. Vacío/'false' -> None."""
+    if isinstance(v, dt.date):
+        return v
+    s = str(v).strip()
+    if not s or s.lower() == "false":
+        return None
+    for fmt in ("%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return dt.datetime.strptime(s, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"fecha inválida (dd-mm-aaaa): {v!r}")
+
+def _har_modo(v) -> str:
+    s = str(v).strip().lower()
+    if s in ("", "false", "no"):
+        return ""
+    if s not in ("grabar", "reproducir"):
+        raise ValueError(f"debe ser grabar o reproducir: {v!r}")
+    return s
+
+def _prioridad(v) -> str:
+    s = (str(v).strip() or "EARLIEST").upper()
+    if s not in ("EARLIEST", "LATEST"):
+        raise ValueError(f"debe ser EARLIEST o LATEST: {v!r}")
+    return s
+
+
+# ================== MODELO ==================
+@dataclasses.dataclass(frozen=True)
+class Cuenta:
+    usuario: str
+    password: str = dataclasses.field(repr=False)
+    nombre: str = ""
+
+    @property
+    def id(self) -> str:
+        return self.nombre or self.usuario
+
+
+@dataclasses.dataclass(frozen=True)
+class Objetivo:
+    servicio: str
+    zona: str                     # "*" => todas las zonas (barrido)
+    depto: str                    # "*" => todos los departamentos de la zona (barrido)
+    medico: str = ""              # '' => no filtra por profesional en el buscador
+    profesional: str = ""
+    domicilio: str = ""
+    horario_turno: str = ""
+    dias_validos: tuple = ()
+    fecha_disp: str = ""
+    fecha_txt: Optional[dt.date] = None
+    hora_txt: Optional[str] = None
+    sede_txt: str = ""
+    hora_min: str = "00:00"
+    hora_max: str = "23:59"
+    hora_prioridad: str = "EARLIEST"
+    fecha_flexible: bool = True
+    dia_flexible: bool = True
+    hora_flexible: bool = True
+    cuentas: tuple = ()           # ids de cuenta que lo buscan; vacío => todas
+    nombre: str = ""
+
+    @property
+    def id(self) -> str:
+        return self.nombre or f"{self.servicio}/{self.zona}/{self.depto}"
+
+
+@dataclasses.dataclass(frozen=True)
+class Config:
+    cuentas: tuple
+    objetivos: tuple
+    portal_url: str = "https://www.osep.mendoza.gov.ar/webapp_pri"
+    headless: bool = True
+    timeout_ms: int = 20000
+    dry_run: bool = False
+    stop_after_login: bool = False
+    presupuesto_s: float = 420.0
+    reserva_booking_s: float = 45.0
+    estado_dir: pathlib.Path = RAIZ / ".estado"
+    reintentos: int = 3
+    reintento_base_s: float = 2.0
+    reintento_tope_s: float = 30.0
+    circuito_umbral: int = 5
+    circuito_enfriamiento_s: float = 1800.0
+    daemon_intervalo_s: float = 0.0
+    salud_timeout_s: float = 5.0          # GET al portal antes de lanzar el navegador (0 = no se chequea)
+    salud_cache_ttl_s: float = 60.0
+    lease_ttl_s: float = 0.0              # 0 => presupuesto_s + 60
+    contexto_max_escaneos: int = 30       # se recicla el contexto de una cuenta (0 = nunca)
+    memoria_max_mb: float = 800.0         # RSS de Chromium a partir del cual se recicla (0 = sin techo)
+    barrido_concurrencia: int = 3         # búsquedas simultáneas con OBJ_ZONA/OBJ_DEPTO = "*"
+    busqueda_cache_ttl_s: float = 60.0    # resultados de una búsqueda reutilizables entre pares (0 = no)
+    busqueda_cache_max: int = 256
+    busqueda_cache_disco: bool = False    # persistir en estado_dir/busquedas.json (compartida entre procesos)
+    limite_rps: float = 2.0               # acciones/s contra el portal, entre todas las cuentas (0 = sin límite)
+    limite_rafaga: int = 5
+    limite_cuenta_rps: float = 1.0        # acciones/s por cuenta (0 = sin límite)
+    limite_cuenta_rafaga: int = 3
+    workers: int = 0                      # >1 => coordinador + N procesos (ver turnos/workers.py)
+    har_modo: str = ""                    # "" | "grabar" | "reproducir"
+    har_archivo: Optional[pathlib.Path] = None   # None => estado_dir / "sesion.har"
+    har_repeticiones: int = 1             # >1 en modo reproducir: benchmark de latencia del flujo
+    login_ok_sel: str = ("a[href*='logout' i], a[href*='salir' i], a:has-text('Cerrar sesión'), "
+                         "a:has-text('Salir')")
+    login_error_sel: str = ".alert-danger, .alert-error, .error, .errorMessage, #mensajeError, .toast-error"
+    login_captcha_sel: str = ("iframe[src*='recaptcha'], iframe[src*='hcaptcha'], .g-recaptcha, "
+                              "img[src*='captcha' i], input[name*='captcha' i]")
+    login_cookie: str = ""                # regex del nombre de la cookie de sesión ("" = no se usa)
+    xhr_captura: bool = True
+    atajos: bool = True                   # pedir directo la búsqueda/agenda aprendidas (ver turnos/atajos.py)
+    xhr_busqueda_patron: str = r"/turnos/"
+    xhr_agenda_patron: str = r"agenda"
+    agenda_semanas: int = 3               # semanas de agenda a mirar (1 = solo la que abre)
+    agenda_candidatas: int = 3            # candidatas cuya agenda se mira si la anterior no tiene turno en franja
+    agenda_paginas: int = 2               # páginas que cargan agendas a la vez (1 = una candidata por vez)
+    agenda_siguiente_sel: str = ("a:has-text('Siguiente'), a:has-text('>>'), input[value*='iguiente'], "
+                                 "img[title*='iguiente'], .semana_siguiente")
+    agenda_anterior_sel: str = ("a:has-text('Anterior'), a:has-text('<<'), input[value*='nterior'], "
+                                "img[title*='nterior'], .semana_anterior")
+    agenda_cache_ttl_s: float = 300.0     # solo en modo daemon
+    historial: bool = True                # registrar búsquedas y agendas en estado_dir/historial (turnos/analitica.py)
+    evidencias: bool = False              # capturas + DOM en resultados/agenda/confirmación y ante errores
+    evidencias_dir: Optional[pathlib.Path] = None   # None => estado_dir / "evidencias"
+    evidencias_max_mb: float = 50.0       # por corrida
+    evidencias_retencion_dias: float = 7.0
+    evidencias_total_mb: float = 300.0
+    notif_webhook_url: str = ""
+    notif_smtp_host: str = ""
+    notif_smtp_port: int = 587
+    notif_smtp_user: str = ""
+    notif_smtp_pass: str = dataclasses.field(default="", repr=False)
+    notif_smtp_from: str = ""
+    notif_smtp_to: tuple = ()
+    notif_archivo: str = ""
+    notif_comando: str = ""
+    notif_dedup_ttl_s: float = 86400.0
+    archivo: Optional[pathlib.Path] = None
+
+    def pares(self):
+        """(cuenta, objetivo) a procesar, en el orden del archivo."""
+        out = []
+        for obj in self.objetivos:
+            for cuenta in self.cuentas:
+                if not obj.cuentas or cuenta.id in obj.cuentas:
+                    out.append((cuenta, obj))
+        return out
+
+
+# campo -> (variable de entorno, parser)
+GLOBALES = {
+    "portal_url":              ("PORTAL_URL", _url),
+    "headless":                ("HEADLESS", _bool),
+    "timeout_ms":              ("TIMEOUT_MS", _int_pos),
+    "dry_run":                 ("DRY_RUN", _bool),
+    "stop_after_login":        ("STOP_AFTER_LOGIN", _bool),
+    "presupuesto_s":           ("PRESUPUESTO_S", _float_pos),
+    "reserva_booking_s":       ("RESERVA_BOOKING_S", _float_nn),
+    "estado_dir":              ("ESTADO_DIR", _ruta),
+    "reintentos":              ("REINTENTOS", _int_pos),
+    "reintento_base_s":        ("REINTENTO_BASE_S", _float_nn),
+    "reintento_tope_s":        ("REINTENTO_TOPE_S", _float_nn),
+    "circuito_umbral":         ("CIRCUITO_UMBRAL", _int_pos),
+    "circuito_enfriamiento_s": ("CIRCUITO_ENFRIAMIENTO_S", _float_nn),
+    "daemon_intervalo_s":      ("DAEMON_INTERVALO_S", _float_nn),
+    "salud_timeout_s":         ("SALUD_TIMEOUT_S", _float_nn),
+    "salud_cache_ttl_s":       ("SALUD_CACHE_TTL_S", _float_nn),
+    "lease_ttl_s":             ("LEASE_TTL_S", _float_nn),
+    "contexto_max_escaneos":   ("CONTEXTO_MAX_ESCANEOS", _int_nn),
+    "memoria_max_mb":          ("MEMORIA_MAX_MB", _float_nn),
+    "barrido_concurrencia":    ("BARRIDO_CONCURRENCIA", _int_pos),
+    "busqueda_cache_ttl_s":    ("BUSQUEDA_CACHE_TTL_S", _float_nn),
+    "busqueda_cache_max":      ("BUSQUEDA_CACHE_MAX", _int_pos),
+    "busqueda_cache_disco":    ("BUSQUEDA_CACHE_DISCO", _bool),
+    "limite_rps":              ("LIMITE_RPS", _float_nn),
+    "limite_rafaga":           ("LIMITE_RAFAGA", _int_pos),
+    "limite_cuenta_rps":       ("LIMITE_CUENTA_RPS", _float_nn),
+    "limite_cuenta_rafaga":    ("LIMITE_CUENTA_RAFAGA", _int_pos),
+    "workers":                 ("WORKERS", _int_nn),
+    "har_modo":                ("HAR_MODO", _har_modo),
+    "har_archivo":             ("HAR_ARCHIVO", _ruta),
+    "har_repeticiones":        ("HAR_REPETICIONES", _int_pos),
+    "login_ok_sel":            ("LOGIN_OK_SEL", _texto),
+    "login_error_sel":         ("LOGIN_ERROR_SEL", _texto),
+    "login_captcha_sel":       ("LOGIN_CAPTCHA_SEL", _texto),
+    "login_cookie":            ("LOGIN_COOKIE", _regex),
+    "xhr_captura":             ("XHR_CAPTURA", _bool),
+    "atajos":                  ("ATAJOS", _bool),
+    "xhr_busqueda_patron":     ("XHR_BUSQUEDA_PATRON", _regex),
+    "xhr_agenda_patron":       ("XHR_AGENDA_PATRON", _regex),
+    "agenda_semanas":          ("AGENDA_SEMANAS", _int_pos),
+    "agenda_candidatas":       ("AGENDA_CANDIDATAS", _int_pos),
+    "agenda_paginas":          ("AGENDA_PAGINAS", _int_pos),
+    "agenda_siguiente_sel":    ("AGENDA_SIGUIENTE_SEL", _texto),
+    "agenda_anterior_sel":     ("AGENDA_ANTERIOR_SEL", _texto),
+    "agenda_cache_ttl_s":      ("AGENDA_CACHE_TTL_S", _float_nn),
+    "historial":               ("HISTORIAL", _bool),
+    "evidencias":              ("EVIDENCIAS", _bool),
+    "evidencias_dir":          ("EVIDENCIAS_DIR", _ruta),
+    "evidencias_max_mb":       ("EVIDENCIAS_MAX_MB", _float_pos),
+    "evidencias_retencion_dias": ("EVIDENCIAS_RETENCION_DIAS", _float_nn),
+    "evidencias_total_mb":     ("EVIDENCIAS_TOTAL_MB", _float_pos),
+    "notif_webhook_url":       ("NOTIF_WEBHOOK_URL", _texto),
+    "notif_smtp_host":         ("NOTIF_SMTP_HOST", _texto),
+    "notif_smtp_port":         ("NOTIF_SMTP_PORT", _int_pos),
+    "notif_smtp_user":         ("NOTIF_SMTP_USER", _texto),
+    "notif_smtp_pass":         ("NOTIF_SMTP_PASS", str),
+    "notif_smtp_from":         ("NOTIF_SMTP_FROM", _texto),
+    "notif_smtp_to":           ("NOTIF_SMTP_TO", _lista),
+    "notif_archivo":           ("NOTIF_ARCHIVO", _texto),
+    "notif_comando":           ("NOTIF_COMANDO", _texto),
+    "notif_dedup_ttl_s":       ("NOTIF_DEDUP_TTL_S", _float_nn),
+}
+
+CAMPOS_OBJETIVO = {
+    "servicio":       ("OBJ_SERVICIO", _texto),
+    "zona":           ("OBJ_ZONA", _texto),
+    "depto":          ("OBJ_DEPTO", _texto),
+    "medico":         ("OBJ_MEDICO", _filtro),
+    "profesional":    ("OBJ_PROFESIONAL", _filtro),
+    "domicilio":      ("OBJ_DOMICILIO", _filtro),
+    "horario_turno":  ("OBJ_HORARIO_TURNO", _filtro),
+    "dias_validos":   ("OBJ_DIAS_VALIDOS", _lista_upper),
+    "fecha_disp":     ("OBJ_FECHA_DISP", _filtro),
+    "fecha_txt":      ("OBJ_FECHA_TXT", parsear_fecha),
+    "hora_txt":       ("OBJ_HORA_TXT", parsear_hora),
+    "sede_txt":       ("OBJ_SEDE_TXT", _filtro),
+    "hora_min":       ("OBJ_HORA_MIN", parsear_hora),
+    "hora_max":       ("OBJ_HORA_MAX", parsear_hora),
+    "hora_prioridad": ("OBJ_HORA_PRIORIDAD", _prioridad),
+    "fecha_flexible": ("OBJ_FECHA_FLEXIBLE", _bool),
+    "dia_flexible":   ("OBJ_DIA_FLEXIBLE", _bool),
+    "hora_flexible":  ("OBJ_HORA_FLEXIBLE", _bool),
+    "cuentas":        (None, _lista),
+    "nombre":         (None, _texto),
+}
+
+
+# ================== CARGA ==================
+def leer_archivo(ruta: pathlib.Path) -> dict:
+    ruta = pathlib.Path(ruta)
+    try:
+        if ruta.suffix.lower() == ".toml":
+            with ruta.open("rb") as f:
+                return tomllib.load(f)
+        return json.loads(ruta.read_text(encoding="utf-8"))
+    except OSError as e:
+        raise ConfigError(f"No se pudo leer CONFIG_FILE {ruta}: {e}")
+    except (ValueError, tomllib.TOMLDecodeError) as e:
+        raise ConfigError(f"CONFIG_FILE {ruta} mal formado: {e}")
+
+
+def _parsear_campos(spec, crudo: dict, donde: str, errores: list) -> dict:
+    out = {}
+    for campo, valor in crudo.items():
+        if campo not in spec:
+            errores.append(f"{donde}: clave desconocida {campo!r}")
+            continue
+        parser = spec[campo][1]
+        try:
+            parsed = parser(valor)
+        except (ValueError, TypeError, re.error) as e:
+            errores.append(f"{donde}.{campo}: {e}")
+            continue
+        if parsed is not None:
+            out[campo] = parsed
+    return out
+
+
+def _desde_env(spec, entorno) -> dict:
+    return {campo: entorno[var] for campo, (var, _) in spec.items()
+            if var and entorno.get(var) not in (None, "")}
+
+
+def _objetivo(crudo: dict, donde: str, errores: list) -> Optional[Objetivo]:
+    campos = _parsear_campos(CAMPOS_OBJETIVO, crudo, donde, errores)
+    for req in ("servicio", "zona", "depto"):
+        if not campos.get(req):
+            errores.append(f"{donde}: falta {req} (OBJ_{req.upper()})")
+    if errores and not all(campos.get(r) for r in ("servicio", "zona", "depto")):
+        return None
+    try:
+        obj = Objetivo(**campos)
+    except TypeError as e:
+        errores.append(f"{donde}: {e}")
+        return None
+    if obj.hora_min > obj.hora_max:
+        errores.append(f"{donde}: hora_min ({obj.hora_min}) es posterior a hora_max ({obj.hora_max})")
+    if obj.hora_txt and obj.fecha_txt is None and not obj.dia_flexible:
+        errores.append(f"{donde}: hora_txt sin fecha_txt y con dia_flexible=false no puede matchear")
+    return obj
+
+
+def _cuenta(crudo: dict, entorno, donde: str, errores: list) -> Optional[Cuenta]:
+    desconocidas = set(crudo) - {"usuario", "password", "password_env", "nombre"}
+    for k in sorted(desconocidas):
+        errores.append(f"{donde}: clave desconocida {k!r}")
+    usuario = str(crudo.get("usuario") or "").strip()
+    password = crudo.get("password")
+    if password is None and crudo.get("password_env"):
+        password = entorno.get(crudo["password_env"])
+        if not password:
+            errores.append(f"{donde}: la variable {crudo['password_env']} no está definida")
+    if not usuario:
+        errores.append(f"{donde}: falta usuario")
+    if not password and not crudo.get("password_env"):
+        errores.append(f"{donde}: falta password (o password_env)")
+    if not usuario or not password:
+        return None
+    return Cuenta(usuario=usuario, password=str(password), nombre=str(crudo.get("nombre") or "").strip())
+
+
+def cargar_config(archivo=None, entorno=None) -> Config:
+    entorno = os.environ if entorno is None else entorno
+    archivo = archivo or entorno.get("CONFIG_FILE") or None
+    errores = []
+
+    datos = leer_archivo(archivo) if archivo else {}
+    cuentas_crudas = datos.pop("cuentas", None)
+    objetivos_crudos = datos.pop("objetivos", None)
+
+    glob = _parsear_campos(GLOBALES, _desde_env(GLOBALES, entorno), "env", errores)
+    glob.update(_parsear_campos(GLOBALES, datos, "archivo", errores))
+
+    if cuentas_crudas is None:
+        cuentas_crudas = [{"usuario": entorno.get("OSEP_USER"), "password": entorno.get("OSEP_PASS")}]
+        donde_c = "env (OSEP_USER/OSEP_PASS)"
+    else:
+        donde_c = "cuentas"
+    cuentas = []
+    for i, c in enumerate(cuentas_crudas):
+        cta = _cuenta(c or {}, entorno, f"{donde_c}[{i}]" if donde_c == "cuentas" else donde_c, errores)
+        if cta:
+            cuentas.append(cta)
+    ids = [c.id for c in cuentas]
+    if len(set(ids)) != len(ids):
+        errores.append("cuentas: hay ids repetidos (usá 'nombre' para distinguirlas)")
+
+    objetivos = []
+    if objetivos_crudos is None:
+        obj = _objetivo(_desde_env(CAMPOS_OBJETIVO, entorno), "env (OBJ_*)", errores)
+        if obj:
+            objetivos.append(obj)
+    else:
+        if not objetivos_crudos:
+            errores.append("objetivos: la lista está vacía")
+        for i, o in enumerate(objetivos_crudos):
+            obj = _objetivo(o or {}, f"objetivos[{i}]", errores)
+            if obj:
+                objetivos.append(obj)
+    for obj in objetivos:
+        for cid in obj.cuentas:
+            if cid not in ids:
+                errores.append(f"objetivo {obj.id!r}: cuenta desconocida {cid!r}")
+
+    if errores:
+        raise ConfigError("Configuración inválida:\n  - " + "\n  - ".join(errores))
+
+    return Config(cuentas=tuple(cuentas), objetivos=tuple(objetivos),
+                  archivo=pathlib.Path(archivo) if archivo else None, **glob)
+
+
+class ConfigRecargable:
+    """
+    Para procesos largos (daemon): recarga CONFIG_FILE si cambió su mtime.
+    Si la nueva versión no valida, se loguea y se sigue con la anterior.
+    """
+    # Cambios que solo aplican al relanzar el navegador
+    REQUIEREN_REINICIO = ("headless",)
+
+    def __init__(self, archivo=None, entorno=None):
+        self.entorno = entorno
+        self.cfg = cargar_config(archivo, entorno)
+        self.archivo = self.cfg.archivo
+        self._mtime = self._leer_mtime()
+
+    def _leer_mtime(self):
+        try:
+            return self.archivo.stat().st_mtime if self.archivo else None
+        except OSError:
+            return None
+
+    def recargar_si_cambio(self) -> bool:
+        mtime = self._leer_mtime()
+        if self.archivo is None or mtime is None or mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            nueva = cargar_config(self.archivo, self.entorno)
+        except ConfigError as e:
+            log.error(f"CONFIG_FILE modificado pero inválido; se mantiene la configuración anterior.\n{e}")
+            return False
+        for campo in self.REQUIEREN_REINICIO:
+            if getattr(nueva, campo) != getattr(self.cfg, campo):
+                log.warning(f"Config: '{campo}' cambió pero recién aplica al reiniciar el proceso.")
+        self.cfg = nueva
+        log.info(f"Configuración recargada desde {self.archivo} "
+                 f"({len(nueva.cuentas)} cuenta(s), {len(nueva.objetivos)} objetivo(s)).")
+        return True
@@ -0,0 +1,127 @@
+"""
+Evidencias de la corrida (capturas y DOM) escritas en segundo plano.
+
+- El flujo solo pide la captura a Chromium (JPEG, ya comprimido) y el HTML; el gzip y la
+  escritura a disco los hace un hilo aparte, así el paso no espera al disco.
+- La cola es acotada: si se llena, la evidencia se descarta (nunca se frena el flujo).
+- La captura es de lo visible (la página entera de una tabla larga tarda segundos) y con un
+  timeout corto que el llamador recorta con lo que queda del presupuesto.
+- Tope de MB por corrida y retención (días y MB totales) de las carpetas evidencia_*.
+- Ante un paso fallido se guarda también el estado del flujo en JSON, para poder
+  reconstruir una reserva que salió mal.
+"""
+import gzip, json, time, queue, shutil, logging, pathlib, threading, datetime as dt
+from typing import Optional
+
+log = logging.getLogger("osep")
+
+
+class Evidencias:
+    # Tope de la espera de una captura: es evidencia, no vale la pena frenar el flujo por ella
+    TOPE_CAPTURA_MS = 3000
+
+    def __init__(self, raiz: pathlib.Path, max_cola: int = 8, max_corrida_mb: float = 50.0,
+                 retencion_dias: float = 7.0, max_total_mb: float = 300.0, calidad: int = 60, sufijo: str = ""):
+        self.raiz = pathlib.Path(raiz)
+        self.dir = self.raiz / f"evidencia_{dt.datetime.now():%Y%m%d_%H%M%S}{sufijo}"
+        self.max_corrida = max_corrida_mb * 1024 * 1024
+        self.retencion_dias = retencion_dias
+        self.max_total = max_total_mb * 1024 * 1024
+        self.calidad = calidad
+        self._cola = queue.Queue(maxsize=max_cola)
+        self._hilo: Optional[threading.Thread] = None
+        self._n = 0
+        self.escritos = 0
+        self.bytes = 0
+        self.descartadas = 0
+
+    # ---------- hilo escritor ----------
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._bucle, name="osep-evidencias", daemon=True)
+        self._hilo.start()
+        return self
+
+    def _bucle(self):
+        self._purgar()
+        while True:
+            item = self._cola.get()
+            if item is None:
+                return
+            nombre, datos, comprimir = item
+            try:
+                if comprimir:
+                    datos = gzip.compress(datos, compresslevel=6)
+                    nombre += ".gz"
+                if self.bytes + len(datos) > self.max_corrida:
+                    self.descartadas += 1
+                    continue
+                self.dir.mkdir(parents=True, exist_ok=True)
+                (self.dir / nombre).write_bytes(datos)
+                self.escritos += 1
+                self.bytes += len(datos)
+            except OSError as e:
+                self.descartadas += 1
+                log.debug(f"Evidencias: no se pudo escribir {nombre} ({e})")
+
+    def _purgar(self):
+        """Borra corridas viejas: más antiguas que la retención y, después, hasta entrar en el total."""
+        try:
+            carpetas = sorted((p for p in self.raiz.glob("evidencia_*") if p.is_dir() and p != self.dir),
+                              key=lambda p: p.stat().st_mtime)
+        except OSError:
+            return
+        limite = time.time() - self.retencion_dias * 86400
+        tamanos = {p: sum(f.stat().st_size for f in p.rglob("*") if f.is_file()) for p in carpetas}
+        total = sum(tamanos.values())
+        borradas = 0
+        for p in carpetas:
+            if p.stat().st_mtime >= limite and total <= self.max_total:
+                continue
+            shutil.rmtree(p, ignore_errors=True)
+            total -= tamanos[p]
+            borradas += 1
+        if borradas:
+            log.debug(f"Evidencias: {borradas} corrida(s) vieja(s) borrada(s).")
+
+    # ---------- desde el flujo ----------
+    def _encolar(self, nombre: str, datos: bytes, comprimir: bool):
+        try:
+            self._cola.put_nowait((nombre, datos, comprimir))
+        except queue.Full:
+            self.descartadas += 1
+
+    def _prefijo(self, paso: str) -> str:
+        self._n += 1
+        return f"{self._n:03d}_{paso}"
+
+    async def capturar(self, page, paso: str, frame=None, timeout_ms: Optional[int] = None, completa: bool = False):
+        """
+        Captura de pantalla (JPEG) y DOM de page (y del frame, si se pasa). Nunca levanta.
+        Solo lo visible salvo completa=True; timeout_ms se recorta a TOPE_CAPTURA_MS.
+        """
+        prefijo = self._prefijo(paso)
+        timeout = min(timeout_ms or self.TOPE_CAPTURA_MS, self.TOPE_CAPTURA_MS)
+        try:
+            imagen = await page.screenshot(type="jpeg", quality=self.calidad, full_page=completa, timeout=timeout)
+            self._encolar(f"{prefijo}.jpg", imagen, comprimir=False)
+            self._encolar(f"{prefijo}.html", (await page.content()).encode("utf-8"), comprimir=True)
+            if frame is not None:
+                self._encolar(f"{prefijo}_frame.html", (await frame.content()).encode("utf-8"), comprimir=True)
+        except Exception as e:
+            log.debug(f"Evidencias: no se pudo capturar '{paso}' ({e.__class__.__name__}: {e})")
+
+    def guardar_json(self, paso: str, datos: dict):
+        self._encolar(f"{self._prefijo(paso)}.json",
+                      json.dumps(datos, ensure_ascii=False, indent=1, default=str).encode("utf-8"), comprimir=False)
+
+    def cerrar(self, timeout_s: float = 10.0):
+        if self._hilo is None:
+            return
+        try:
+            self._cola.put(None, timeout=timeout_s)
+        except queue.Full:
+            pass
+        self._hilo.join(timeout_s)
+        if self.escritos or self.descartadas:
+            log.info(f"Evidencias: {self.escritos} archivo(s), {self.bytes / 1024 / 1024:.1f} MB en {self.dir}"
+                     + (f" ({self.descartadas} descartada(s))" if self.descartadas else ""))
@@ -0,0 +1,114 @@
+"""
+Grabación y reproducción de sesiones del portal en HAR.
+
+- grabar: el contexto graba un HAR completo (con cuerpos embebidos); al cerrarlo se
+  reemplazan usuario, contraseña y cookies por marcadores fijos.
+- reproducir: el contexto se sirve desde ese HAR con route_from_har (sin red; lo que no
+  está grabado se aborta). El login se hace con los mismos marcadores para que el POST
+  coincida con el grabado, así que login() y flujo_turnos_nuevo() corren igual que en
+  vivo pero offline y deterministas.
+"""
+import json, logging, pathlib
+from typing import Optional
+from urllib.parse import quote_plus, unquote_plus
+
+log = logging.getLogger("osep")
+
+USUARIO_REDACTADO = "usuario-redactado"
+CLAVE_REDACTADA = "clave-redactada"
+COOKIE_REDACTADA = "redactado"
+
+_HEADERS_SENSIBLES = {"cookie", "set-cookie", "authorization", "proxy-authorization"}
+# Campos del formulario de login (los name de los inputs que llena login())
+_CAMPOS_USUARIO = {"usuario", "user", "username"}
+_CAMPOS_CLAVE = {"password", "clave", "pass"}
+
+
+def opciones_grabar(ruta: pathlib.Path) -> dict:
+    """kwargs para browser.new_context() en modo grabar."""
+    pathlib.Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+    return {"record_har_path": str(ruta), "record_har_mode": "full", "record_har_content": "embed"}
+
+
+async def reproducir(context, ruta: pathlib.Path):
+    ruta = pathlib.Path(ruta)
+    if not ruta.exists():
+        raise FileNotFoundError(f"No existe el HAR a reproducir: {ruta}")
+    await context.route_from_har(str(ruta), not_found="abort", update=False)
+
+
+def _marcador(nombre: str, valor: str, usuario: str, password: str) -> Optional[str]:
+    """Marcador para el campo nombre=valor si es una credencial (por nombre o por valor exacto)."""
+    nombre = nombre.strip().lower()
+    if nombre in _CAMPOS_CLAVE or (password and valor == password):
+        return CLAVE_REDACTADA
+    if nombre in _CAMPOS_USUARIO or (usuario and valor == usuario):
+        return USUARIO_REDACTADO
+    return None
+
+
+def _redactar_form(texto: str, usuario: str, password: str) -> str:
+    # Campo por campo sobre el texto crudo: los que no son credenciales quedan byte a byte
+    # (route_from_har compara el cuerpo del POST al reproducir)
+    partes = []
+    for p in texto.split("&"):
+        nombre, igual, valor = p.partition("=")
+        marcador = _marcador(unquote_plus(nombre), unquote_plus(valor), usuario, password) if igual else None
+        partes.append(f"{nombre}={quote_plus(marcador)}" if marcador else p)
+    return "&".join(partes)
+
+
+def _redactar_post(post: dict, usuario: str, password: str):
+    for p in post.get("params", []):
+        marcador = _marcador(p.get("name", ""), p.get("value", ""), usuario, password)
+        if marcador:
+            p["value"] = marcador
+    texto = post.get("text")
+    if not texto:
+        return
+    if "json" in post.get("mimeType", "").lower():
+        try:
+            cuerpo = json.loads(texto)
+        except ValueError:
+            return
+        if isinstance(cuerpo, dict):
+            for k, v in cuerpo.items():
+                marcador = _marcador(k, v if isinstance(v, str) else "", usuario, password)
+                if marcador:
+                    cuerpo[k] = marcador
+            post["text"] = json.dumps(cuerpo, ensure_ascii=False, separators=(",", ":"))
+    elif "=" in texto:
+        post["text"] = _redactar_form(texto, usuario, password)
+
+
+def _redactar_cookie(valor: str) -> str:
+    # "a=1; b=2" -> "a=redactado; b=redactado" (y los atributos de Set-Cookie quedan como están)
+    partes = []
+    for i, p in enumerate(valor.split(";")):
+        nombre, igual, _ = p.partition("=")
+        es_atributo = i > 0 and nombre.strip().lower() in ("path", "domain", "expires", "max-age",
+                                                          "samesite", "secure", "httponly")
+        partes.append(p if not igual or es_atributo else f"{nombre}={COOKIE_REDACTADA}")
+    return ";".join(partes)
+
+
+def redactar_har(ruta: pathlib.Path, usuario: str, password: str):
+    """
+    Reemplaza en el HAR (in situ) las credenciales de la cuenta en los cuerpos de los POST
+    (campos del login o con el valor exacto de usuario/contraseña; no se reemplaza texto
+    suelto, que podría estar dentro de otra URL o un número cualquiera) y los valores de
+    cookies y headers de autorización.
+    """
+    ruta = pathlib.Path(ruta)
+    har = json.loads(ruta.read_text(encoding="utf-8"))
+    for entrada in har.get("log", {}).get("entries", []):
+        if entrada.get("request", {}).get("postData"):
+            _redactar_post(entrada["request"]["postData"], usuario or "", password or "")
+        for lado in (entrada.get("request", {}), entrada.get("response", {})):
+            for h in lado.get("headers", []):
+                if h.get("name", "").lower() in _HEADERS_SENSIBLES:
+                    h["value"] = _redactar_cookie(h["value"]) if "cookie" in h["name"].lower() else COOKIE_REDACTADA
+            for c in lado.get("cookies", []):
+                c["value"] = COOKIE_REDACTADA
+    ruta.write_text(json.dumps(har, ensure_ascii=False), encoding="utf-8")
+    log.info(f"HAR grabado y redactado: {ruta} ({len(har.get('log', {}).get('entries', []))} requests).")
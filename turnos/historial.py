@@ -0,0 +1,42 @@
+"""
+Historial de escaneos: cada búsqueda y cada agenda leída se agrega como una línea JSON en
+estado_dir/historial/AAAA-MM.jsonl (un archivo por mes). Lo analiza turnos/analitica.py.
+
+  {"t": …, "tipo": "filas",  "servicio", "zona", "depto", "filas": [{profesional, domicilio, disp}, …]}
+  {"t": …, "tipo": "agenda", "servicio", "zona", "depto", "profesional", "domicilio",
+   "cubre_hasta": "AAAA-MM-DD", "slots": [{fecha, hora}, …]}
+"""
+import json, time, logging, pathlib
+
+log = logging.getLogger("osep")
+
+
+class Historial:
+    def __init__(self, directorio: pathlib.Path):
+        self.directorio = pathlib.Path(directorio)
+
+    def registrar(self, tipo: str, **datos):
+        t = time.time()
+        linea = json.dumps({"t": round(t, 1), "tipo": tipo, **datos}, ensure_ascii=False) + "\n"
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            # Una sola escritura en modo append: varias corridas/workers pueden escribir a la vez
+            with open(self.directorio / time.strftime("%Y-%m.jsonl", time.localtime(t)), "a", encoding="utf-8") as f:
+                f.write(linea)
+        except OSError as e:
+            log.debug(f"Historial: no se pudo registrar ({e})")
+
+    def leer(self, desde_ts: float = 0.0):
+        """Registros (dicts) desde desde_ts, en orden de archivo."""
+        mes_desde = time.strftime("%Y-%m", time.localtime(desde_ts)) if desde_ts else ""
+        for archivo in sorted(self.directorio.glob("*.jsonl")):
+            if archivo.stem < mes_desde:
+                continue
+            with archivo.open(encoding="utf-8") as f:
+                for linea in f:
+                    try:
+                        r = json.loads(linea)
+                    except ValueError:
+                        continue   # línea cortada (corrida interrumpida a mitad de escritura)
+                    if r.get("t", 0) >= desde_ts:
+                        yield r
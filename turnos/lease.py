@@ -0,0 +1,138 @@
+"""
+Lease de corrida (para que no haya dos bots a la vez) y sección crítica de la reserva.
+
+- El lease vive en un SQLite dentro de ESTADO_DIR: quien lo tiene lo renueva cada tanto y,
+  si el proceso muere sin liberarlo, vence solo (o se toma enseguida si el pid ya no existe
+  en esta máquina). Una corrida nueva que lo encuentra tomado sale sin lanzar el navegador.
+- blindar() corre el click del horario + confirmación de modo que una cancelación
+  (SIGTERM/SIGINT, cancel-in-progress del workflow) espere a que termine la reserva.
+"""
+import os, time, signal, socket, sqlite3, asyncio, logging, pathlib, uuid
+from contextlib import closing
+from typing import Optional
+
+log = logging.getLogger("osep")
+
+
+class Lease:
+    def __init__(self, ruta: pathlib.Path, nombre: str = "corrida", ttl_s: float = 600, reloj=time.time):
+        self.ruta = pathlib.Path(ruta)
+        self.nombre = nombre
+        self.ttl_s = float(ttl_s)
+        self._reloj = reloj
+        self.host = socket.gethostname()
+        self.pid = os.getpid()
+        self.dueno = f"{self.host}:{self.pid}:{uuid.uuid4().hex[:8]}"
+        self.tomado = False
+        self.actual: Optional[dict] = None   # quién lo tiene si no se pudo adquirir
+
+    def _conectar(self):
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+        con.execute("CREATE TABLE IF NOT EXISTS lease (nombre TEXT PRIMARY KEY, dueno TEXT NOT NULL, "
+                    "host TEXT, pid INTEGER, desde REAL, expira REAL NOT NULL)")
+        return con
+
+    def _huerfano(self, host: str, pid: int) -> bool:
+        """El dueño era de esta máquina y su proceso ya no existe."""
+        if host != self.host or not pid or os.name != "posix":
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            return False
+        return False
+
+    def adquirir(self) -> bool:
+        ahora = self._reloj()
+        with closing(self._conectar()) as con:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                fila = con.execute("SELECT dueno, host, pid, desde, expira FROM lease WHERE nombre = ?",
+                                   (self.nombre,)).fetchone()
+                if fila and fila[0] != self.dueno and fila[4] > ahora and not self._huerfano(fila[1], fila[2]):
+                    self.actual = {"dueno": fila[0], "desde": fila[3], "vence_en_s": fila[4] - ahora}
+                    con.execute("ROLLBACK")
+                    return False
+                if fila and fila[0] != self.dueno:
+                    log.info(f"Lease: se toma el de {fila[0]} (vencido o huérfano).")
+                con.execute("INSERT OR REPLACE INTO lease (nombre, dueno, host, pid, desde, expira) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            (self.nombre, self.dueno, self.host, self.pid, ahora, ahora + self.ttl_s))
+                con.execute("COMMIT")
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+        self.tomado = True
+        return True
+
+    def renovar(self) -> bool:
+        """Extiende el vencimiento; False si otro proceso lo tomó mientras tanto."""
+        with closing(self._conectar()) as con:
+            cur = con.execute("UPDATE lease SET expira = ? WHERE nombre = ? AND dueno = ?",
+                              (self._reloj() + self.ttl_s, self.nombre, self.dueno))
+            ok = cur.rowcount == 1
+        if not ok and self.tomado:
+            log.warning("Lease: se perdió (otro proceso lo tomó al vencer).")
+        self.tomado = ok
+        return ok
+
+    def liberar(self):
+        if not self.tomado:
+            return
+        try:
+            with closing(self._conectar()) as con:
+                con.execute("DELETE FROM lease WHERE nombre = ? AND dueno = ?", (self.nombre, self.dueno))
+        except sqlite3.Error as e:
+            log.debug(f"Lease: no se pudo liberar ({e}); vence solo en {self.ttl_s:.0f}s.")
+        self.tomado = False
+
+    async def latir(self, cada_s: Optional[float] = None):
+        """Tarea de fondo: renueva el lease cada ttl/3 mientras dure la corrida."""
+        cada_s = cada_s or max(1.0, self.ttl_s / 3)
+        while True:
+            await asyncio.sleep(cada_s)
+            try:
+                await asyncio.to_thread(self.renovar)
+            except sqlite3.Error as e:
+                log.warning(f"Lease: no se pudo renovar ({e}).")
+
+
+# ================== SECCIÓN CRÍTICA ==================
+async def blindar(coro, que: str = "reserva"):
+    """
+    Espera coro aunque cancelen a quien llama: la cancelación se difiere hasta que coro
+    termina y recién ahí se propaga. Para el tramo click en horario -> confirmación.
+    """
+    tarea = asyncio.ensure_future(coro)
+    cancelado = False
+    while not tarea.done():
+        try:
+            await asyncio.shield(tarea)
+        except asyncio.CancelledError:
+            if not cancelado and not tarea.done():
+                log.warning(f"Cancelación pedida durante la {que}: se espera a que termine.")
+            cancelado = True
+    if cancelado:
+        if not tarea.cancelled() and tarea.exception():
+            log.warning(f"La {que} terminó con error antes de cancelar: {tarea.exception()!r}")
+        raise asyncio.CancelledError()
+    return tarea.result()
+
+
+def instalar_senales(tarea: asyncio.Task, senales=(signal.SIGTERM, signal.SIGINT)):
+    """SIGTERM/SIGINT cancelan la tarea principal (y blindar() protege la reserva en curso)."""
+    loop = asyncio.get_running_loop()
+
+    def al_recibir(sig):
+        log.warning(f"Recibida {signal.Signals(sig).name}: cancelando la corrida…")
+        tarea.cancel()
+
+    for sig in senales:
+        try:
+            loop.add_signal_handler(sig, al_recibir, sig)
+        except (NotImplementedError, RuntimeError, ValueError):
+            # Windows / loop fuera del hilo principal (Spyder): queda el comportamiento por defecto
+            pass
@@ -0,0 +1,107 @@
+"""
+Limitador de ritmo (token bucket) para todo lo que le pega al portal: navegaciones,
+búsquedas, agendas y los clicks de la reserva.
+
+- Una cubeta global y una por cuenta: cada acción toma una ficha de las dos.
+- Las acciones de reserva ("reserva") tienen prioridad: mientras haya una esperando, los
+  escaneos no toman fichas.
+- Se mide cuánto se esperó por tipo de acción (metricas.resumen_latencias).
+- La cuenta se toma de cuenta_actual (ContextVar que fija el flujo), así las funciones que
+  solo reciben la página no tienen que pasarla; las tareas hijas (barrido) la heredan.
+"""
+import time, asyncio, contextvars, logging
+from turnos.metricas import resumen_latencias
+
+log = logging.getLogger("osep")
+
+PRIORITARIAS = ("reserva",)
+
+cuenta_actual = contextvars.ContextVar("cuenta_actual", default="")
+
+
+class Cubeta:
+    def __init__(self, tasa_s: float, capacidad: float, reloj=time.monotonic):
+        self.tasa_s = tasa_s
+        self.capacidad = max(1.0, capacidad)
+        self._reloj = reloj
+        self.fichas = self.capacidad
+        self._ultimo = reloj()
+
+    def _reponer(self):
+        ahora = self._reloj()
+        self.fichas = min(self.capacidad, self.fichas + (ahora - self._ultimo) * self.tasa_s)
+        self._ultimo = ahora
+
+    def espera_s(self) -> float:
+        """Segundos hasta que haya una ficha (0 si ya la hay)."""
+        if self.tasa_s <= 0:
+            return 0.0
+        self._reponer()
+        return 0.0 if self.fichas >= 1 else (1 - self.fichas) / self.tasa_s
+
+    def tomar(self):
+        if self.tasa_s > 0:
+            self.fichas -= 1
+
+
+class Limitador:
+    def __init__(self, tasa_s: float = 0.0, rafaga: int = 5, tasa_cuenta_s: float = 0.0,
+                 rafaga_cuenta: int = 3, reloj=time.monotonic):
+        """tasa_s / tasa_cuenta_s en acciones por segundo; 0 = sin límite."""
+        self._reloj = reloj
+        self.ajustar(tasa_s, rafaga, tasa_cuenta_s, rafaga_cuenta)
+        self._prioritarias = 0
+        self._libre = asyncio.Event()
+        self._libre.set()
+        self.esperas = {}          # acción -> [segundos esperados]
+
+    def ajustar(self, tasa_s: float, rafaga: int, tasa_cuenta_s: float, rafaga_cuenta: int):
+        """Cambia los límites (recarga de config); las cubetas de cuenta se rehacen al usarlas."""
+        self.tasa_s, self.rafaga = tasa_s, rafaga
+        self.tasa_cuenta_s, self.rafaga_cuenta = tasa_cuenta_s, rafaga_cuenta
+        self.global_ = Cubeta(tasa_s, rafaga, self._reloj)
+        self.cuentas = {}
+
+    def _cubeta_cuenta(self, cuenta: str) -> Cubeta:
+        if cuenta not in self.cuentas:
+            self.cuentas[cuenta] = Cubeta(self.tasa_cuenta_s, self.rafaga_cuenta, self._reloj)
+        return self.cuentas[cuenta]
+
+    async def adquirir(self, accion: str, cuenta: str = None):
+        """Espera una ficha global y una de la cuenta (por defecto, cuenta_actual)."""
+        if self.tasa_s <= 0 and self.tasa_cuenta_s <= 0:
+            return
+        cubeta = self._cubeta_cuenta(cuenta if cuenta is not None else cuenta_actual.get())
+        prioritaria = accion in PRIORITARIAS
+        t0 = self._reloj()
+        if prioritaria:
+            self._prioritarias += 1
+            self._libre.clear()
+        try:
+            while True:
+                if not prioritaria and self._prioritarias:
+                    await self._libre.wait()
+                    continue
+                espera = max(self.global_.espera_s(), cubeta.espera_s())
+                if espera <= 0:
+                    self.global_.tomar()
+                    cubeta.tomar()
+                    break
+                await asyncio.sleep(espera)
+        finally:
+            if prioritaria:
+                self._prioritarias -= 1
+                if not self._prioritarias:
+                    self._libre.set()
+        esperado = self._reloj() - t0
+        self.esperas.setdefault(accion, []).append(esperado)
+        if esperado >= 1:
+            log.debug(f"Limitador: '{accion}' esperó {esperado:.1f}s.")
+
+    def espera_total_s(self) -> float:
+        return sum(sum(v) for v in self.esperas.values())
+
+    def resumen(self) -> str:
+        if not self.esperas:
+            return "sin límite" if self.tasa_s <= 0 and self.tasa_cuenta_s <= 0 else "sin acciones"
+        return " | ".join(f"{accion}: espera {resumen_latencias(v)}" for accion, v in sorted(self.esperas.items()))
@@ -0,0 +1,21 @@
+"""
+Resúmenes de latencias (percentiles) para benchmarks y métricas de la corrida.
+"""
+import math
+
+
+def percentil(valores, p: float) -> float:
+    """Percentil p (0-100) con interpolación lineal; 0.0 si no hay valores."""
+    xs = sorted(valores)
+    if not xs:
+        return 0.0
+    k = (len(xs) - 1) * p / 100
+    i, j = math.floor(k), math.ceil(k)
+    return xs[i] + (xs[j] - xs[i]) * (k - i)
+
+
+def resumen_latencias(valores, unidad: str = "s") -> str:
+    if not valores:
+        return "sin datos"
+    return (f"n={len(valores)} p50 {percentil(valores, 50):.2f}{unidad} · "
+            f"p95 {percentil(valores, 95):.2f}{unidad} · max {max(valores):.2f}{unidad}")
@@ -0,0 +1,218 @@
+"""
+Lanzamiento liviano de Chromium, medición de memoria y pool de contextos que se reciclan.
+
+- En headless Playwright usa chromium-headless-shell (sin el navegador completo); además se
+  apagan GPU, extensiones, red de fondo y demás servicios que el bot no usa.
+- La memoria se mide como RSS del árbol de procesos de Chromium (/proc en Linux, psutil si
+  está instalado) y heap JS por contexto (CDP Performance.getMetrics).
+- PoolSesiones recicla el contexto de una cuenta después de N escaneos, y todos los contextos
+  si el navegador pasa un techo de memoria, para que un proceso largo (daemon) no crezca sin
+  límite.
+"""
+import os, time, logging, pathlib
+from typing import Optional
+
+log = logging.getLogger("osep")
+
+ARGS_LIVIANOS = [
+    "--no-sandbox",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-component-extensions-with-background-pages",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-client-side-phishing-detection",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication,InterestFeedContentSuggestions",
+    "--disable-dev-shm-usage",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--no-default-browser-check",
+]
+
+# Alcanza para el formulario, la tabla de resultados y el iframe de la agenda
+VIEWPORT = {"width": 1024, "height": 768}
+
+
+async def lanzar(playwright, headless: bool = True):
+    return await playwright.chromium.launch(headless=headless, args=ARGS_LIVIANOS)
+
+
+async def nuevo_contexto(browser, **extra):
+    return await browser.new_context(viewport=VIEWPORT, device_scale_factor=1,
+                                     service_workers="block", accept_downloads=False, **extra)
+
+
+# ================== MEMORIA ==================
+def _hijos_proc() -> dict:
+    hijos = {}
+    for d in pathlib.Path("/proc").iterdir():
+        if not d.name.isdigit():
+            continue
+        try:
+            stat = (d / "stat").read_text()
+        except OSError:
+            continue
+        # pid (comm) estado ppid …  — comm puede tener espacios, se corta en el último ')'
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        hijos.setdefault(ppid, []).append(int(d.name))
+    return hijos
+
+
+def _rss_kb_proc(pid: int) -> int:
+    try:
+        for linea in pathlib.Path(f"/proc/{pid}/status").read_text().splitlines():
+            if linea.startswith("VmRSS:"):
+                return int(linea.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _es_chromium_proc(pid: int) -> bool:
+    try:
+        cmd = pathlib.Path(f"/proc/{pid}/cmdline").read_bytes()
+    except OSError:
+        return False
+    return b"chrom" in cmd.lower() or b"headless_shell" in cmd
+
+
+def rss_navegador_mb() -> Optional[float]:
+    """RSS total (MB) de los procesos de Chromium que cuelgan de este proceso. None si no se puede medir."""
+    if pathlib.Path("/proc/self/status").exists():
+        hijos = _hijos_proc()
+        pendientes, total = [os.getpid()], 0
+        while pendientes:
+            pid = pendientes.pop()
+            for h in hijos.get(pid, []):
+                pendientes.append(h)
+                if _es_chromium_proc(h):
+                    total += _rss_kb_proc(h)
+        return total / 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    total = 0
+    for p in psutil.Process().children(recursive=True):
+        try:
+            if "chrom" in p.name().lower() or "headless_shell" in p.name():
+                total += p.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / (1024 * 1024)
+
+
+def cpu_navegador_s() -> Optional[float]:
+    """
+    CPU (user+sys, s) de los procesos de Chromium que cuelgan de este proceso, incluidos los
+    hijos que ya terminaron (cutime/cstime). None fuera de Linux.
+    """
+    if not pathlib.Path("/proc/self/stat").exists():
+        return None
+    tick = os.sysconf("SC_CLK_TCK")
+    hijos, pendientes, total = _hijos_proc(), [os.getpid()], 0
+    while pendientes:
+        pid = pendientes.pop()
+        for h in hijos.get(pid, []):
+            pendientes.append(h)
+            if not _es_chromium_proc(h):
+                continue
+            try:
+                campos = pathlib.Path(f"/proc/{h}/stat").read_text().rsplit(")", 1)[1].split()
+            except OSError:
+                continue
+            # utime stime cutime cstime: campos 14-17 de /proc/pid/stat (11-14 después del ')')
+            total += sum(int(x) for x in campos[11:15])
+    return total / tick
+
+
+async def heap_contexto_mb(context) -> Optional[float]:
+    """Heap JS usado (MB) sumando las páginas del contexto, vía CDP."""
+    total = 0
+    try:
+        for page in context.pages:
+            cdp = await context.new_cdp_session(page)
+            try:
+                await cdp.send("Performance.enable")
+                metricas = await cdp.send("Performance.getMetrics")
+                total += next((m["value"] for m in metricas["metrics"] if m["name"] == "JSHeapUsedSize"), 0)
+            finally:
+                await cdp.detach()
+    except Exception as e:
+        log.debug(f"Memoria: no se pudo leer el heap del contexto ({e})")
+        return None
+    return total / (1024 * 1024)
+
+
+# ================== POOL ==================
+class PoolSesiones:
+    """
+    Una sesión (contexto + página) por clave, creada con abrir(clave) y reciclada al llegar a
+    max_escaneos. Si el RSS del navegador pasa max_rss_mb (0 = sin límite) se reciclan todas:
+    el RSS es de todo el navegador y cerrar solo la pedida no lo baja, la vuelve a reciclar en
+    cada vuelta. El RSS se mide a lo sumo cada cada_s (recorre /proc). Las sesiones tienen que
+    exponer .escaneos y async .cerrar().
+    """
+    def __init__(self, abrir, max_escaneos: int = 0, max_rss_mb: float = 0, medir_rss=rss_navegador_mb,
+                 cada_s: float = 30, reloj=time.monotonic):
+        self.abrir = abrir
+        self.max_escaneos = max_escaneos
+        self.max_rss_mb = max_rss_mb
+        self.medir_rss = medir_rss
+        self.cada_s = cada_s
+        self._reloj = reloj
+        self._rss_t = None
+        self.sesiones = {}
+        self.recicladas = 0
+
+    def _rss_excedido(self) -> Optional[float]:
+        """RSS del navegador si pasa el techo (medido cada cada_s), si no None."""
+        if not self.max_rss_mb or not self.sesiones:
+            return None
+        ahora = self._reloj()
+        if self._rss_t is not None and ahora - self._rss_t < self.cada_s:
+            return None
+        self._rss_t = ahora
+        rss = self.medir_rss()
+        return rss if rss is not None and rss > self.max_rss_mb else None
+
+    async def obtener(self, clave):
+        rss = self._rss_excedido()
+        if rss is not None:
+            log.info(f"Reciclando {len(self.sesiones)} contexto(s) (RSS del navegador {rss:.0f} MB > "
+                     f"{self.max_rss_mb:.0f} MB).")
+            for c in list(self.sesiones):
+                await self.descartar(c)
+                self.recicladas += 1
+        ses = self.sesiones.get(clave)
+        if ses is not None and self.max_escaneos and ses.escaneos >= self.max_escaneos:
+            log.info(f"Reciclando el contexto de {clave!r} ({ses.escaneos} escaneos).")
+            await ses.cerrar()
+            ses = None
+            self.recicladas += 1
+        if ses is None:
+            ses = self.sesiones[clave] = await self.abrir(clave)
+        return ses
+
+    async def descartar(self, clave):
+        ses = self.sesiones.pop(clave, None)
+        if ses is not None:
+            await ses.cerrar()
+
+    async def cerrar(self):
+        for clave in list(self.sesiones):
+            await self.descartar(clave)
+
+    async def reporte(self) -> str:
+        rss = self.medir_rss()
+        partes = [f"navegador {rss:.0f} MB RSS" if rss is not None else "navegador RSS n/d"]
+        for clave, ses in self.sesiones.items():
+            heap = await heap_contexto_mb(ses.context)
+            partes.append(f"{clave}: {ses.escaneos} escaneo(s)" + (f", heap {heap:.1f} MB" if heap is not None else ""))
+        return " | ".join(partes)
@@ -0,0 +1,282 @@
+"""
+Notificaciones de turnos encontrados / reservados / casi (near miss).
+
+El flujo solo llama a Notificador.publicar(), que nunca bloquea: los eventos van a
+una cola acotada y una tarea de fondo los agrupa en lotes, descarta los ya avisados
+(también entre corridas, vía un archivo de estado) y los manda a cada sink.
+"""
+import abc, json, time, asyncio, logging, pathlib, smtplib, dataclasses, urllib.request
+from email.message import EmailMessage
+from typing import Optional
+
+log = logging.getLogger("osep")
+
+
+@dataclasses.dataclass
+class Evento:
+    tipo: str                 # "encontrado" | "reservado" | "casi"
+    titulo: str
+    detalle: dict = dataclasses.field(default_factory=dict)
+    clave: str = ""           # para deduplicar; vacío = no se deduplica
+    ts: float = dataclasses.field(default_factory=time.time)
+
+    def como_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+    def linea(self) -> str:
+        return f"[{self.tipo.upper()}] {self.titulo}"
+
+
+def resumen(eventos) -> str:
+    return "\n".join(e.linea() for e in eventos)
+
+
+# ================== SINKS ==================
+class Sink(abc.ABC):
+    """Destino de los avisos: recibe cada lote de eventos. Puede levantar; el notificador lo registra."""
+    nombre = "sink"
+
+    @abc.abstractmethod
+    async def enviar(self, eventos):
+        ...
+
+
+class WebhookSink(Sink):
+    """POST JSON con 'text' (compatible Slack/Discord/Teams básicos) y la lista de eventos."""
+    nombre = "webhook"
+
+    def __init__(self, url: str, timeout_s: float = 10):
+        self.url = url
+        self.timeout_s = timeout_s
+
+    def _post(self, cuerpo: bytes):
+        req = urllib.request.Request(self.url, data=cuerpo, method="POST",
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout_s) as r:
+            r.read()
+
+    async def enviar(self, eventos):
+        cuerpo = json.dumps({"text": resumen(eventos), "eventos": [e.como_dict() for e in eventos]},
+                            ensure_ascii=False).encode("utf-8")
+        await asyncio.to_thread(self._post, cuerpo)
+
+
+class SmtpSink(Sink):
+    nombre = "smtp"
+
+    def __init__(self, host: str, port: int, remitente: str, destinatarios, usuario: str = "",
+                 password: str = "", starttls: bool = True, timeout_s: float = 20):
+        self.host, self.port = host, port
+        self.remitente = remitente
+        self.destinatarios = list(destinatarios)
+        self.usuario, self.password = usuario, password
+        self.starttls = starttls
+        self.timeout_s = timeout_s
+
+    def _enviar(self, msg: EmailMessage):
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout_s) as s:
+            if self.starttls:
+                s.starttls()
+            if self.usuario:
+                s.login(self.usuario, self.password)
+            s.send_message(msg)
+
+    async def enviar(self, eventos):
+        msg = EmailMessage()
+        tipos = sorted({e.tipo for e in eventos})
+        msg["Subject"] = f"[Turnos OSEP] {', '.join(tipos)} ({len(eventos)})"
+        msg["From"] = self.remitente
+        msg["To"] = ", ".join(self.destinatarios)
+        cuerpo = []
+        for e in eventos:
+            cuerpo.append(e.linea())
+            cuerpo.extend(f"  {k}: {v}" for k, v in e.detalle.items())
+        msg.set_content("\n".join(cuerpo))
+        await asyncio.to_thread(self._enviar, msg)
+
+
+class ArchivoSink(Sink):
+    """Una línea JSON por evento (útil para el workflow o para consumir desde otro script)."""
+    nombre = "archivo"
+
+    def __init__(self, ruta):
+        self.ruta = pathlib.Path(ruta)
+
+    def _escribir(self, lineas):
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        with self.ruta.open("a", encoding="utf-8") as f:
+            f.writelines(lineas)
+
+    async def enviar(self, eventos):
+        lineas = [json.dumps(e.como_dict(), ensure_ascii=False) + "\n" for e in eventos]
+        await asyncio.to_thread(self._escribir, lineas)
+
+
+class ComandoSink(Sink):
+    """Ejecuta un comando de shell con el lote en JSON por stdin (notify-send, telegram-send, etc.)."""
+    nombre = "comando"
+
+    def __init__(self, comando: str, timeout_s: float = 20):
+        self.comando = comando
+        self.timeout_s = timeout_s
+
+    async def enviar(self, eventos):
+        proc = await asyncio.create_subprocess_shell(
+            self.comando, stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+        datos = json.dumps([e.como_dict() for e in eventos], ensure_ascii=False).encode("utf-8")
+        try:
+            _, err = await asyncio.wait_for(proc.communicate(datos), timeout=self.timeout_s)
+        except asyncio.TimeoutError:
+            proc.kill()
+            raise
+        if proc.returncode:
+            raise RuntimeError(f"comando salió con {proc.returncode}: {err.decode(errors='replace').strip()}")
+
+
+class MemoriaSink(Sink):
+    """Sink local que guarda los lotes en memoria: reemplazo de los reales en pruebas."""
+    nombre = "memoria"
+
+    def __init__(self, demora_s: float = 0.0):
+        self.lotes = []
+        self.demora_s = demora_s
+
+    @property
+    def eventos(self):
+        return [e for lote in self.lotes for e in lote]
+
+    async def enviar(self, eventos):
+        if self.demora_s:
+            await asyncio.sleep(self.demora_s)
+        self.lotes.append(list(eventos))
+
+
+# ================== DEDUPE ==================
+class Dedupe:
+    """Claves ya notificadas (persistidas entre corridas) con vencimiento."""
+    def __init__(self, ruta: Optional[pathlib.Path] = None, ttl_s: float = 86400, reloj=time.time):
+        self.ruta = pathlib.Path(ruta) if ruta else None
+        self.ttl_s = ttl_s
+        self._reloj = reloj
+        self.vistas = {}
+        if self.ruta:
+            try:
+                self.vistas = json.loads(self.ruta.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self.vistas = {}
+
+    def ya_notificado(self, clave: str) -> bool:
+        if not clave:
+            return False
+        ts = self.vistas.get(clave)
+        return ts is not None and self._reloj() - ts < self.ttl_s
+
+    def marcar(self, clave: str):
+        if clave:
+            self.vistas[clave] = self._reloj()
+
+    def guardar(self):
+        if not self.ruta:
+            return
+        ahora = self._reloj()
+        self.vistas = {k: v for k, v in self.vistas.items() if ahora - v < self.ttl_s}
+        try:
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            self.ruta.write_text(json.dumps(self.vistas), encoding="utf-8")
+        except OSError as e:
+            log.debug(f"Dedupe: no se pudo guardar ({e})")
+
+
+# ================== DISPATCHER ==================
+class Notificador:
+    def __init__(self, sinks, dedupe: Optional[Dedupe] = None, max_cola: int = 100,
+                 lote_max: int = 20, espera_lote_s: float = 2.0, timeout_sink_s: float = 30):
+        self.sinks = list(sinks)
+        self.dedupe = dedupe or Dedupe()
+        self.cola = asyncio.Queue(maxsize=max_cola)
+        self.lote_max = lote_max
+        self.espera_lote_s = espera_lote_s
+        self.timeout_sink_s = timeout_sink_s
+        self.descartados = 0
+        self._tarea = None
+
+    def iniciar(self):
+        if self._tarea is None:
+            self._tarea = asyncio.create_task(self._loop(), name="notificador")
+        return self
+
+    def publicar(self, evento: Evento) -> bool:
+        """No bloquea nunca: si la cola está llena el evento se descarta (y se loguea)."""
+        try:
+            self.cola.put_nowait(evento)
+            return True
+        except asyncio.QueueFull:
+            self.descartados += 1
+            log.warning(f"Notificador: cola llena, se descarta '{evento.linea()}'.")
+            return False
+
+    async def _juntar_lote(self):
+        lote = [await self.cola.get()]
+        fin = time.monotonic() + self.espera_lote_s
+        while len(lote) < self.lote_max:
+            restante = fin - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(await asyncio.wait_for(self.cola.get(), timeout=restante))
+            except asyncio.TimeoutError:
+                break
+        return lote
+
+    async def _despachar(self, lote):
+        vistos = set()
+        nuevos = []
+        for e in lote:
+            if e.clave and e.clave in vistos:
+                continue
+            vistos.add(e.clave)
+            if not self.dedupe.ya_notificado(e.clave):
+                nuevos.append(e)
+        if not nuevos:
+            return
+        res = await asyncio.gather(
+            *(asyncio.wait_for(s.enviar(nuevos), timeout=self.timeout_sink_s) for s in self.sinks),
+            return_exceptions=True)
+        ok = False
+        for s, r in zip(self.sinks, res):
+            if isinstance(r, BaseException):
+                log.warning(f"Notificador: falló el sink {s.nombre} ({r.__class__.__name__}: {r})")
+            else:
+                ok = True
+        # Solo se da por avisado si al menos un sink lo entregó (si no, la próxima corrida reintenta)
+        if ok:
+            for e in nuevos:
+                self.dedupe.marcar(e.clave)
+            self.dedupe.guardar()
+
+    async def _loop(self):
+        while True:
+            lote = await self._juntar_lote()
+            try:
+                await self._despachar(lote)
+            except Exception as e:
+                log.warning(f"Notificador: error despachando lote ({e})")
+            finally:
+                for _ in lote:
+                    self.cola.task_done()
+
+    async def cerrar(self, timeout_s: float = 15):
+        """Espera a que se vacíe la cola (como mucho timeout_s) y frena la tarea de fondo."""
+        if self._tarea is None:
+            return
+        try:
+            await asyncio.wait_for(self.cola.join(), timeout=timeout_s)
+        except asyncio.TimeoutError:
+            log.warning(f"Notificador: quedaron {self.cola.qsize()} evento(s) sin enviar.")
+        self._tarea.cancel()
+        try:
+            await self._tarea
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._tarea = None
@@ -0,0 +1,54 @@
+"""
+Presupuesto de tiempo de la corrida.
+
+El workflow mata el job a los 10 minutos sin dejar resultado; con un deadline
+único cada espera toma su timeout de lo que queda, y siempre se guarda una
+reserva para los pasos de la reserva del turno (click en horario + confirmación).
+"""
+import time
+
+
+class PresupuestoAgotado(RuntimeError):
+    pass
+
+
+class Deadline:
+    # Por debajo de esto no tiene sentido lanzar una espera de Playwright
+    MIN_MS = 500
+
+    def __init__(self, total_s: float, reserva_s: float = 0.0, reloj=time.monotonic):
+        self.total_s = float(total_s)
+        self.reserva_s = float(reserva_s)
+        self._reloj = reloj
+        self._inicio = reloj()
+
+    def transcurrido_s(self) -> float:
+        return self._reloj() - self._inicio
+
+    def restante_s(self, reserva: bool = True) -> float:
+        r = self.total_s - self.transcurrido_s()
+        if reserva:
+            r -= self.reserva_s
+        return r
+
+    def ms(self, paso: str, tope_ms: int, reserva: bool = True) -> int:
+        """
+        Timeout (ms) para una espera del paso: el menor entre tope_ms y lo que queda del presupuesto.
+        Con reserva=True no se toca la reserva de los pasos de booking.
+        """
+        disponible = int(self.restante_s(reserva) * 1000)
+        if disponible < self.MIN_MS:
+            raise PresupuestoAgotado(self._motivo(paso, reserva))
+        return max(self.MIN_MS, min(int(tope_ms), disponible))
+
+    def chequear(self, paso: str, reserva: bool = True):
+        """Aborta antes de arrancar el paso si ya no alcanza el presupuesto."""
+        if self.restante_s(reserva) * 1000 < self.MIN_MS:
+            raise PresupuestoAgotado(self._motivo(paso, reserva))
+
+    def _motivo(self, paso: str, reserva: bool) -> str:
+        msg = (f"presupuesto agotado en '{paso}': transcurridos {self.transcurrido_s():.1f}s "
+               f"de {self.total_s:.0f}s")
+        if reserva and self.reserva_s:
+            msg += f" (se guardan {self.reserva_s:.0f}s de reserva para confirmar el turno)"
+        return msg
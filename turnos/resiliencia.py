@@ -0,0 +1,175 @@
+"""
+Reintentos con backoff exponencial (con jitter) y circuit breaker para el portal.
+
+- Errores transitorios (timeouts de navegación, iframe que no aparece, red): se reintenta el paso.
+- Errores fatales (credenciales, servicio inexistente, presupuesto agotado): se corta enseguida.
+- El circuit breaker guarda su estado en disco para que la próxima corrida (cron) no vuelva
+  a lanzar el navegador mientras el portal está caído. Solo cuentan las fallas del portal
+  (5xx, red, navegación); un selector que tarda o un iframe lento se reintentan y nada más.
+"""
+import os, re, json, time, random, asyncio, logging, pathlib
+
+from playwright.async_api import Error as PWError, TimeoutError as PWTimeout
+
+from turnos.presupuesto import PresupuestoAgotado
+
+log = logging.getLogger("osep")
+
+
+class ErrorTransitorio(RuntimeError):
+    pass
+
+
+class ErrorFatal(RuntimeError):
+    pass
+
+
+class CredencialesInvalidas(ErrorFatal):
+    pass
+
+
+class CaptchaRequerido(ErrorFatal):
+    """El portal pidió captcha: reintentar enseguida solo lo empeora."""
+    pass
+
+
+class PortalCaido(ErrorTransitorio):
+    """5xx o página de error del servidor; cuenta para el circuit breaker."""
+    pass
+
+
+# Mensajes de Playwright que indican problemas de red/portal y no de nuestro lado. Los 5xx
+# solo con su contexto: un "Timeout 15034ms exceeded" suelto también tiene un 503 adentro.
+_RE_RED = re.compile(r"net::ERR_|NS_ERROR_|Navigation failed|ECONNRE|ETIMEDOUT|socket hang up"
+                     r"|(?:status|HTTP|code)\D{0,3}50[234]\b"
+                     r"|\b50[234]\s+(?:Bad Gateway|Service Unavailable|Gateway Time-?out)", re.I)
+# Además de los de red: un goto que no termina (el timeout de Playwright dice "navigating to")
+_RE_PORTAL = re.compile(_RE_RED.pattern + r"|navigating to", re.I)
+
+
+def es_transitorio(e: BaseException) -> bool:
+    if isinstance(e, (ErrorFatal, PresupuestoAgotado)):
+        return False
+    if isinstance(e, (ErrorTransitorio, PWTimeout, asyncio.TimeoutError, ConnectionError)):
+        return True
+    if isinstance(e, PWError):
+        return bool(_RE_RED.search(str(e)))
+    return False
+
+
+def es_falla_portal(e: BaseException) -> bool:
+    """Portal caído o inalcanzable (no un paso puntual): lo único que cuenta para el circuito."""
+    if isinstance(e, (PortalCaido, ConnectionError)):
+        return True
+    if isinstance(e, PWError):
+        return bool(_RE_PORTAL.search(str(e)))
+    return False
+
+
+def backoff_s(intento: int, base_s: float, tope_s: float, rng=random) -> float:
+    """Full jitter: uniforme entre 0 y min(tope, base * 2^intento)."""
+    return rng.uniform(0, min(tope_s, base_s * (2 ** intento)))
+
+
+async def reintentar(fn, *, paso: str, intentos: int, base_s: float, tope_s: float,
+                     dl=None, circuito=None):
+    """
+    Ejecuta await fn() reintentando ante errores transitorios.
+    No reintenta si no queda presupuesto para esperar o si el circuito se abrió.
+    """
+    intento = 0
+    while True:
+        try:
+            return await fn()
+        except Exception as e:
+            if not es_transitorio(e):
+                raise
+            if circuito is not None and es_falla_portal(e):
+                circuito.fallo(f"{paso}: {e.__class__.__name__}")
+            intento += 1
+            if intento >= intentos:
+                raise
+            if circuito is not None and not circuito.permitir():
+                log.warning(f"{paso}: circuito abierto, no se reintenta.")
+                raise
+            espera = backoff_s(intento - 1, base_s, tope_s)
+            if dl is not None and dl.restante_s() < espera:
+                raise
+            primera_linea = (str(e).strip().splitlines() or [""])[0]
+            log.warning(f"{paso}: error transitorio ({primera_linea}); reintento {intento}/{intentos - 1} en {espera:.1f}s…")
+            await asyncio.sleep(espera)
+
+
+class CircuitBreaker:
+    """
+    cerrado -> (umbral fallos seguidos) -> abierto -> (enfriamiento) -> semiabierto -> éxito: cerrado
+                                                                                    -> fallo: abierto
+
+    Los workers comparten el archivo: cada uno relee el estado antes de consultarlo o de sumar
+    un fallo (son unos bytes) y lo escribe entero con un temporal propio + replace.
+    """
+    def __init__(self, ruta: pathlib.Path, umbral: int = 5, enfriamiento_s: float = 1800, reloj=time.time):
+        self.ruta = pathlib.Path(ruta)
+        self.umbral = umbral
+        self.enfriamiento_s = enfriamiento_s
+        self._reloj = reloj
+        self.estado = "cerrado"
+        self.fallos = 0
+        self.abierto_hasta = 0.0
+        self.ultimo_error = ""
+        self._cargar()
+
+    def _cargar(self):
+        try:
+            d = json.loads(self.ruta.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        self.estado = d.get("estado", "cerrado")
+        self.fallos = int(d.get("fallos", 0))
+        self.abierto_hasta = float(d.get("abierto_hasta", 0))
+        self.ultimo_error = d.get("ultimo_error", "")
+
+    def _guardar(self):
+        try:
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.ruta.with_name(f"{self.ruta.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({
+                "estado": self.estado,
+                "fallos": self.fallos,
+                "abierto_hasta": self.abierto_hasta,
+                "ultimo_error": self.ultimo_error,
+                "actualizado": self._reloj(),
+            }), encoding="utf-8")
+            tmp.replace(self.ruta)
+        except OSError as e:
+            log.debug(f"CircuitBreaker: no se pudo guardar el estado ({e})")
+
+    def permitir(self) -> bool:
+        self._cargar()
+        if self.estado == "abierto":
+            if self._reloj() < self.abierto_hasta:
+                return False
+            self.estado = "semiabierto"
+            self._guardar()
+        return True
+
+    def exito(self):
+        self._cargar()
+        if self.estado != "cerrado" or self.fallos:
+            self.estado = "cerrado"
+            self.fallos = 0
+            self.ultimo_error = ""
+            self._guardar()
+
+    def fallo(self, motivo: str = ""):
+        self._cargar()
+        self.fallos += 1
+        self.ultimo_error = motivo
+        if self.estado == "semiabierto" or self.fallos >= self.umbral:
+            self.estado = "abierto"
+            self.abierto_hasta = self._reloj() + self.enfriamiento_s
+            log.warning(f"Circuito ABIERTO por {self.enfriamiento_s:.0f}s ({self.fallos} fallos; último: {motivo}).")
+        self._guardar()
+
+    def segundos_restantes(self) -> float:
+        return max(0.0, self.abierto_hasta - self._reloj())
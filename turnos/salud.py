@@ -0,0 +1,117 @@
+"""
+Chequeo barato de salud del portal (un GET con timeout corto) antes de pagar el lanzamiento
+de Chromium. El resultado se cachea en disco unos segundos para que los ticks seguidos (cron,
+daemon, workers) no sondeen de más, y se cuentan las corridas salteadas.
+
+También se puede correr solo (sin Playwright), p. ej. en el workflow antes de instalarlo:
+    python -m turnos.salud      -> imprime el resultado y, en Actions, deja disponible=true/false
+"""
+import os, re, sys, json, time, socket, asyncio, logging, pathlib, dataclasses, urllib.error, urllib.request
+from typing import Optional
+
+log = logging.getLogger("osep")
+
+# Textos de páginas de error/mantenimiento (también los usa el login)
+RE_PORTAL_CAIDO = re.compile(r"no disponible|mantenimiento|intente m[aá]s tarde|service unavailable|bad gateway|"
+                             r"gateway time-?out|internal server error", re.I)
+
+
+@dataclasses.dataclass
+class Sonda:
+    ok: bool
+    motivo: str
+    estado: Optional[int] = None      # status HTTP (None si no hubo respuesta)
+    seg: float = 0.0
+    ts: float = 0.0
+    cacheada: bool = False
+
+
+def sondear(url: str, timeout_s: float = 5.0) -> Sonda:
+    """GET a url. Caído: sin conexión/timeout, 5xx o página de mantenimiento. Un 4xx cuenta como vivo."""
+    t0 = time.monotonic()
+    req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0 (turnos-osep salud)"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout_s) as r:
+            estado = r.status
+            cuerpo = r.read(65536).decode("utf-8", "replace")
+    except urllib.error.HTTPError as e:
+        estado, cuerpo = e.code, ""
+    except (urllib.error.URLError, socket.timeout, TimeoutError, ConnectionError, OSError) as e:
+        motivo = getattr(e, "reason", e)
+        return Sonda(False, f"sin conexión ({motivo})", None, time.monotonic() - t0, time.time())
+    seg = time.monotonic() - t0
+    if estado >= 500:
+        return Sonda(False, f"HTTP {estado}", estado, seg, time.time())
+    titulo = re.search(r"<title[^>]*>(.*?)</title>", cuerpo, re.I | re.S)
+    if titulo and RE_PORTAL_CAIDO.search(titulo.group(1)):
+        return Sonda(False, f"página de error ({' '.join(titulo.group(1).split())!r})", estado, seg, time.time())
+    return Sonda(True, f"HTTP {estado}", estado, seg, time.time())
+
+
+class SaludPortal:
+    def __init__(self, ruta: pathlib.Path, ttl_s: float = 60.0, reloj=time.time):
+        self.ruta = pathlib.Path(ruta)
+        self.ttl_s = ttl_s
+        self._reloj = reloj
+        self.ultima: Optional[Sonda] = None
+        self.url = ""
+        self.sondeos = 0
+        self.saltos = 0
+        self._cargar()
+
+    def _cargar(self):
+        try:
+            d = json.loads(self.ruta.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        self.url = d.get("url", "")
+        self.ultima = Sonda(**d["ultima"]) if d.get("ultima") else None
+        self.sondeos = int(d.get("sondeos", 0))
+        self.saltos = int(d.get("saltos", 0))
+
+    def _guardar(self):
+        try:
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            self.ruta.write_text(json.dumps({
+                "url": self.url,
+                "ultima": dataclasses.asdict(self.ultima) if self.ultima else None,
+                "sondeos": self.sondeos,
+                "saltos": self.saltos,
+            }), encoding="utf-8")
+        except OSError as e:
+            log.debug(f"Salud: no se pudo guardar el estado ({e})")
+
+    def consultar(self, url: str, timeout_s: float) -> Sonda:
+        u = self.ultima
+        if u and self.url == url and self._reloj() - u.ts < self.ttl_s:
+            return dataclasses.replace(u, cacheada=True)
+        self.ultima, self.url = sondear(url, timeout_s), url
+        self.sondeos += 1
+        self._guardar()
+        return self.ultima
+
+    async def aconsultar(self, url: str, timeout_s: float) -> Sonda:
+        return await asyncio.to_thread(self.consultar, url, timeout_s)
+
+    def registrar_salto(self):
+        self.saltos += 1
+        self._guardar()
+
+
+def main() -> int:
+    url = os.getenv("PORTAL_URL", "https://www.osep.mendoza.gov.ar/webapp_pri")
+    estado_dir = pathlib.Path(os.getenv("ESTADO_DIR", ".estado")).expanduser()
+    salud = SaludPortal(estado_dir / "salud.json", float(os.getenv("SALUD_CACHE_TTL_S", "60")))
+    sonda = salud.consultar(url, float(os.getenv("SALUD_TIMEOUT_S", "5")) or 5.0)
+    if not sonda.ok:
+        salud.registrar_salto()
+    print(f"Portal {'disponible' if sonda.ok else 'NO disponible'}: {sonda.motivo} "
+          f"({sonda.seg:.2f}s{', caché' if sonda.cacheada else ''}; corridas salteadas: {salud.saltos})")
+    if os.getenv("GITHUB_OUTPUT"):
+        with open(os.environ["GITHUB_OUTPUT"], "a", encoding="utf-8") as f:
+            f.write(f"disponible={'true' if sonda.ok else 'false'}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Caché de variantes de selector: para cada elemento del portal con cadena de alternativas
+(botón de login, pestaña 'Nuevo', Buscar, selects) recuerda qué variante funcionó la última
+vez y la prueba primero. Se persiste en disco junto con estadísticas de fallback: si el
+portal cambia, sube la tasa de fallback (y se loguea) en lugar de que las corridas se
+vuelvan lentas sin explicación.
+"""
+import os, json, logging, pathlib
+from typing import Optional
+
+log = logging.getLogger("osep")
+
+
+class CacheSelectores:
+    def __init__(self, ruta: Optional[pathlib.Path] = None):
+        self.ruta = pathlib.Path(ruta) if ruta else None
+        self._datos = None          # elemento -> {"ganadora", "usos", "fallbacks", "variantes": {nombre: éxitos}}
+        self.corrida = {}           # elemento -> [usos, fallbacks] de este proceso
+
+    def _cargar(self) -> dict:
+        if self._datos is None:
+            self._datos = {}
+            if self.ruta and self.ruta.exists():
+                try:
+                    self._datos = json.loads(self.ruta.read_text(encoding="utf-8"))
+                except (OSError, ValueError) as e:
+                    log.warning(f"Selectores: no se pudo leer {self.ruta} ({e}); se arranca de cero.")
+        return self._datos
+
+    def guardar(self):
+        if not self.ruta or self._datos is None:
+            return
+        try:
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            # Temporal propio de este proceso: los workers comparten el directorio de estado
+            tmp = self.ruta.with_name(f"{self.ruta.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self._datos, ensure_ascii=False, indent=1), encoding="utf-8")
+            tmp.replace(self.ruta)
+        except OSError as e:
+            log.debug(f"Selectores: no se pudo guardar ({e})")
+
+    def orden(self, elemento: str, nombres: list) -> list:
+        """nombres con la última ganadora primero (el resto en el orden original)."""
+        ganadora = self._cargar().get(elemento, {}).get("ganadora")
+        return sorted(nombres, key=lambda n: n != ganadora)
+
+    def registrar(self, elemento: str, nombre: str, fallidas: int):
+        d = self._cargar().setdefault(elemento, {"ganadora": None, "usos": 0, "fallbacks": 0, "variantes": {}})
+        d["usos"] += 1
+        d["variantes"][nombre] = d["variantes"].get(nombre, 0) + 1
+        c = self.corrida.setdefault(elemento, [0, 0])
+        c[0] += 1
+        if fallidas:
+            d["fallbacks"] += 1
+            c[1] += 1
+        if d["ganadora"] != nombre:
+            if d["ganadora"] is not None:
+                log.warning(f"Selectores: en {elemento!r} ahora funciona {nombre!r} y no {d['ganadora']!r} "
+                            f"(¿cambió el portal?).")
+            d["ganadora"] = nombre
+            self.guardar()
+
+    async def probar(self, elemento: str, variantes: dict):
+        """
+        variantes: {nombre: async fn(ultima)}; una variante falla si levanta excepción o devuelve
+        False. ultima=True si no queda otra alternativa (la variante puede esperar el timeout
+        completo; si no, conviene que solo haga un chequeo rápido). Devuelve lo que devolvió la
+        primera que funcionó; si fallan todas, re-levanta el último error.
+        """
+        error = None
+        nombres = self.orden(elemento, list(variantes))
+        for i, nombre in enumerate(nombres):
+            try:
+                res = await variantes[nombre](i == len(nombres) - 1)
+            except Exception as e:
+                log.debug(f"Selectores: {elemento!r} / {nombre!r} falló ({e.__class__.__name__}).")
+                error = e
+                continue
+            if res is False:
+                error = LookupError(f"{elemento}: la variante {nombre!r} no encontró el elemento")
+                continue
+            self.registrar(elemento, nombre, i)
+            return res
+        raise error
+
+    def resumen(self) -> str:
+        if not self.corrida:
+            return "sin usos"
+        partes = []
+        for elemento, (usos, fallbacks) in sorted(self.corrida.items()):
+            total = self._cargar().get(elemento, {})
+            tasa = total.get("fallbacks", 0) / max(1, total.get("usos", 0))
+            partes.append(f"{elemento}: {fallbacks}/{usos} fallback(s) ({tasa:.0%} histórico)")
+        return " | ".join(partes)
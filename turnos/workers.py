@@ -0,0 +1,149 @@
+"""
+Modo multiproceso: un coordinador reparte pares (cuenta, objetivo) entre N procesos worker,
+cada uno con su navegador y su pool de contextos.
+
+- Cada worker tiene su propia cola (multiprocessing) y el par va siempre al mismo worker
+  (crc32 de la clave), así se reutiliza la sesión ya logueada de esa cuenta.
+- Los workers devuelven resultados y métricas por una cola compartida:
+    ("tomado", i, item) / ("resultado", i, item, datos)
+- Si un worker muere se relanza con la misma cola; el trabajo que tenía tomado se vuelve
+  a encolar una vez y, si se vuelve a perder, se informa como ("perdido", i, item, datos).
+"""
+import time, queue, asyncio, logging, zlib, multiprocessing as mp
+
+log = logging.getLogger("osep")
+
+
+class Coordinador:
+    def __init__(self, n: int, objetivo, args_extra=lambda: (), max_reinicios: int = 5, reencolar: int = 1):
+        """
+        objetivo(indice, cola_trabajo, cola_resultados, *args_extra()) corre en cada proceso.
+        args_extra se evalúa en cada (re)lanzamiento, así un worker nuevo arranca con la config vigente.
+        """
+        self.n = n
+        self.objetivo = objetivo
+        self.args_extra = args_extra
+        self.max_reinicios = max_reinicios
+        self.reencolar = reencolar
+        self._ctx = mp.get_context("spawn")   # igual en Linux y Windows; Playwright no se lleva con fork
+        # SimpleQueue escribe en el pipe en el momento (sin hilo alimentador): un "tomado"
+        # no se pierde aunque el worker muera justo después
+        self.resultados = self._ctx.SimpleQueue()
+        self.colas = [self._ctx.Queue() for _ in range(n)]
+        self.procesos = [None] * n
+        self.en_curso = {}                    # indice -> item tomado y todavía sin resultado
+        self.reinicios = [0] * n
+        self._reencolados = {}                # item -> veces
+        self._mensajes = {}                   # item -> (clave, mensaje) hasta que llega su resultado
+        self._buffer = []
+        self._parados = set()
+
+    def _lanzar(self, i: int):
+        p = self._ctx.Process(target=self.objetivo, name=f"osep-worker-{i}", daemon=True,
+                              args=(i, self.colas[i], self.resultados, *self.args_extra()))
+        p.start()
+        self.procesos[i] = p
+
+    def iniciar(self):
+        for i in range(self.n):
+            self._lanzar(i)
+        log.info(f"Coordinador: {self.n} worker(s) lanzados.")
+        return self
+
+    def shard(self, clave: str) -> int:
+        return zlib.crc32(clave.encode("utf-8")) % self.n
+
+    def enviar(self, clave: str, item, mensaje):
+        """mensaje viaja a la cola del worker; item es la identidad del trabajo (para reencolar)."""
+        self.colas[self.shard(clave)].put(mensaje)
+        self._mensajes[item] = (clave, mensaje)
+
+    def difundir(self, mensaje):
+        for c in self.colas:
+            c.put(mensaje)
+
+    def _revisar_caidos(self) -> list:
+        """Relanza workers muertos. Devuelve mensajes sintéticos ('perdido', …) para el trabajo que no se reintenta."""
+        sinteticos = []
+        for i, p in enumerate(self.procesos):
+            if p is None or p.is_alive() or i in self._parados:
+                continue
+            log.warning(f"Coordinador: el worker {i} terminó inesperadamente (exitcode {p.exitcode}).")
+            item = self.en_curso.pop(i, None)
+            if item is not None:
+                veces = self._reencolados.get(item, 0)
+                if veces < self.reencolar and item in self._mensajes:
+                    self._reencolados[item] = veces + 1
+                    clave, mensaje = self._mensajes[item]
+                    log.info(f"Coordinador: se vuelve a encolar {item}.")
+                    self.colas[i].put(mensaje)
+                else:
+                    sinteticos.append(("perdido", i, item, {"error": f"worker {i} caído (exitcode {p.exitcode})"}))
+            if self.reinicios[i] >= self.max_reinicios:
+                log.error(f"Coordinador: el worker {i} superó {self.max_reinicios} reinicios; queda detenido.")
+                self._parados.add(i)
+                # Lo que quedaba en su cola no se va a procesar
+                while True:
+                    try:
+                        mensaje = self.colas[i].get_nowait()
+                    except queue.Empty:
+                        break
+                    item = next((k for k, (_, m) in self._mensajes.items() if m == mensaje), None)
+                    if item is not None:
+                        sinteticos.append(("perdido", i, item, {"error": f"worker {i} detenido"}))
+                continue
+            self.reinicios[i] += 1
+            self._lanzar(i)
+        return sinteticos
+
+    def _leer(self, timeout_s: float):
+        fin = time.monotonic() + timeout_s
+        while self.resultados.empty():
+            if time.monotonic() >= fin:
+                return None
+            time.sleep(0.05)
+        return self.resultados.get()
+
+    def _registrar(self, msg):
+        if msg[0] == "tomado":
+            self.en_curso[msg[1]] = msg[2]
+        elif msg[0] in ("resultado", "perdido"):
+            if self.en_curso.get(msg[1]) == msg[2]:
+                del self.en_curso[msg[1]]
+            self._mensajes.pop(msg[2], None)
+        return msg
+
+    async def recibir(self, timeout_s: float = 1.0):
+        """Próximo mensaje de los workers (o None si no llegó nada en timeout_s)."""
+        # Primero lo que ya mandaron (un "tomado" tiene que contar antes de revisar caídos)
+        while not self.resultados.empty():
+            self._buffer.append(self._registrar(self.resultados.get()))
+        for msg in self._revisar_caidos():
+            self._mensajes.pop(msg[2], None)
+            self._buffer.append(msg)
+        if self._buffer:
+            return self._buffer.pop(0)
+        msg = await asyncio.to_thread(self._leer, timeout_s)
+        return self._registrar(msg) if msg is not None else None
+
+    async def cerrar(self, gracia_s: float = 30.0):
+        """
+        Descarta el trabajo todavía encolado, pide a los workers que terminen (sentinela None)
+        y espera a que cierren lo que tienen en curso; pasada la gracia, terminate().
+        """
+        for c in self.colas:
+            while True:
+                try:
+                    c.get_nowait()
+                except queue.Empty:
+                    break
+        self.difundir(None)
+        fin = time.monotonic() + gracia_s
+        for p in self.procesos:
+            if p is None:
+                continue
+            await asyncio.to_thread(p.join, max(0.1, fin - time.monotonic()))
+            if p.is_alive():
+                log.warning(f"Coordinador: {p.name} no terminó a tiempo; se lo termina.")
+                p.terminate()
+                await asyncio.to_thread(p.join, 5)